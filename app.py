@@ -1,447 +1,246 @@
 # -*- coding: utf-8 -*-
+import io
+import tempfile
+import uuid
+from functools import partial
+
 import streamlit as st
-import pandas as pd
-import numpy as np
+from parma.cache import report_cache, workbook_hash
+from parma.prefetch import prefetch_depth, prefetcher, upcoming
+from parma.scoring import SchemaError, load_schema
+from parma.sessions import session_store
+from parma.timing import StageTimer, finish, lazy_import
+from parma.validate import render_validation, validate_answers
 
 st.set_page_config(page_title="わらトレ 心の健康チェック", layout="wide")
+timer = StageTimer("app")
 
-colors = {"P": "#F28B82", "E": "#FDD663", "R": "#81C995", "M": "#AECBFA", "A": "#F9AB00"}
-extra_colors = {
-    "心の健康の総合得点": "#4E73DF",
-    "気持ちの様子（いやな気持）": "#E74C3C",
-    "からだの調子": "#2ECC71",
-    "ひとりぼっち感": "#9B59B6",
-    "全体的なしあわせ感": "#F1C40F",
-}
-
-full_labels = {"P": "前向きな気持ち", "E": "集中して取り組むこと", "R": "人とのつながり", "M": "生きがいや目的", "A": "達成感"}
-
-descriptions = {
-    "P": "楽しい気持ちや安心感、感謝など前向きな感情の豊かさを示します。",
-    "E": "物事に没頭したり夢中になって取り組める状態を示します。",
-    "R": "支え合えるつながりや信頼関係を感じられている状態です。",
-    "M": "人生に目的や価値を感じて生きている状態です。",
-    "A": "努力し、達成感や成長を感じられている状態です。",
-}
-
-tips = {
-    "P": ["感謝の気持ちをメモしてみる", "今日の良かったことを振り返る"],
-    "E": ["小さな挑戦を設定する", "得意なことを活かす"],
-    "R": ["感謝を伝える", "小さな親切をする"],
-    "M": ["大切にしている価値を書き出す", "経験から学びを見つける"],
-    "A": ["小さな目標を作る", "失敗を学びと捉える"],
-}
-
-action_emojis = {"P": "😊", "E": "🧩", "R": "🤝", "M": "🌱", "A": "🏁"}
-
-perma_indices = {"P": [4, 9, 21], "E": [2, 10, 20], "R": [5, 14, 18], "M": [0, 8, 16], "A": [1, 7, 15]}
-extra_indices = {
-    "気持ちの様子（いやな気持）": [6, 13, 19],
-    "からだの調子": [3, 12, 17],
-    "ひとりぼっち感": [11],
-    "全体的なしあわせ感": [22],
-}
-
-def compute_domain_avg(vals, idx):
-    scores = [vals[i] for i in idx if i < len(vals) and not np.isnan(vals[i])]
-    return float(np.mean(scores)) if scores else np.nan
-
-def compute_results(row):
-    cols = sorted([c for c in row.columns if str(c).startswith("6_")], key=lambda x: int(str(x).split("_")[1]))
-    vals = pd.to_numeric(row[cols].values.flatten(), errors="coerce")
-    perma = {k: compute_domain_avg(vals, v) for k, v in perma_indices.items()}
-    extras = {k: compute_domain_avg(vals, v) for k, v in extra_indices.items()}
-    perma_15 = sorted({i for v in perma_indices.values() for i in v})
-    extras["心の健康の総合得点"] = compute_domain_avg(vals, perma_15 + [22])
-    return perma, extras
-
-def score_html(score):
-    return "未回答" if np.isnan(score) else f"<strong>{score:.1f}</strong><span>/10点</span>"
-
-def meter_card(title, score, color, big=False):
-    width = 0 if np.isnan(score) else max(0, min(score * 10, 100))
-    cls = "score big" if big else "score"
-    return f'<div class="card"><div class="card-title">{title}</div><div class="meter"><div class="meter-fill" style="width:{width:.0f}%; background:{color};"></div></div><div class="{cls}">{score_html(score)}</div></div>'
-
-def chart_html(perma_scores):
-    items = ""
-    for k in ["P", "E", "R", "M", "A"]:
-        v = perma_scores.get(k, np.nan)
-        h = 0 if np.isnan(v) else v * 4.2
-        label = "" if np.isnan(v) else f"{v:.1f}"
-        items += f'<div class="chart-item"><div class="chart-score">{label}</div><div class="chart-bar" style="height:{h}mm; background:{colors[k]};"></div><div>{k}</div></div>'
-    return f'<div class="chart-box"><div class="chart-title">PERMA</div><div class="bar-chart">{items}</div></div>'
+try:
+    schema = load_schema()
+except SchemaError as e:
+    st.error(f"採点スキーマが正しくありません：{e}")
+    st.stop()
 
 if "ready" not in st.session_state:
     st.session_state.ready = False
-if "df" not in st.session_state:
-    st.session_state.df = None
 if "sid" not in st.session_state:
     st.session_state.sid = None
+if "wb_hash" not in st.session_state:
+    st.session_state.wb_hash = None
+if "id_index" not in st.session_state:
+    st.session_state.id_index = None
+if "owner" not in st.session_state:
+    st.session_state.owner = uuid.uuid4().hex
 
 if not st.session_state.ready:
     st.title("わらトレ　心の健康チェック")
-    uploaded = st.file_uploader("Excelファイル（ID列＋6_1〜6_23 の列）をアップロードしてください", type="xlsx")
+    uploaded = st.file_uploader(f"Excelファイル（ID列＋{schema.columns[0]}〜{schema.columns[-1]} の列）をアップロードしてください", type="xlsx")
     if uploaded:
-        df = pd.read_excel(uploaded)
+        with timer.stage("upload_parse"):
+            pd = lazy_import("pandas")
+            lazy_import("openpyxl")
+            df = pd.read_excel(uploaded)
+        with timer.stage("validate"):
+            validation = validate_answers(df, schema)
+        if render_validation(validation):
+            df = df[~validation.flagged]
         id_list = df.iloc[:, 0].dropna().astype(str).tolist()
         if not id_list:
             st.error("ID列に有効な値がありません。")
         else:
             sid = st.selectbox("IDを選んでください", options=id_list)
             if st.button("このIDで結果を表示"):
-                st.session_state.df = df
+                session_store().put(st.session_state.owner, df)
                 st.session_state.sid = sid
+                st.session_state.wb_hash = workbook_hash(uploaded.getvalue())
+                st.session_state.id_index = None
+                st.session_state.cohort_scores = None
+                st.session_state.triage = None
+                st.session_state.group_columns = None
+                st.session_state.nav_jump = sid
                 st.session_state.ready = True
                 st.rerun()
+    finish(timer, screen="upload", session=session_store().summary(st.session_state.owner))
     st.stop()
 
-df = st.session_state.df
-sid = st.session_state.sid
-row = df[df.iloc[:, 0].astype(str) == str(sid)]
-
-if row.empty:
-    st.warning("選択されたIDが見つかりません。")
+# 結果画面で初めて必要になるもの（テンプレート・画像・出力処理）はここで読み込む
+with timer.stage("load_report"):
+    assets = lazy_import("parma.assets")
+    html_report = lazy_import("parma.html_report")
+    export = lazy_import("parma.export")
+    report = lazy_import("parma.report")
+    artifacts = lazy_import("parma.artifacts")
+    groups = lazy_import("parma.groups")
+    research = lazy_import("parma.research")
+    triage = lazy_import("parma.triage")
+    assets.warm()
+
+# 回答データはセッション管理（メモリ上限・放置時はディスクに退避）から取り出す
+with timer.stage("session_load"):
+    df = session_store().get(st.session_state.owner)
+if df is None:
+    st.warning("しばらく操作がなかったため、読み込んだファイルを破棄しました。もう一度アップロードしてください。")
     st.session_state.ready = False
     st.rerun()
-
-perma_scores, extras = compute_results(row)
-weak_keys = [k for k, v in perma_scores.items() if not np.isnan(v) and v <= 5]
-strong_keys = [k for k, v in perma_scores.items() if not np.isnan(v) and v >= 7]
-
-strong_html = "".join([meter_card(f"✓ {full_labels[k]}（{k}）", perma_scores[k], colors[k]) for k in strong_keys])
-if not strong_html:
-    strong_html = '<div class="note compact">今回は、7点以上の項目はありませんでした。</div>'
-
-action_html = ""
-for k in weak_keys:
-    items = "".join([f"<li>{t}</li>" for t in tips[k]])
-    action_html += f'<div class="action-title">{action_emojis[k]} {full_labels[k]}（{k}）</div><ul class="action-list">{items}</ul>'
-if not action_html:
-    action_html = '<div class="note compact">今回は、5点以下の項目はありませんでした。</div>'
-
-css = """
-<style>
-html, body, .stApp {
-  background:#f5f6fa;
-  color:#222;
-  font-family:"BIZ UDPGothic","Meiryo","Noto Sans JP",sans-serif;
-}
-.block-container {
-  max-width:none !important;
-  padding:0 !important;
-}
-.report {
-  width:210mm;
-  margin:0 auto;
-}
-.page {
-  width:210mm;
-  height:297mm;
-  box-sizing:border-box;
-  background:white;
-  padding:7mm 8mm;
-  page-break-after:always;
-  break-after:page;
-  margin:0 auto 14px auto;
-  display:flex;
-  flex-direction:column;
-  justify-content:space-between;
-}
-.page:last-child {
-  page-break-after:auto;
-  break-after:auto;
-}
-.header {
-  display:grid;
-  grid-template-columns:48mm 1fr 48mm;
-  align-items:start;
-}
-.title {
-  text-align:center;
-  font-size:26px;
-  font-weight:900;
-  padding-top:5mm;
-}
-.name-box {
-  border:2px solid #C9D4EE;
-  border-radius:9px;
-  padding:8px 11px;
-  height:22mm;
-  box-sizing:border-box;
-}
-.name-label {
-  font-size:15px;
-  font-weight:900;
-}
-.name-line {
-  height:10mm;
-  border-bottom:2px solid #8898bf;
-}
-.section {
-  background:#EEF2FB;
-  border-left:8px solid #4E73DF;
-  border-radius:8px;
-  padding:7px 11px;
-  font-size:16px;
-  font-weight:900;
-}
-.note {
-  border:1px solid #E2E7F2;
-  border-radius:9px;
-  padding:8px 11px;
-  font-size:13.8px;
-  line-height:1.34;
-}
-.grid-main {
-  display:grid;
-  grid-template-columns:1fr 52mm;
-  gap:8px;
-}
-.grid-2 {
-  display:grid;
-  grid-template-columns:1fr 1fr;
-  gap:8px;
-}
-.card {
-  border:1px solid #E2E7F2;
-  border-radius:9px;
-  padding:7px 10px;
-  margin-bottom:5px;
-}
-.card:last-child {
-  margin-bottom:0;
-}
-.card-title {
-  font-size:13.8px;
-  font-weight:900;
-  margin-bottom:4px;
-}
-.meter {
-  height:10px;
-  background:#E4E7ED;
-  border-radius:999px;
-  overflow:hidden;
-}
-.meter-fill {
-  height:100%;
-  border-radius:999px;
-}
-.score {
-  margin-top:3px;
-  font-size:12.5px;
-}
-.score strong {
-  font-size:30px;
-  font-weight:1000;
-  line-height:1;
-}
-.score.big strong {
-  font-size:38px;
-}
-.chart-box {
-  border:1px solid #E2E7F2;
-  border-radius:9px;
-  padding:9px;
-  text-align:center;
-}
-.chart-title {
-  font-size:14px;
-  font-weight:900;
-  margin-bottom:3px;
-}
-.bar-chart {
-  height:48mm;
-  display:flex;
-  align-items:end;
-  justify-content:space-around;
-  border-left:1px solid #999;
-  border-bottom:1px solid #999;
-  padding:4px 4px 0 4px;
-}
-.chart-item {
-  width:14%;
-  font-size:10.5px;
-  text-align:center;
-}
-.chart-score {
-  font-size:10.5px;
-  font-weight:700;
-}
-.chart-bar {
-  width:100%;
-  margin-bottom:2px;
-}
-.ul-note {
-  margin:3px 0 0 1.2em;
-  padding:0;
-}
-.ul-note li {
-  margin:1px 0;
-}
-.page1 .note {
-  font-size:13.5px;
-  line-height:1.30;
-}
-.page1 .section {
-  font-size:15.5px;
-  padding:6px 10px;
-}
-.page1 .card {
-  padding:6px 9px;
-  margin-bottom:5px;
-}
-.page1 .card-title {
-  font-size:13.2px;
-}
-.page1 .score strong {
-  font-size:28px;
-}
-.page1 .score.big strong {
-  font-size:36px;
-}
-.page1 .bar-chart {
-  height:42mm;
-}
-.page1 .chart-box {
-  padding:8px;
-}
-.page2 .section {
-  font-size:16px;
-  padding:7px 11px;
-}
-.page2 .card {
-  padding:8px 11px;
-  margin-bottom:7px;
-}
-.page2 .card-title {
-  font-size:14.5px;
-}
-.page2 .score strong {
-  font-size:31px;
-}
-.action-layout {
-  display:grid;
-  grid-template-columns:1fr 46mm;
-  gap:10px;
-  align-items:start;
-}
-.action-title {
-  font-size:18px;
-  font-weight:900;
-  margin:6px 0 2px 0;
-}
-.action-list {
-  margin:0 0 5px 1.25em;
-  padding:0;
-  font-size:14px;
-  line-height:1.32;
-}
-.illust {
-  width:41mm;
-  margin-top:8px;
-}
-.compact {
-  font-size:12.8px;
-  line-height:1.25;
-  padding:6px 9px;
-}
-.perma-box {
-  border:2px solid #4E73DF;
-  border-radius:9px;
-  padding:7px 9px;
-  font-size:12.8px;
-  line-height:1.25;
-}
-.perma-highlight {
-  color:#4E73DF;
-  font-weight:900;
-}
-.cite {
-  font-size:10px;
-  line-height:1.18;
-}
-.footer {
-  border-top:2px solid #ddd;
-  padding-top:4px;
-  font-size:10px;
-  line-height:1.18;
-}
-@media print {
-  @page {
-    size:A4 portrait;
-    margin:0;
-  }
-  html, body, .stApp {
-    width:210mm !important;
-    height:auto !important;
-    background:white !important;
-    margin:0 !important;
-    padding:0 !important;
-  }
-  * {
-    -webkit-print-color-adjust:exact !important;
-    print-color-adjust:exact !important;
-  }
-  header, footer,
-  [data-testid="stHeader"],
-  [data-testid="stToolbar"],
-  [data-testid="stDecoration"],
-  [data-testid="stStatusWidget"] {
-    display:none !important;
-  }
-  .block-container {
-    padding:0 !important;
-    margin:0 !important;
-    width:210mm !important;
-    max-width:210mm !important;
-  }
-  .report {
-    width:210mm !important;
-    margin:0 !important;
-  }
-  .page {
-    margin:0 !important;
-    width:210mm !important;
-    height:297mm !important;
-    min-height:297mm !important;
-    max-height:297mm !important;
-    box-sizing:border-box !important;
-    page-break-after:always !important;
-    break-after:page !important;
-  }
-  .page:last-child {
-    page-break-after:auto !important;
-    break-after:auto !important;
-  }
-}
-</style>
-"""
-
-page1 = f"""<div class="page page1">
-<div class="header"><div></div><div class="title">わらトレ　心の健康チェック</div><div class="name-box"><div class="name-label">氏名</div><div class="name-line"></div></div></div>
-<div class="note"><b>はじめに（この用紙でわかること）</b><br>この用紙は、心の健康チェックの結果です。今の心の元気さを、0〜10点で確認できます。点数が高いところは「今の強み」、低いところは「これから整えるヒント」としてご覧ください。</div>
-<div class="section">1-1. 要素ごとにみた心の状態</div>
-<div class="grid-main"><div class="grid-2"><div>{meter_card("P：前向きな気持ち", perma_scores.get("P", np.nan), colors["P"])}{meter_card("E：集中して取り組むこと", perma_scores.get("E", np.nan), colors["E"])}{meter_card("R：人とのつながり", perma_scores.get("R", np.nan), colors["R"])}</div><div>{meter_card("M：生きがいや目的", perma_scores.get("M", np.nan), colors["M"])}{meter_card("A：達成感", perma_scores.get("A", np.nan), colors["A"])}</div></div>{chart_html(perma_scores)}</div>
-<div class="note"><b>各指標の見方</b><ul class="ul-note"><li><b>P（前向きな気持ち）</b>：{descriptions["P"]}</li><li><b>E（集中して取り組むこと）</b>：{descriptions["E"]}</li><li><b>R（人とのつながり）</b>：{descriptions["R"]}</li><li><b>M（生きがいや目的）</b>：{descriptions["M"]}</li><li><b>A（達成感）</b>：{descriptions["A"]}</li></ul></div>
-<div class="section">1-2. こころ・からだの調子</div>
-{meter_card("心の健康の総合得点", extras.get("心の健康の総合得点", np.nan), extra_colors["心の健康の総合得点"], True)}
-<div class="grid-2"><div>{meter_card("からだの調子", extras.get("からだの調子", np.nan), extra_colors["からだの調子"])}{meter_card("気持ちの様子（いやな気持）", extras.get("気持ちの様子（いやな気持）", np.nan), extra_colors["気持ちの様子（いやな気持）"])}</div><div>{meter_card("全体的なしあわせ感", extras.get("全体的なしあわせ感", np.nan), extra_colors["全体的なしあわせ感"])}{meter_card("ひとりぼっち感", extras.get("ひとりぼっち感", np.nan), extra_colors["ひとりぼっち感"])}</div></div>
-<div class="note"><b>各指標の意味</b><ul class="ul-note"><li><b>気持ちの様子（いやな気持）</b>：不安になったり、気分が沈んだり、いらいらしたりすることがどのくらいあるかの結果です。</li><li><b>からだの調子</b>：体の調子や元気さについて、ご本人が感じた程度の結果です。</li><li><b>ひとりぼっち感</b>：ひとりぼっちだと感じることがあるかの結果です。</li></ul></div>
-</div>"""
-
-page2 = f"""<div class="page page2">
-<div class="section">2-1. 満たされている心の健康の要素（強み）</div>
-{strong_html}
-<div class="section">2-2. これから伸ばせる要素と具体的な行動例</div>
-<div class="action-layout"><div><div class="note compact">点数が低めだったところは、悪い結果ではありません。<br>これから少しずつ整えていける「ヒント」として見てください。</div>{action_html}</div><div><img class="illust" src="https://eiyoushi-hutaba.com/wp-content/uploads/2025/01/%E5%85%83%E6%B0%97%E3%81%AA%E3%82%B7%E3%83%8B%E3%82%A2%E3%81%AE%E4%BA%8C%E4%BA%BA%E3%80%80%E9%81%8B%E5%8B%95%E7%89%88.png"></div></div>
-<div class="section">3. 備考</div>
-<div class="perma-box"><b><span class="perma-highlight">このチェックで見ていること</span></b><br>この用紙は、心の元気さを <span class="perma-highlight">5つの面（PERMA）</span> で見る方法をもとにしています。5つの面をそれぞれ見ることで、「どこが保てているか」「どこを整えるとよさそうか」を考えやすくします。</div>
-<div class="note compact"><b>① PERMA（5つの面）とは</b><ul class="ul-note"><li><b>P</b>：前向きな気持ち</li><li><b>E</b>：集中して取り組むこと</li><li><b>R</b>：人とのつながり</li><li><b>M</b>：生きがいや目的</li><li><b>A</b>：達成感</li></ul></div>
-<div class="note compact"><b>② この尺度（PERMA-Profiler）について</b><ul class="ul-note"><li>PERMAを短い質問で測れるように開発された尺度です。</li><li><b>PERMAの15問</b>に、<b>追加の8問</b>を加えた、合計<b>23問</b>の形式です。</li><li>点数は<b>0〜10点</b>で確認します。</li></ul></div>
-<div class="note compact"><b>③ 結果の使い方（おすすめ）</b><ul class="ul-note"><li><b>高いところ</b>：今の強み</li><li><b>低いところ</b>：これから整えるヒント</li><li>くり返して確認し、変化を見ると役立ちます。</li></ul></div>
-<div class="note cite compact"><b>引用（根拠）</b><br>Butler, J., &amp; Kern, M. L. (2016). <i>The PERMA-Profiler: A brief multidimensional measure of flourishing</i>. <i>International Journal of Wellbeing</i>, 6(3), 1–48. https://doi.org/10.5502/ijw.v6i3.526</div>
-<div class="footer"><b>この評価結果に関するお問い合わせは以下まで</b><br>〈お問い合わせ先〉〒 474-0037　愛知県大府市半月町三丁目294番地<br>☎ 0562-44-5551　研究代表者：李 相侖<br><b>この度は、ご協力ありがとうございました。</b></div>
-</div>"""
-
-st.markdown(css + f'<div class="report">{page1}{page2}</div>', unsafe_allow_html=True)
+wb_hash = st.session_state.wb_hash
+cache = report_cache()
+store = artifacts.artifact_store()
+
+# ID → 行位置の索引と移動用の ID 一覧（重複なし・ファイル順）は最初の表示で1回だけ作る
+if st.session_state.get("id_index") is None:
+    with timer.stage("id_index"):
+        st.session_state.id_index = report.id_index(df)
+        st.session_state.id_list = list(st.session_state.id_index)
+        st.session_state.group_columns = groups.group_columns(df, schema)
+
+view = st.sidebar.radio("表示", ("個人レポート", "グループ比較", "要確認リスト"), key="view", horizontal=True)
+
+def go_to(new_sid: str):
+    st.session_state.sid = new_sid
+    st.session_state.nav_jump = new_sid
+
+def open_report(new_sid: str):
+    go_to(new_sid)
+    st.session_state.view = "個人レポート"
+
+def step(delta: int):
+    ids = st.session_state.id_list
+    i = ids.index(st.session_state.sid) + delta
+    if 0 <= i < len(ids):
+        go_to(ids[i])
+
+@st.fragment
+def report_view():
+    # 全体の再実行中はその計測に含め、フラグメントだけの再実行では別に記録する
+    t = timer if not timer.finished else StageTimer("app")
+    ids = st.session_state.id_list
+    index = st.session_state.id_index
+    sid = str(st.session_state.sid)
+    pos = ids.index(sid) if sid in index else -1
+
+    with st.container(key="nav"):
+        c1, c2, c3, c4 = st.columns([1, 1, 2, 3], vertical_alignment="center")
+        c1.button("◀ 前へ", on_click=step, args=(-1,), disabled=pos <= 0, width="stretch")
+        c2.button("次へ ▶", on_click=step, args=(1,), disabled=pos < 0 or pos >= len(ids) - 1, width="stretch")
+        c3.markdown(f"**{pos + 1} / {len(ids)}** 人目")
+        if st.session_state.get("nav_jump") not in index:
+            st.session_state.nav_jump = sid
+        c4.selectbox("IDへ移動", ids, key="nav_jump", on_change=lambda: go_to(st.session_state.nav_jump),
+                     label_visibility="collapsed")
+
+    # 描画済みなら (ファイルのハッシュ, ID) でキャッシュから取り出し、採点・HTML組み立てを省く
+    with t.stage("report_html"):
+        pages = report.render_report(df, sid, schema, "html", index, cache, wb_hash)
+    if pages is None:
+        st.warning("選択されたIDが見つかりません。")
+        st.session_state.ready = False
+        st.rerun(scope="app")
+
+    with t.stage("emit"):
+        st.markdown(f'<div class="report">{pages}</div>', unsafe_allow_html=True)
+
+    # 次の数人分をバックグラウンドで描画しておく（別の ID に移ると予約は入れ替わる）
+    with t.stage("prefetch"):
+        prefetcher(cache).schedule(
+            st.session_state.owner,
+            [((wb_hash, s, "html"), partial(report.report_html, df, s, schema, index))
+             for s in upcoming(ids, sid, prefetch_depth())],
+        )
+
+    if t is not timer:
+        finish(t, panel=False, screen="report", fragment=True, cache=cache.stats())
+
+if view != "個人レポート" and st.session_state.get("cohort_scores") is None:
+    # 全員分の得点は1回だけ計算し、グループ分けを変えたときは集計だけやり直す
+    with timer.stage("cohort_scoring"):
+        st.session_state.cohort_scores = groups.cohort_scores(df, schema)
+
+if view == "グループ比較":
+    with timer.stage("group_view"):
+        st.fragment(groups.render_group_view)(df, st.session_state.cohort_scores, schema, st.session_state.group_columns)
+elif view == "要確認リスト":
+    # 要確認の判定は全員分をまとめて1回だけ行い、結果の一覧をセッションに持つ
+    if st.session_state.get("triage") is None:
+        with timer.stage("triage"):
+            st.session_state.triage = triage.cohort_queue(df, st.session_state.cohort_scores, schema,
+                                                          st.session_state.id_index)
+    with timer.stage("triage_view"):
+        triage.render_triage_view(st.session_state.triage, on_open=open_report)
+else:
+    # CSS とイラストは全体の再実行でだけ送る。ID の移動ではレポート部分だけを差し替える
+    with timer.stage("emit_css"):
+        st.markdown(html_report.css + html_report.illust_css(), unsafe_allow_html=True)
+    report_view()
+
+with st.sidebar:
+    st.markdown("**このIDの出力**")
+    if st.button("このIDのPDFを作成"):
+        sid = str(st.session_state.sid)
+        with timer.stage("pdf_single"):
+            pdf = report.render_report(df, sid, schema, "pdf", st.session_state.id_index, cache, wb_hash, store)
+        st.download_button(
+            "PDFをダウンロード",
+            pdf,
+            file_name=f"waratore_report_{sid}.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+        )
+
+    st.markdown("**一括出力**")
+    # 同じ回答・スキーマ・テンプレートで作ったことがあれば保存済みのファイルを返す（再印刷）
+    if st.button("全員分の印刷用HTMLを作成"):
+        def render_bundle():
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as f:
+                export.write_print_bundle(df, f, schema, cache=cache, wb_hash=wb_hash)
+                f.seek(0)
+                return f.read()
+        with timer.stage("bundle_export"):
+            bundle = store.get_or_render(artifacts.batch_key(df, schema, "html", "bundle"), "html", render_bundle)
+        st.download_button(
+            f"ダウンロード（{int(df.iloc[:, 0].notna().sum())}人分）",
+            bundle,
+            file_name="waratore_report_bundle.html",
+            mime="text/html",
+            on_click="ignore",
+        )
+    if st.button("全員分のPDFを作成"):
+        def render_all_pdf():
+            pdf_report = lazy_import("parma.pdf_report")
+            buf = io.BytesIO()
+            pdf_report.write_pdf(export.iter_reports(export.sort_by_id(df), schema), buf)
+            return buf.getvalue()
+        with timer.stage("pdf_export"):
+            pdf = store.get_or_render(artifacts.batch_key(df, schema, "pdf", "all"), "pdf", render_all_pdf)
+        st.download_button(
+            "全員分のPDFをダウンロード",
+            pdf,
+            file_name="waratore_reports.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+        )
+
+    st.markdown("**研究用データ**")
+    with st.expander("匿名化した採点結果を出力"):
+        st.caption("ID はソルト付きのハッシュに置き換え、氏名などの列は出力しません。")
+        salt = st.text_input(f"ソルト（空欄なら環境変数 {research.SALT_ENV}）", type="password")
+        fmt = st.radio("形式", research.FORMATS, horizontal=True)
+        keep = st.multiselect("一緒に出力する列", st.session_state.group_columns)
+        items = st.checkbox("各項目の回答も含める")
+        if st.button("研究用データを作成"):
+            try:
+                with timer.stage("research_export"), tempfile.TemporaryFile("w+b") as f:
+                    n = research.write_research(research.iter_frame(df), f, schema, research.research_salt(salt or None),
+                                                fmt=fmt, keep=keep, items=items)
+                    f.seek(0)
+                    st.download_button(
+                        f"ダウンロード（{n}人分）",
+                        f.read(),
+                        file_name=f"waratore_research.{fmt}",
+                        mime="text/csv" if fmt == "csv" else "application/vnd.apache.parquet",
+                        on_click="ignore",
+                    )
+            except research.ResearchExportError as e:
+                st.error(str(e))
+
+finish(timer, screen="report", cache=cache.stats(), artifacts=store.stats(),
+       session=session_store().summary(st.session_state.owner))
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# 公開 API（parma/api.py）。import parma だけでは Streamlit・matplotlib・pandas を読み込まない
+from parma.api import API_VERSION, Scores, render_report, score_frame, score_row
+
+__version__ = "1.0.0"
+__all__ = ["API_VERSION", "Scores", "__version__", "render_report", "score_frame", "score_row"]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Streamlit・matplotlib を読み込まずに採点・レポート作成を行う入口（一括処理・ノートブック・他のサービス用）
+# ここの関数の引数と戻り値は API_VERSION の間は変えない（変えるときは API_VERSION を上げる）
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from parma.scoring import CompiledSchema, answer_matrix, classify, load_schema, score_matrix, split_scores
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+API_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Scores:
+    # 1人分の採点結果（score_row の戻り値。render_report に渡す）
+    values: np.ndarray         # (領域数,)：schema.keys の順の得点（未回答は NaN）
+    perma: dict
+    extras: dict
+    weak: tuple                # 弱み（weak 以下）の PERMA 領域
+    strong: tuple              # 強み（strong 以上）の PERMA 領域
+    sid: Optional[str] = None
+    lang: Optional[str] = None
+
+# =========================
+# 採点
+# =========================
+def _scores(values: np.ndarray, schema: CompiledSchema, sid=None, lang=None) -> Scores:
+    perma, extras = split_scores(values, schema)
+    weak, strong = classify(perma, schema)
+    return Scores(values, perma, extras, tuple(weak), tuple(strong), None if sid is None else str(sid), lang)
+
+def score_frame(df: "pd.DataFrame", schema: Optional[CompiledSchema] = None) -> "pd.DataFrame":
+    # 回答の表（1列目が ID、回答は schema.columns の列）→ 1行1人の得点の表（ID と schema.keys の列。行の並びは df と同じ）
+    import pandas as pd
+
+    schema = schema or load_schema()
+    out = pd.DataFrame(score_matrix(answer_matrix(df, schema), schema), columns=list(schema.keys), index=df.index)
+    out.insert(0, "ID", df.iloc[:, 0].to_numpy())
+    return out
+
+def score_row(values: Union[Mapping, Sequence[float], np.ndarray], schema: Optional[CompiledSchema] = None,
+              sid: Optional[str] = None, lang: Optional[str] = None) -> Scores:
+    # values：列名（"6_1" など）か項目番号 → 回答、または schema.columns の順の回答の並び。足りない項目は未回答
+    schema = schema or load_schema()
+    row = np.full(len(schema.columns), np.nan)
+    if isinstance(values, Mapping):
+        pos = {c: j for j, c in enumerate(schema.columns)}
+        pos.update({int(n): j for j, n in enumerate(schema.items)})
+        unknown = sorted(str(k) for k in values if k not in pos)
+        if unknown:
+            raise ValueError(f"採点スキーマにない列です：{unknown}")
+        for k, v in values.items():
+            row[pos[k]] = np.nan if v is None else float(v)
+    else:
+        arr = np.asarray(values, dtype=float)
+        if arr.shape != row.shape:
+            raise ValueError(f"回答は {len(schema.columns)} 個（{schema.columns[0]}〜{schema.columns[-1]}）必要です。")
+        row[:] = arr
+    return _scores(score_matrix(row[None, :], schema)[0], schema, sid, lang)
+
+# =========================
+# レポート
+# =========================
+def render_report(scores: Union[Scores, Mapping, "pd.Series"], fmt: str = "html", sid: Optional[str] = None,
+                  lang: Optional[str] = None, schema: Optional[CompiledSchema] = None):
+    # scores：score_row の結果、score_frame の1行、または 領域キー → 得点。
+    # fmt："html"（page1/page2 の HTML 文字列）・"pdf"（バイト列）ほか parma.report に登録された形式
+    from parma import i18n, report, tips
+
+    schema = schema or load_schema()
+    if not isinstance(scores, Scores):
+        missing = [k for k in schema.keys if k not in scores]
+        if missing:
+            raise ValueError(f"得点に {missing} がありません。")
+        row_sid = scores.get("ID") if sid is None else sid
+        if isinstance(row_sid, float) and np.isnan(row_sid):
+            row_sid = None
+        scores = _scores(np.array([float(scores[k]) for k in schema.keys]), schema, row_sid, lang)
+    sid = scores.sid if sid is None else str(sid)
+    # 言語は "en"・"English"・"pt-BR" なども可（不明なら PARMA_LANG か ja）
+    lang = i18n.normalize_lang(lang or scores.lang)
+    personal = tips.personal_tips(scores.values[None, :], schema, [lang])[0]
+    record = (sid, scores.perma, scores.extras, list(scores.weak), list(scores.strong), lang, personal)
+    return report.render(record, fmt)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+import numpy as np
+
+from parma.scoring import CompiledSchema
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# 設定
+# =========================
+DIR_ENV = "PARMA_ARTIFACT_DIR"
+
+# 出力の保存形式：形式名 → 拡張子（html は文字列、それ以外はバイト列）
+SUFFIXES = {"html": ".html", "pdf": ".pdf"}
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        # 区切りを入れて連結の仕方が違う入力が同じにならないようにする
+        h.update(len(p).to_bytes(8, "little"))
+        h.update(p)
+    return h.hexdigest()
+
+# =========================
+# キーの材料（回答・採点スキーマ・テンプレート）
+# =========================
+def schema_version(schema: CompiledSchema) -> str:
+    # 名前・版に加えて、得点と強み・弱みの判定に効く中身もハッシュに入れる（版を上げ忘れても別のキーになる）
+    return _digest(
+        f"{schema.name}@{schema.version}|{schema.impute}|{schema.weak}|{schema.strong}".encode("utf-8"),
+        "\0".join(schema.columns).encode("utf-8"),
+        "\0".join(schema.keys).encode("utf-8"),
+        np.ascontiguousarray(schema.design).tobytes(),
+        np.ascontiguousarray(schema.min_items).tobytes(),
+        np.array([schema.scale_min, schema.scale_max]).tobytes(),
+    )
+
+@lru_cache(maxsize=None)
+def _sources(names: tuple[str, ...]) -> tuple[bytes, ...]:
+    out = []
+    for name in names:
+        spec = importlib.util.find_spec(name)
+        out.append(Path(spec.origin).read_bytes() if spec and spec.origin else name.encode("utf-8"))
+    return tuple(out)
+
+@lru_cache(maxsize=None)
+def template_version(fmt: str) -> str:
+    # 出力の見た目を決めるモジュールのソース・言語ファイル・行動例カタログと同梱画像のハッシュ
+    # （どれかが変われば保存済みの出力は使わない）
+    from parma import assets, i18n, report, tips
+
+    illust = assets.ILLUST_FILE.read_bytes() if assets.ILLUST_FILE.exists() else b""
+    catalogue = tips.catalogue_path().read_bytes() if tips.catalogue_path().exists() else b""
+    return _digest(fmt.encode("utf-8"), *_sources((*report.template_modules(fmt), "parma.tips")),
+                   *i18n.bundle_sources(), catalogue, illust)
+
+def artifact_key(sid: str, answers: np.ndarray, schema: CompiledSchema, fmt: str, lang: str = "ja") -> str:
+    # 出力には ID も載るので ID もキーに含める。回答は NaN も含めてバイト列で比べる
+    return _digest(
+        f"{sid}\0{lang}".encode("utf-8"),
+        np.ascontiguousarray(answers, dtype=float).tobytes(),
+        schema_version(schema).encode("ascii"),
+        template_version(fmt).encode("ascii"),
+    )
+
+def batch_key(df: "pd.DataFrame", schema: CompiledSchema, fmt: str, *params) -> str:
+    # 全員分の一括出力のキー：ID・言語と回答の全体・スキーマ・テンプレート（一括出力の組み立ても含む）・出力の設定
+    from parma.i18n import row_langs
+    from parma.scoring import answer_matrix
+
+    # ID が空の行は出力されない（export.iter_scored）のでキーにも含めない
+    df = df[df.iloc[:, 0].notna().to_numpy()]
+    return _digest(
+        "\0".join(df.iloc[:, 0].map(str)).encode("utf-8"),
+        "\0".join(row_langs(df)).encode("utf-8"),
+        np.ascontiguousarray(answer_matrix(df, schema)).tobytes(),
+        schema_version(schema).encode("ascii"),
+        template_version(fmt).encode("ascii"),
+        *_sources(("parma.export",)),
+        repr(params).encode("utf-8"),
+    )
+
+# =========================
+# 保存先（内容のハッシュで1回だけ書く）
+# =========================
+class ArtifactStore:
+    # objects/xx/内容のハッシュ.拡張子：出力そのもの（同じ内容は1つだけ）
+    # keys/xx/キー：どの出力を指すか（内容のハッシュ.拡張子）
+    def __init__(self, root: Path):
+        self.root = root
+        self.hits = self.misses = self.writes = self.dedup = 0
+        self._lock = threading.Lock()
+
+    def _key_path(self, key: str) -> Path:
+        return self.root / "keys" / key[:2] / key
+
+    def _object_path(self, name: str) -> Path:
+        return self.root / "objects" / name[:2] / name
+
+    def get(self, key: str, fmt: str) -> Optional[Union[str, bytes]]:
+        try:
+            name = self._key_path(key).read_text(encoding="ascii").strip()
+            data = self._object_path(name).read_bytes()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data.decode("utf-8") if fmt == "html" else data
+
+    def path(self, key: str) -> Optional[Path]:
+        # 保存済みの出力ファイルの場所（再印刷でファイルをそのまま渡すとき用）
+        try:
+            p = self._object_path(self._key_path(key).read_text(encoding="ascii").strip())
+        except OSError:
+            return None
+        return p if p.exists() else None
+
+    def put(self, key: str, fmt: str, data: Union[str, bytes]) -> Path:
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        name = _digest(raw) + SUFFIXES.get(fmt, f".{fmt}")
+        obj = self._object_path(name)
+        if obj.exists():
+            with self._lock:
+                self.dedup += 1
+        else:
+            _atomic_write(obj, raw)
+            with self._lock:
+                self.writes += 1
+        _atomic_write(self._key_path(key), name.encode("ascii"))
+        return obj
+
+    def get_or_render(self, key: str, fmt: str, render: Callable[[], Optional[Union[str, bytes]]]):
+        data = self.get(key, fmt)
+        if data is None:
+            data = render()
+            if data is not None:
+                self.put(key, fmt, data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "dedup": self.dedup}
+
+def _atomic_write(path: Path, data: bytes):
+    # 同時に書いても途中の内容が見えないよう、一時ファイルに書いてから置き換える
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+def default_root() -> Path:
+    # 再印刷・次回の実行でも使えるよう、一時ディレクトリのユーザーごとのフォルダ（起動ごとに変えない）
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "")
+    return Path(tempfile.gettempdir()) / f"parma_artifacts_{user}"
+
+def artifact_store() -> ArtifactStore:
+    # プロセスで1つ。保存先は PARMA_ARTIFACT_DIR（既定は default_root()）。
+    # 保存した HTML・PDF はそのまま利用者に返すので、自分だけが読み書きできる（0700）フォルダでなければ使わない
+    from parma.sessions import private_dir
+
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = Path(os.environ[DIR_ENV]) if os.environ.get(DIR_ENV) else default_root()
+            _store = ArtifactStore(private_dir(root, "出力の保存先"))
+        return _store
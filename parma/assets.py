@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import base64
+import io
+import sys
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+# =========================
+# 同梱画像
+# =========================
+ASSET_DIR = Path(__file__).parent / "assets"
+ILLUST_FILE = ASSET_DIR / "illust.png"
+# 元のイラストの取得元（python -m parma.assets fetch で差し替えるとき用。表示・出力では使わない）
+ILLUST_URL = "https://eiyoushi-hutaba.com/wp-content/uploads/2025/01/%E5%85%83%E6%B0%97%E3%81%AA%E3%82%B7%E3%83%8B%E3%82%A2%E3%81%AE%E4%BA%8C%E4%BA%BA%E3%80%80%E9%81%8B%E5%8B%95%E7%89%88.png"
+
+# 2ページ目のイラストは幅 41mm。300dpi で印刷しても足りる大きさまで縮小しておく
+ILLUST_MAX_PX = 500
+
+@lru_cache(maxsize=None)
+def illust_png() -> Optional[bytes]:
+    # 同梱ファイルを一度だけ読み込み・縮小してメモリに保持する。ファイルがなければ None
+    if not ILLUST_FILE.exists():
+        return None
+    data = ILLUST_FILE.read_bytes()
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    with Image.open(io.BytesIO(data)) as im:
+        if max(im.size) <= ILLUST_MAX_PX:
+            return data
+        im.thumbnail((ILLUST_MAX_PX, ILLUST_MAX_PX))
+        out = io.BytesIO()
+        im.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+@lru_cache(maxsize=None)
+def illust_size() -> Optional[tuple[int, int]]:
+    data = illust_png()
+    if data is None:
+        return None
+    # PNG の IHDR から幅・高さを読む（Pillow がなくても使えるように）
+    return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+@lru_cache(maxsize=None)
+def illust_src() -> Optional[str]:
+    # HTML 用の data URI。同梱画像がなければ None（外部 URL は読みに行かず、イラストを省く）
+    data = illust_png()
+    if data is None:
+        return None
+    return "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+def warm():
+    # 結果画面の読み込み時に呼んで、以後の表示で読み込み・縮小が走らないようにする
+    illust_src()
+    illust_size()
+
+# =========================
+# 取得（配備時に1回だけ）
+# =========================
+def fetch(url: str = ILLUST_URL, dest: Path = ILLUST_FILE) -> Path:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with urllib.request.urlopen(url, timeout=30) as r:
+        dest.write_bytes(r.read())
+    return dest
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["fetch"]:
+        print(f"保存しました：{fetch()}", file=sys.stderr)
+    else:
+        print("使い方：python -m parma.assets fetch", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# =========================
+# 設定
+# =========================
+CACHE_MB_ENV = "PARMA_CACHE_MB"
+DEFAULT_CACHE_MB = 64
+
+def workbook_hash(data: bytes) -> str:
+    # アップロードされたファイルの中身で識別する（同じファイルを別のセッションで開いても同じキー）
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def sizeof(value) -> int:
+    # 入れ子のデータ（Record の dict・list・tuple など）も中身まで数える。同じオブジェクトは1回だけ
+    seen: set[int] = set()
+    stack = [value]
+    total = 0
+    while stack:
+        v = stack.pop()
+        if id(v) in seen:
+            continue
+        seen.add(id(v))
+        total += sys.getsizeof(v)
+        if isinstance(v, dict):
+            stack.extend(v.keys())
+            stack.extend(v.values())
+        elif isinstance(v, (list, tuple, set, frozenset)):
+            stack.extend(v)
+        elif hasattr(v, "nbytes") and getattr(v, "base", None) is not None:
+            total += int(v.nbytes)   # 配列のビュー（getsizeof には中身が含まれない）
+    return total
+
+# =========================
+# 結果キャッシュ（LRU・メモリ上限つき）
+# =========================
+class ReportCache:
+    # キー：(ファイルのハッシュ, ID, 種類)。値：描画済みの HTML や PDF のバイト列、採点済みの Record
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def put(self, key: Hashable, value):
+        size = sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.budget:
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            # 上限を超えたら古いものから捨てる
+            while self.bytes > self.budget:
+                _, (_, s) = self._entries.popitem(last=False)
+                self.bytes -= s
+                self.evictions += 1
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Optional[object]]):
+        value = self.get(key)
+        if value is None:
+            value = render()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+_cache: Optional[ReportCache] = None
+_cache_lock = threading.Lock()
+
+def report_cache() -> ReportCache:
+    # プロセスで1つ。セッションをまたいで共有する（キーがファイルの中身なので混ざらない）
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            mb = float(os.environ.get(CACHE_MB_ENV) or DEFAULT_CACHE_MB)
+            _cache = ReportCache(int(mb * 1024 * 1024))
+        return _cache
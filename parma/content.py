@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# レポートの文言・色（HTML・PDF・Streamlit のどの出力でも同じものを使う）
+# 文言は parma/locales/ja.json から読む（ほかの言語は parma/i18n.py）
+from parma import i18n
+
+# =========================
+# 色
+# =========================
+colors = {"P": "#F28B82", "E": "#FDD663", "R": "#81C995", "M": "#AECBFA", "A": "#F9AB00"}
+extra_colors = {
+    "心の健康の総合得点": "#4E73DF",
+    "気持ちの様子（いやな気持）": "#E74C3C",
+    "からだの調子": "#2ECC71",
+    "ひとりぼっち感": "#9B59B6",
+    "全体的なしあわせ感": "#F1C40F",
+}
+
+# =========================
+# 表示ラベル・説明・行動例（日本語）
+# =========================
+_ja = i18n.bundle(i18n.REFERENCE_LANG)
+full_labels = _ja.full_labels
+descriptions = _ja.descriptions
+extras_explanations = _ja.extras_explanations
+tips = _ja.tips
+
+action_emojis = {"P": "😊", "E": "🧩", "R": "🤝", "M": "🌱", "A": "🏁"}
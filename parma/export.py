@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import argparse
+import html
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+
+import numpy as np
+import pandas as pd
+
+from parma import html_report, i18n, tips
+from parma.cache import ReportCache
+from parma.report import Record, report_pages
+from parma.scoring import CompiledSchema, answer_matrix, classify, load_schema, score_matrix, split_scores
+
+CHUNK_ROWS = 1000
+
+BUNDLE_HEAD = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="utf-8">
+<title>わらトレ　心の健康チェック（一括印刷）</title>
+"""
+
+# =========================
+# 入力
+# =========================
+def read_workbook(path) -> pd.DataFrame:
+    if Path(path).suffix.lower() == ".csv":
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+def sort_by_id(df: pd.DataFrame) -> pd.DataFrame:
+    # 数値として読める ID は数値順、それ以外は後ろに文字列順（安定ソート）
+    ids = df.iloc[:, 0].fillna("").astype(str)
+    num = pd.to_numeric(ids, errors="coerce").fillna(np.inf)
+    return df.iloc[np.lexsort((ids.to_numpy(dtype=str), num.to_numpy()))]
+
+def iter_scored(df: pd.DataFrame, schema: CompiledSchema, chunk_rows: int = CHUNK_ROWS,
+                lang: Optional[str] = None) -> Iterator[tuple[str, dict, dict, str, dict]]:
+    # チャンク単位でまとめて採点し、1人ずつ (ID, PERMA, その他, 言語, 行動例) を返す。ID が空の行は飛ばす
+    # 言語はファイルの言語の列から（空欄・列がなければ lang か既定の言語）。言語が混ざっていてもよい
+    # 行動例もチャンク単位で カタログ × 回答者 をまとめて並べ替える（parma/tips.py）
+    column = i18n.language_column(df)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        keep = chunk.iloc[:, 0].notna().to_numpy()
+        scores = score_matrix(answer_matrix(chunk, schema), schema)[keep]
+        langs = i18n.row_langs(chunk, lang, column)[keep]
+        personal = tips.personal_tips(scores, schema, langs)
+        for sid, row, row_lang, row_tips in zip(chunk.iloc[:, 0][keep].astype(str), scores, langs, personal):
+            perma, extras = split_scores(row, schema)
+            yield sid, perma, extras, str(row_lang), row_tips
+
+def iter_reports(df: pd.DataFrame, schema: CompiledSchema, lang: Optional[str] = None) -> Iterator[Record]:
+    for sid, perma, extras, row_lang, row_tips in iter_scored(df, schema, lang=lang):
+        weak_keys, strong_keys = classify(perma, schema)
+        yield sid, perma, extras, weak_keys, strong_keys, row_lang, row_tips
+
+# =========================
+# 1人分の HTML ファイル
+# =========================
+def report_document(pages: str, sid: str) -> str:
+    # report_pages の結果を、CSS 込みで単独で開ける HTML にする（フォルダ監視の出力用）
+    head = BUNDLE_HEAD.replace("（一括印刷）", f"（ID {html.escape(str(sid))}）")
+    return f'{head}{html_report.css}{html_report.illust_css()}</head>\n<body>\n<div class="report">\n{pages}\n</div>\n</body>\n</html>\n'
+
+# =========================
+# 一括印刷用 HTML
+# =========================
+def write_print_bundle(df: pd.DataFrame, out: TextIO, schema: CompiledSchema,
+                       cache: Optional[ReportCache] = None, wb_hash: Optional[str] = None,
+                       lang: Optional[str] = None) -> int:
+    # CSS は先頭に1回だけ。各人の page1/page2 を順に書き出すので、出力側のメモリは人数によらず一定
+    # cache を渡すと、結果画面で描画済みの人はその HTML を使う（一括出力の分はキャッシュに入れない）
+    # キャッシュは ID ごと（同じ ID の最初の行）なので、複数行ある ID には使わない（どの行も自分の回答で描く）
+    shared = set()
+    if cache is not None:
+        ids = df.iloc[:, 0][df.iloc[:, 0].notna()].astype(str)
+        shared = set(ids[ids.duplicated()])
+    out.write(BUNDLE_HEAD)
+    out.write(html_report.css)
+    out.write(html_report.illust_css())
+    out.write('</head>\n<body>\n<div class="report">\n')
+    n = 0
+    for record in iter_reports(df, schema, lang):
+        pages = cache.get((wb_hash, record[0], "html")) if cache is not None and record[0] not in shared else None
+        out.write(pages or report_pages(record))
+        out.write("\n")
+        n += 1
+    out.write("</div>\n</body>\n</html>\n")
+    return n
+
+# =========================
+# matplotlib のグラフ（論文・配布資料用）
+# =========================
+def iter_chart_items(df: pd.DataFrame, schema: CompiledSchema,
+                     by: Optional[list] = None) -> Iterator[tuple[str, dict, str]]:
+    # (ファイル名, PERMA の得点, タイトル)。by を指定するとグループごとの平均、指定しなければ1人ずつ
+    if by:
+        from parma.groups import cohort_scores, group_summary
+
+        summary = group_summary(df, cohort_scores(df, schema), by, schema)
+        for name, row in summary.iterrows():
+            yield str(name), {k: row[k] for k in schema.keys_of("perma")}, f"{name}（{int(row['人数'])}人）"
+        return
+    for sid, perma, _, _, _ in iter_scored(df, schema):
+        yield sid, perma, f"ID {sid}"
+
+def write_charts(items: Iterator[tuple[str, dict, str]], out_dir, fmt: str = "png",
+                 workers: Optional[int] = None) -> int:
+    # 図を使い回して並列に描き（parma/mpl_chart.py）、1つずつ一時ファイル経由で書き出す
+    from parma.mpl_chart import chart_pool
+    from parma.watch import safe_name
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names: list[str] = []
+
+    def jobs():
+        for name, perma, title in items:
+            names.append(name)
+            yield perma, title
+
+    n = 0
+    for data in chart_pool().render_many(jobs(), fmt, workers):
+        target = out_dir / f"{safe_name(names[n])}.{fmt}"
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+        n += 1
+    return n
+
+# =========================
+# コマンドライン
+# =========================
+def _stored_output(df: pd.DataFrame, schema: CompiledSchema, fmt: str, params: tuple, output: str,
+                   write, skip: bool = False):
+    # 同じ回答・スキーマ・テンプレートで作ったことがあれば保存済みのファイルをコピーする。なければ write() で書いて保存
+    if skip:
+        write()
+        return
+    from parma.artifacts import artifact_store, batch_key
+
+    store = artifact_store()
+    key = batch_key(df, schema, fmt, *params)
+    cached = store.path(key)
+    if cached is not None:
+        shutil.copyfile(cached, output)
+        print(f"保存済みの出力をコピーしました：{output}", file=sys.stderr)
+        return
+    write()
+    store.put(key, fmt, Path(output).read_bytes())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m parma.export", description="わらトレ 心の健康チェックの一括出力")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("bundle", help="全員分を1つの印刷用HTMLに書き出す")
+    p.add_argument("input", help="回答ファイル（.xlsx / .csv）")
+    p.add_argument("output", help="出力する HTML ファイル")
+
+    p = sub.add_parser("pdf", help="全員分を ID 順・ID ごとのしおり付きで PDF に書き出す")
+    p.add_argument("input", help="回答ファイル（.xlsx / .csv）")
+    p.add_argument("output", help="出力する PDF ファイル（--per-file 指定時は {n} を含めると連番になります）")
+    p.add_argument("--workers", type=int, default=None, help="レイアウトを行うプロセス数（既定：CPU数）")
+    p.add_argument("--per-file", type=int, default=None, help="1ファイルあたりの人数（指定時は複数ファイルに分割）")
+
+    p = sub.add_parser("research", help="ID を匿名化した採点結果を CSV / Parquet に書き出す（研究用）")
+    p.add_argument("input", help="回答ファイル（.xlsx / .csv。CSV は少しずつ読み込みます）")
+    p.add_argument("output", help="出力ファイル（拡張子 .parquet なら Parquet、それ以外は CSV）")
+    p.add_argument("--salt", default=None, help="ID のハッシュに使うソルト（既定：環境変数 PARMA_RESEARCH_SALT）")
+    p.add_argument("--keep", nargs="*", default=[], help="一緒に出力する列（施設・年代など）。指定しない列は出力しません")
+    p.add_argument("--items", action="store_true", help="各項目の回答も出力する")
+
+    p = sub.add_parser("charts", help="PERMA の棒グラフを1人（またはグループ）1ファイルで書き出す（論文・配布資料用）")
+    p.add_argument("input", help="回答ファイル（.xlsx / .csv）")
+    p.add_argument("output", help="出力するフォルダ")
+    p.add_argument("--format", choices=("png", "svg", "pdf"), default="png", help="画像の形式（既定：png）")
+    p.add_argument("--by", nargs="+", default=None, help="グループ分けに使う列（指定時はグループごとの平均を描く）")
+    p.add_argument("--workers", type=int, default=None, help="描画するスレッド数（既定：環境変数 PARMA_CHART_POOL か CPU数）")
+
+    for p in sub.choices["bundle"], sub.choices["pdf"]:
+        p.add_argument("--no-store", action="store_true",
+                       help="保存済みの出力（parma/artifacts.py）を使わず、保存もしない")
+        p.add_argument("--lang", choices=i18n.LANGS, default=None,
+                       help="言語の列がない・空欄の人の言語（既定：環境変数 PARMA_LANG か ja）")
+
+    args = parser.parse_args(argv)
+    schema = load_schema()
+    if args.command in ("bundle", "pdf"):
+        # 言語ファイル・行動例カタログの誤りは書き出しを始める前に知らせる
+        try:
+            i18n.precompile()
+            tips.load_catalogue()
+        except (i18n.LocaleError, tips.CatalogueError) as e:
+            parser.error(str(e))
+
+    if args.command == "bundle":
+        df = read_workbook(args.input)
+
+        def write():
+            with open(args.output, "w", encoding="utf-8") as f:
+                n = write_print_bundle(df, f, schema, lang=args.lang)
+            print(f"{n} 人分を書き出しました：{args.output}", file=sys.stderr)
+        _stored_output(df, schema, "html", ("bundle", args.lang), args.output, write, args.no_store)
+    elif args.command == "pdf":
+        from parma.pdf_report import write_pdf
+
+        output = args.output
+        if args.per_file and "{n}" not in output:
+            stem = Path(output)
+            output = str(stem.with_name(f"{stem.stem}_{{n:03d}}{stem.suffix}"))
+        df = read_workbook(args.input)
+
+        def write():
+            workers = args.workers or os.cpu_count() or 1
+            for path in write_pdf(iter_reports(sort_by_id(df), schema, args.lang), output, workers=workers, per_file=args.per_file):
+                print(f"書き出しました：{path}", file=sys.stderr)
+        # 分割出力は保存しない（ファイルが複数になるため）
+        _stored_output(df, schema, "pdf", ("all", args.lang), output, write, args.no_store or bool(args.per_file))
+    elif args.command == "charts":
+        df = read_workbook(args.input)
+        missing = [c for c in args.by or [] if c not in df.columns]
+        if missing:
+            parser.error(f"回答ファイルに {missing} の列がありません。")
+        n = write_charts(iter_chart_items(df, schema, args.by), args.output, args.format, args.workers)
+        print(f"{n} 個のグラフを書き出しました：{args.output}", file=sys.stderr)
+    elif args.command == "research":
+        from parma import research
+
+        fmt = "parquet" if Path(args.output).suffix.lower() == ".parquet" else "csv"
+        try:
+            n = research.write_research(research.iter_workbook(args.input), args.output, schema,
+                                        research.research_salt(args.salt), fmt=fmt, keep=args.keep, items=args.items)
+        except research.ResearchExportError as e:
+            parser.error(str(e))
+        print(f"{n} 人分を書き出しました：{args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from parma.scoring import CompiledSchema, answer_matrix, score_matrix
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# これより種類の多い列はグループ分けの候補にしない
+MAX_GROUPS = 50
+BLANK_LABEL = "（空欄）"
+
+# =========================
+# 集計
+# =========================
+def group_columns(df: "pd.DataFrame", schema: CompiledSchema) -> list[str]:
+    # ID 列・回答列以外で、値の種類が MAX_GROUPS 以下の列（施設・年代・性別など）
+    answer_cols = set(schema.columns)
+    out = []
+    for c in df.columns[1:]:
+        name = str(c)
+        if name in answer_cols or name.startswith(schema.prefix):
+            continue
+        # 全員ばらばらの列（氏名・メモなど）も除く
+        n_unique = df[c].nunique(dropna=True)
+        if 0 < n_unique <= MAX_GROUPS and n_unique < df[c].count():
+            out.append(c)
+    return out
+
+def cohort_scores(df: "pd.DataFrame", schema: CompiledSchema) -> np.ndarray:
+    # 全員分を1回で採点（グループ分けを変えても採点はやり直さない）
+    return score_matrix(answer_matrix(df, schema), schema)
+
+def group_summary(df: "pd.DataFrame", scores: np.ndarray, by: list, schema: CompiledSchema) -> "pd.DataFrame":
+    # グループごとの人数と各領域の平均（未回答の領域は平均から除く）を1回の groupby で求める
+    import pandas as pd
+
+    frame = pd.DataFrame(scores, columns=list(schema.keys), index=df.index)
+    keys = [df[c].astype("string").fillna(BLANK_LABEL).rename(str(c)) for c in by]
+    grouped = frame.groupby(keys, sort=True, observed=True)
+    out = grouped.mean()
+    out.insert(0, "人数", grouped.size())
+    if len(by) > 1:
+        out.index = [" / ".join(map(str, g)) for g in out.index]
+    out.index.name = " / ".join(map(str, by))
+    return out
+
+# =========================
+# Streamlit 表示
+# =========================
+def render_group_view(df: "pd.DataFrame", scores: np.ndarray, schema: CompiledSchema, candidates: Optional[list] = None):
+    # candidates を渡せば列の候補探しを省く（グループ分けを変えるたびに全列を調べないように）
+    import streamlit as st
+
+    st.subheader("グループ比較")
+    if candidates is None:
+        candidates = group_columns(df, schema)
+    if not candidates:
+        st.info("グループ分けに使える列（施設・年代・性別など）がファイルにありません。")
+        return
+    by = st.multiselect("グループ分けに使う列", candidates, default=candidates[:1], key="group_by")
+    if not by:
+        st.caption("列を1つ以上選んでください。")
+        return
+
+    summary = group_summary(df, scores, by, schema)
+    perma, extra = schema.keys_of("perma"), schema.keys_of("extra")
+    st.caption(f"{len(summary)} グループ・{int(summary['人数'].sum())} 人")
+    st.markdown("**PERMA（グループ別の平均）**")
+    st.bar_chart(summary[perma].T, stack=False, y_label="平均点", height=320)
+    st.markdown("**その他の指標（グループ別の平均）**")
+    st.bar_chart(summary[extra].T, stack=False, y_label="平均点", height=320)
+    st.dataframe(summary.round(2), width="stretch")
+    st.download_button(
+        "グループ別の集計を CSV で保存",
+        summary.round(3).to_csv().encode("utf-8-sig"),
+        file_name="parma_groups.csv",
+        mime="text/csv",
+    )
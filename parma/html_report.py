@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+import html
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from parma import assets, i18n, svg
+from parma.content import action_emojis, colors, extra_colors
+
+# =========================
+# CSS
+# =========================
+css = """
+<style>
+html, body, .stApp {
+  background:#f5f6fa;
+  color:#222;
+  font-family:"BIZ UDPGothic","Meiryo","Noto Sans JP",sans-serif;
+}
+.block-container {
+  max-width:none !important;
+  padding:0 !important;
+}
+.report {
+  width:210mm;
+  margin:0 auto;
+}
+.page {
+  width:210mm;
+  height:297mm;
+  box-sizing:border-box;
+  background:white;
+  padding:7mm 8mm;
+  page-break-after:always;
+  break-after:page;
+  margin:0 auto 14px auto;
+  display:flex;
+  flex-direction:column;
+  justify-content:space-between;
+}
+.page:last-child {
+  page-break-after:auto;
+  break-after:auto;
+}
+.header {
+  display:grid;
+  grid-template-columns:48mm 1fr 48mm;
+  align-items:start;
+}
+.title {
+  text-align:center;
+  font-size:26px;
+  font-weight:900;
+  padding-top:5mm;
+}
+.name-box {
+  border:2px solid #C9D4EE;
+  border-radius:9px;
+  padding:8px 11px;
+  height:22mm;
+  box-sizing:border-box;
+}
+.name-label {
+  font-size:15px;
+  font-weight:900;
+}
+.name-line {
+  height:10mm;
+  border-bottom:2px solid #8898bf;
+}
+.sid {
+  font-size:12px;
+  color:#555;
+  padding-top:2mm;
+}
+.section {
+  background:#EEF2FB;
+  border-left:8px solid #4E73DF;
+  border-radius:8px;
+  padding:7px 11px;
+  font-size:16px;
+  font-weight:900;
+}
+.note {
+  border:1px solid #E2E7F2;
+  border-radius:9px;
+  padding:8px 11px;
+  font-size:13.8px;
+  line-height:1.34;
+}
+.grid-main {
+  display:grid;
+  grid-template-columns:1fr 52mm;
+  gap:8px;
+}
+.grid-2 {
+  display:grid;
+  grid-template-columns:1fr 1fr;
+  gap:8px;
+}
+.card {
+  border:1px solid #E2E7F2;
+  border-radius:9px;
+  padding:7px 10px;
+  margin-bottom:5px;
+}
+.card:last-child {
+  margin-bottom:0;
+}
+.card-title {
+  font-size:13.8px;
+  font-weight:900;
+  margin-bottom:4px;
+}
+.meter {
+  height:10px;
+  background:#E4E7ED;
+  border-radius:999px;
+  overflow:hidden;
+}
+.score {
+  margin-top:3px;
+  font-size:12.5px;
+}
+.score strong {
+  font-size:30px;
+  font-weight:1000;
+  line-height:1;
+}
+.score.big strong {
+  font-size:38px;
+}
+.chart-box {
+  border:1px solid #E2E7F2;
+  border-radius:9px;
+  padding:9px;
+  text-align:center;
+}
+.chart-title {
+  font-size:14px;
+  font-weight:900;
+  margin-bottom:3px;
+}
+.chart-svg {
+  display:block;
+  width:100%;
+  height:48mm;
+}
+.meter-svg {
+  display:block;
+}
+.ul-note {
+  margin:3px 0 0 1.2em;
+  padding:0;
+}
+.ul-note li {
+  margin:1px 0;
+}
+.page1 .note {
+  font-size:13.5px;
+  line-height:1.30;
+}
+.page1 .section {
+  font-size:15.5px;
+  padding:6px 10px;
+}
+.page1 .card {
+  padding:6px 9px;
+  margin-bottom:5px;
+}
+.page1 .card-title {
+  font-size:13.2px;
+}
+.page1 .score strong {
+  font-size:28px;
+}
+.page1 .score.big strong {
+  font-size:36px;
+}
+.page1 .chart-svg {
+  height:42mm;
+}
+.page1 .chart-box {
+  padding:8px;
+}
+.page2 .section {
+  font-size:16px;
+  padding:7px 11px;
+}
+.page2 .card {
+  padding:8px 11px;
+  margin-bottom:7px;
+}
+.page2 .card-title {
+  font-size:14.5px;
+}
+.page2 .score strong {
+  font-size:31px;
+}
+.action-layout {
+  display:grid;
+  grid-template-columns:1fr 46mm;
+  gap:10px;
+  align-items:start;
+}
+.action-title {
+  font-size:18px;
+  font-weight:900;
+  margin:6px 0 2px 0;
+}
+.action-list {
+  margin:0 0 5px 1.25em;
+  padding:0;
+  font-size:14px;
+  line-height:1.32;
+}
+.illust {
+  width:41mm;
+  margin-top:8px;
+}
+.compact {
+  font-size:12.8px;
+  line-height:1.25;
+  padding:6px 9px;
+}
+.perma-box {
+  border:2px solid #4E73DF;
+  border-radius:9px;
+  padding:7px 9px;
+  font-size:12.8px;
+  line-height:1.25;
+}
+.perma-highlight {
+  color:#4E73DF;
+  font-weight:900;
+}
+.cite {
+  font-size:10px;
+  line-height:1.18;
+}
+.footer {
+  border-top:2px solid #ddd;
+  padding-top:4px;
+  font-size:10px;
+  line-height:1.18;
+}
+@media print {
+  @page {
+    size:A4 portrait;
+    margin:0;
+  }
+  html, body, .stApp {
+    width:210mm !important;
+    height:auto !important;
+    background:white !important;
+    margin:0 !important;
+    padding:0 !important;
+  }
+  * {
+    -webkit-print-color-adjust:exact !important;
+    print-color-adjust:exact !important;
+  }
+  header, footer,
+  [data-testid="stHeader"],
+  [data-testid="stToolbar"],
+  [data-testid="stDecoration"],
+  [data-testid="stStatusWidget"],
+  [data-testid="stSidebar"],
+  .st-key-nav {
+    display:none !important;
+  }
+  .block-container {
+    padding:0 !important;
+    margin:0 !important;
+    width:210mm !important;
+    max-width:210mm !important;
+  }
+  .report {
+    width:210mm !important;
+    margin:0 !important;
+  }
+  .page {
+    margin:0 !important;
+    width:210mm !important;
+    height:297mm !important;
+    min-height:297mm !important;
+    max-height:297mm !important;
+    box-sizing:border-box !important;
+    page-break-after:always !important;
+    break-after:page !important;
+  }
+  .page:last-child {
+    page-break-after:auto !important;
+    break-after:auto !important;
+  }
+}
+</style>
+"""
+
+@lru_cache(maxsize=None)
+def illust_css() -> str:
+    # イラストは CSS の背景として1回だけ埋め込む（一括印刷でも人数分の画像を重複させない）
+    src = assets.illust_src()
+    if src is None:
+        return "<style>.illust { display:none; }</style>"
+    size = assets.illust_size()
+    ratio = f"{size[0]} / {size[1]}" if size else "1 / 1"
+    return f'<style>.illust {{ aspect-ratio:{ratio}; background:url("{src}") center / contain no-repeat; }}</style>'
+
+# =========================
+# 言語ごとのひな形（言語ごとに一度だけ作る）
+# =========================
+PERMA_KEYS = ("P", "E", "R", "M", "A")
+TOTAL_KEY = "心の健康の総合得点"
+EXTRA_GRID = (("からだの調子", "気持ちの様子（いやな気持）"), ("全体的なしあわせ感", "ひとりぼっち感"))
+
+@dataclass(frozen=True)
+class PageTemplates:
+    lang: str
+    page1: tuple               # _compile 済み。{id} {P}〜{A} {chart} {total} {x0}〜{x3} を差し込む
+    page2: tuple               # {strong} {actions}
+    id_label: str
+    points: str
+    unanswered: str
+    meter_titles: dict         # 領域キー → メーターの見出し
+    strong_titles: dict
+    action_titles: dict        # PERMA キー → 行動例の見出しの HTML
+    actions: dict              # PERMA キー → 行動例（見出しと言語ファイルの既定のリスト）の HTML
+    no_strong: str
+    no_weak: str
+
+def _compile(tpl: str) -> tuple:
+    # str.format 形式のひな形を (固定の文字列, 差し込む名前) の並びにしておく（描画のたびに解析しない）
+    return tuple((lit, name) for lit, name, _, _ in string.Formatter().parse(tpl))
+
+def _fill(parts: tuple, values: dict) -> str:
+    return "".join([lit + values[name] if name is not None else lit for lit, name in parts])
+
+def _esc(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+@lru_cache(maxsize=None)
+def templates(lang: str = "ja") -> PageTemplates:
+    b = i18n.bundle(lang)
+    t = {k: _esc(v) if isinstance(v, str) else v for k, v in b.text.items()}
+    labels = {k: _esc(v) for k, v in b.full_labels.items()}
+    meter_titles = {k: b["meter_title"].format(key=k, label=b.full_labels[k]) for k in PERMA_KEYS}
+    meter_titles.update(b.extra_labels)
+    colon = t["colon"]
+    howto = "".join(f'<li><b>{_esc(b["key_label"].format(key=k, label=b.full_labels[k]))}</b>{colon}{_esc(b.descriptions[k])}</li>'
+                    for k in PERMA_KEYS)
+    meaning = "".join(f"<li><b>{_esc(b.extra_labels[k])}</b>{colon}{_esc(v)}</li>" for k, v in b.extras_explanations.items())
+    perma = "".join(f"<li><b>{k}</b>{colon}{labels[k]}</li>" for k in PERMA_KEYS)
+    scale = "".join(f"<li>{_esc(s)}</li>" for s in t["scale_points"])
+    usage = "".join(f"<li><b>{_esc(h)}</b>{colon}{_esc(s)}</li>" if h else f"<li>{_esc(s)}</li>" for h, s in t["usage_points"])
+    contact = "<br>".join(_esc(s) for s in t["contact"])
+    page1 = f"""<div class="page page1" lang="{lang}">
+<div class="header">{{id}}<div class="title">{t["title"]}</div><div class="name-box"><div class="name-label">{t["name_label"]}</div><div class="name-line"></div></div></div>
+<div class="note"><b>{t["intro_title"]}</b><br>{t["intro"]}</div>
+<div class="section">{t["section_1_1"]}</div>
+<div class="grid-main"><div class="grid-2"><div>{{P}}{{E}}{{R}}</div><div>{{M}}{{A}}</div></div>{{chart}}</div>
+<div class="note"><b>{t["howto_title"]}</b><ul class="ul-note">{howto}</ul></div>
+<div class="section">{t["section_1_2"]}</div>
+{{total}}
+<div class="grid-2"><div>{{x0}}{{x1}}</div><div>{{x2}}{{x3}}</div></div>
+<div class="note"><b>{t["meaning_title"]}</b><ul class="ul-note">{meaning}</ul></div>
+</div>"""
+    page2 = f"""<div class="page page2" lang="{lang}">
+<div class="section">{t["section_2_1"]}</div>
+{{strong}}
+<div class="section">{t["section_2_2"]}</div>
+<div class="action-layout"><div><div class="note compact">{t["weak_note"]}</div>{{actions}}</div><div><div class="illust"></div></div></div>
+<div class="section">{t["section_3"]}</div>
+<div class="perma-box"><b><span class="perma-highlight">{t["about_title"]}</span></b><br>{t["about"]}</div>
+<div class="note compact"><b>{t["perma_title"]}</b><ul class="ul-note">{perma}</ul></div>
+<div class="note compact"><b>{t["scale_title"]}</b><ul class="ul-note">{scale}</ul></div>
+<div class="note compact"><b>{t["usage_title"]}</b><ul class="ul-note">{usage}</ul></div>
+<div class="note cite compact"><b>{t["cite_title"]}</b><br>Butler, J., &amp; Kern, M. L. (2016). <i>The PERMA-Profiler: A brief multidimensional measure of flourishing</i>. <i>International Journal of Wellbeing</i>, 6(3), 1–48. https://doi.org/10.5502/ijw.v6i3.526</div>
+<div class="footer"><b>{t["contact_title"]}</b><br>{contact}<br><b>{t["thanks"]}</b></div>
+</div>"""
+    action_titles, actions = {}, {}
+    for k in PERMA_KEYS:
+        items = "".join([f"<li>{tip}</li>" for tip in b.tips[k]])
+        title = b["action_title"].format(key=k, label=b.full_labels[k])
+        action_titles[k] = f'<div class="action-title">{action_emojis[k]} {title}</div>'
+        actions[k] = f'{action_titles[k]}<ul class="action-list">{items}</ul>'
+    return PageTemplates(
+        lang=lang,
+        page1=_compile(page1),
+        page2=_compile(page2),
+        id_label=b["id_label"],
+        points=b["points"],
+        unanswered=b["unanswered"],
+        meter_titles=meter_titles,
+        strong_titles={k: b["strong_title"].format(key=k, label=b.full_labels[k]) for k in PERMA_KEYS},
+        action_titles=action_titles,
+        actions=actions,
+        no_strong=f'<div class="note compact">{b["no_strong"]}</div>',
+        no_weak=f'<div class="note compact">{b["no_weak"]}</div>',
+    )
+
+# =========================
+# 部品
+# =========================
+def score_html(score, tpl: Optional[PageTemplates] = None):
+    tpl = tpl or templates()
+    return tpl.unanswered if np.isnan(score) else f"<strong>{score:.1f}</strong><span>{tpl.points}</span>"
+
+def meter_card(title, score, color, big=False, tpl: Optional[PageTemplates] = None):
+    cls = "score big" if big else "score"
+    return f'<div class="card"><div class="card-title">{title}</div><div class="meter">{svg.meter_svg(svg.score_key(score), color)}</div><div class="{cls}">{score_html(score, tpl)}</div></div>'
+
+def chart_html(perma_scores):
+    return f'<div class="chart-box"><div class="chart-title">PERMA</div>{svg.perma_chart_svg(perma_scores, colors)}</div>'
+
+def strong_html(perma_scores: dict, strong_keys: list[str], tpl: Optional[PageTemplates] = None) -> str:
+    tpl = tpl or templates()
+    out = "".join([meter_card(tpl.strong_titles[k], perma_scores[k], colors[k], tpl=tpl) for k in strong_keys])
+    return out or tpl.no_strong
+
+def action_html(weak_keys: list[str], tpl: Optional[PageTemplates] = None, tips: Optional[dict] = None) -> str:
+    # tips：領域キー → その人向けの行動例（parma/tips.py）。なければ言語ファイルの既定の行動例
+    tpl = tpl or templates()
+    if tips is None:
+        return "".join([tpl.actions[k] for k in weak_keys]) or tpl.no_weak
+    out = []
+    for k in weak_keys:
+        items = "".join([f"<li>{html.escape(t)}</li>" for t in tips.get(k, ())])
+        out.append(f'{tpl.action_titles[k]}<ul class="action-list">{items}</ul>')
+    return "".join(out) or tpl.no_weak
+
+# =========================
+# ページ
+# =========================
+def render_page1(perma_scores: dict, extras: dict, sid: Optional[str] = None, lang: str = "ja") -> str:
+    # sid を渡すと（一括印刷用に）ヘッダー左に ID を表示する
+    tpl = templates(lang)
+    values = {
+        "id": f'<div class="sid">{tpl.id_label}{html.escape(str(sid))}</div>' if sid is not None else "<div></div>",
+        "chart": chart_html(perma_scores),
+        "total": meter_card(tpl.meter_titles[TOTAL_KEY], extras.get(TOTAL_KEY, np.nan), extra_colors[TOTAL_KEY], True, tpl),
+    }
+    for k in PERMA_KEYS:
+        values[k] = meter_card(tpl.meter_titles[k], perma_scores.get(k, np.nan), colors[k], tpl=tpl)
+    for i, k in enumerate(k for col in EXTRA_GRID for k in col):
+        values[f"x{i}"] = meter_card(tpl.meter_titles[k], extras.get(k, np.nan), extra_colors[k], tpl=tpl)
+    return _fill(tpl.page1, values)
+
+def render_page2(perma_scores: dict, weak_keys: list[str], strong_keys: list[str], lang: str = "ja",
+                 tips: Optional[dict] = None) -> str:
+    tpl = templates(lang)
+    return _fill(tpl.page2, {"strong": strong_html(perma_scores, strong_keys, tpl), "actions": action_html(weak_keys, tpl, tips)})
+
+def render_report(perma_scores: dict, extras: dict, weak_keys: list[str], strong_keys: list[str], sid: Optional[str] = None,
+                  lang: str = "ja", tips: Optional[dict] = None) -> str:
+    return f'<div class="report">{render_page1(perma_scores, extras, sid, lang)}{render_page2(perma_scores, weak_keys, strong_keys, lang, tips)}</div>'
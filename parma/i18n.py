@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# 設定
+# =========================
+LOCALE_DIR = Path(__file__).parent / "locales"
+LANGS = ("ja", "en", "pt")
+REFERENCE_LANG = "ja"          # ほかの言語はこれと同じキーをそろえる
+LANG_ENV = "PARMA_LANG"        # 言語の列がない・空欄の人の言語（既定 ja）
+LANG_COLUMNS = ("言語", "language", "lang", "idioma", "língua", "lingua")
+
+# 言語ファイルの中身のうち、文字列の一覧・対応表になっているもの
+LIST_KEYS = ("aliases", "scale_points", "usage_points", "contact")
+DICT_KEYS = ("full_labels", "descriptions", "extra_labels", "extras_explanations", "tips")
+
+
+class LocaleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Bundle:
+    lang: str
+    text: dict                 # ページの文言（HTML では <b>・<br>・<span class="perma-highlight"> を使える）
+    full_labels: dict
+    descriptions: dict
+    extra_labels: dict         # 採点スキーマの領域キー → 表示名
+    extras_explanations: dict
+    tips: dict
+
+    def __getitem__(self, key: str):
+        return self.text[key]
+
+# =========================
+# 読み込み・検証
+# =========================
+def _read(lang: str) -> dict:
+    path = LOCALE_DIR / f"{lang}.json"
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise LocaleError(f"言語ファイルがありません：{path}") from None
+    except json.JSONDecodeError as e:
+        raise LocaleError(f"{path.name} が JSON として読めません：{e}") from None
+
+def _check(lang: str, raw: dict, ref: dict):
+    missing = sorted(set(ref) - set(raw))
+    if missing:
+        raise LocaleError(f"{lang}.json に {missing} がありません。")
+    for key in DICT_KEYS:
+        lack = sorted(set(ref[key]) - set(raw[key]))
+        if lack:
+            raise LocaleError(f"{lang}.json の {key} に {lack} がありません。")
+    for key in ("meter_title", "key_label", "strong_title", "action_title"):
+        try:
+            raw[key].format(key="P", label="")
+        except (KeyError, IndexError, ValueError):
+            raise LocaleError(f"{lang}.json の {key} に使えるのは {{key}} と {{label}} だけです。") from None
+
+@lru_cache(maxsize=None)
+def bundle(lang: str) -> Bundle:
+    # 言語ごとに一度だけ読み込み・検証する
+    if lang not in LANGS:
+        raise LocaleError(f"言語は {LANGS} のいずれかにしてください。")
+    raw = _read(lang)
+    _check(lang, raw, raw if lang == REFERENCE_LANG else _read(REFERENCE_LANG))
+    text = {k: v for k, v in raw.items() if k not in DICT_KEYS}
+    return Bundle(lang, text, *(raw[k] for k in DICT_KEYS))
+
+def bundle_sources() -> tuple[bytes, ...]:
+    # 出力の保存（parma/artifacts.py）のテンプレートの版に含める
+    return tuple((LOCALE_DIR / f"{lang}.json").read_bytes() for lang in LANGS)
+
+# =========================
+# 回答者ごとの言語
+# =========================
+def default_lang() -> str:
+    lang = os.environ.get(LANG_ENV) or REFERENCE_LANG
+    if lang not in LANGS:
+        raise LocaleError(f"{LANG_ENV} は {LANGS} のいずれかにしてください。")
+    return lang
+
+@lru_cache(maxsize=1)
+def _aliases() -> dict[str, str]:
+    out = {}
+    for lang in LANGS:
+        for a in (lang, bundle(lang).text["name"], *bundle(lang).text["aliases"]):
+            out[str(a).strip().casefold()] = lang
+    return out
+
+def normalize_lang(value, default: Optional[str] = None) -> str:
+    # "English"・"en"・"pt-BR"・"英語" など → 言語コード。空欄・不明なら default
+    default = default or default_lang()
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return default
+    return _aliases().get(str(value).strip().casefold(), default)
+
+def language_column(df: "pd.DataFrame"):
+    names = {str(c).strip().casefold(): c for c in df.columns[1:]}
+    for name in LANG_COLUMNS:
+        if name.casefold() in names:
+            return names[name.casefold()]
+    return None
+
+def row_langs(df: "pd.DataFrame", default: Optional[str] = None, column=None) -> np.ndarray:
+    # 1行ずつの言語コード。値の種類ごとに1回だけ変換する（行数によらず速い）
+    default = default or default_lang()
+    column = column if column is not None else language_column(df)
+    if column is None:
+        return np.full(len(df), default, dtype=object)
+    codes, uniques = df[column].factorize()
+    table = np.array([normalize_lang(u, default) for u in uniques] + [default], dtype=object)
+    return table[codes]   # 空欄は -1 → 末尾の default
+
+def precompile(langs: Iterable[str] = LANGS):
+    # 起動時に全言語を読み込み、HTML のひな形も作っておく（一括出力の途中で読み込まないように）
+    from parma import html_report
+
+    for lang in langs:
+        html_report.templates(lang)
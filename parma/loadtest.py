@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# =========================
+# アップロードの代わり（試験用に起動したサーバーの中だけで使う）
+# =========================
+UPLOAD_ENV = "PARMA_LOADTEST_UPLOAD"
+
+@lru_cache(maxsize=4)
+def _standin_bytes(path: str) -> bytes:
+    return Path(path).read_bytes()
+
+def standin_upload() -> Optional[io.BytesIO]:
+    # 環境変数 PARMA_LOADTEST_UPLOAD が設定され、URL に ?loadtest=1 が付いているときだけ、そのファイルをアップロードされたものとして返す
+    path = os.environ.get(UPLOAD_ENV)
+    if not path:
+        return None
+    import streamlit as st
+
+    if st.query_params.get("loadtest") != "1":
+        return None
+    buf = io.BytesIO(_standin_bytes(path))
+    buf.name = Path(path).name
+    return buf
+
+def install_standin():
+    # st.file_uploader を「何も選ばれていなければ代用品を返す」ものに差し替える（アプリのコードは変えない）
+    import streamlit as st
+
+    if getattr(st.file_uploader, "parma_standin", False):
+        return
+    original = st.file_uploader
+
+    def file_uploader(*args, **kwargs):
+        return original(*args, **kwargs) or standin_upload()
+    file_uploader.parma_standin = True
+    st.file_uploader = file_uploader
+
+# 試験用のサーバーは、代用品を組み込んでから対象のアプリを動かすこのスクリプトで起動する
+WRAPPER = """# -*- coding: utf-8 -*-
+import runpy
+import sys
+
+sys.path.insert(0, {root!r})
+from parma.loadtest import install_standin
+
+install_standin()
+runpy.run_path({script!r}, run_name="__main__")
+"""
+
+def write_wrapper(script: str, dest_dir: Path) -> Path:
+    script_path = Path(script).resolve()
+    root = str(Path(__file__).resolve().parent.parent)
+    dest = dest_dir / f"loadtest_{script_path.stem}.py"
+    dest.write_text(WRAPPER.format(root=root, script=str(script_path)), encoding="utf-8")
+    return dest
+
+# =========================
+# 試験用の回答ファイル
+# =========================
+def synthetic_workbook(path: Path, rows: int, seed: int = 0) -> Path:
+    import pandas as pd
+
+    from parma.scoring import load_schema
+
+    schema = load_schema()
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ID": [f"T{i:05d}" for i in range(rows)],
+        "施設": rng.choice(["北", "南", "東", "西"], rows),
+        "年代": rng.choice(["60代", "70代", "80代"], rows),
+    })
+    lo, hi = int(schema.scale_min), int(schema.scale_max)
+    for c in schema.columns:
+        df[c] = rng.integers(lo, hi + 1, rows)
+    df.to_excel(path, index=False)
+    return path
+
+# =========================
+# 擬似セッション（ブラウザの代わりに WebSocket でやり取りする）
+# =========================
+class _Session:
+    def __init__(self, url: str):
+        self.url = url
+        self.ws = None
+        self.widgets: dict[str, tuple] = {}   # ラベル → (要素, fragment_id)
+
+    async def __aenter__(self):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, states=(), fragment_id: str = "") -> float:
+        # 再実行を1回要求し、スクリプトが終わるまでの時間（ms）を返す。表示されたウィジェットを覚えておく
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = "loadtest=1"
+        msg.rerun_script.widget_states.widgets.extend(states)
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            f = ForwardMsg()
+            f.ParseFromString(await self.ws.recv())
+            kind = f.WhichOneof("type")
+            if kind == "delta" and f.delta.WhichOneof("type") == "new_element":
+                el = f.delta.new_element
+                body = getattr(el, el.WhichOneof("type"))
+                label = getattr(body, "label", "")
+                if label and hasattr(body, "id"):
+                    self.widgets[label] = (body, f.delta.fragment_id)
+            elif kind == "script_finished":
+                if f.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("アプリの実行に失敗しました")
+                if f.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return (time.perf_counter() - t0) * 1000
+
+    def click(self, label: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        body, fragment_id = self.widgets[label]
+        return [WidgetState(id=body.id, trigger_value=True)], fragment_id
+
+    def choose(self, label: str, value: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        body, fragment_id = self.widgets[label]
+        return [WidgetState(id=body.id, string_value=value)], fragment_id
+
+async def _user(url: str, steps: int, think_s: float, rng: random.Random) -> list[tuple[str, float]]:
+    # アップロード → ID を選んで表示 → 前へ／次へ／ID へ移動 を steps 回
+    out = []
+    async with _Session(url) as s:
+        out.append(("upload", await s.rerun()))
+        ids = list(s.widgets["IDを選んでください"][0].options)
+        states, _ = s.choose("IDを選んでください", rng.choice(ids))
+        states += s.click("このIDで結果を表示")[0]
+        out.append(("open", await s.rerun(states)))
+        for _ in range(steps):
+            await asyncio.sleep(think_s * rng.uniform(0.5, 1.5))
+            r = rng.random()
+            if r < 0.1:
+                action, (states, frag) = "jump", s.choose("IDへ移動", rng.choice(ids))
+            elif r < 0.2 and not s.widgets["◀ 前へ"][0].disabled:
+                action, (states, frag) = "prev", s.click("◀ 前へ")
+            elif not s.widgets["次へ ▶"][0].disabled:
+                action, (states, frag) = "next", s.click("次へ ▶")
+            else:
+                action, (states, frag) = "jump", s.choose("IDへ移動", rng.choice(ids))
+            out.append((action, await s.rerun(states, frag)))
+    return out
+
+# =========================
+# サーバー（計測対象）
+# =========================
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def start_server(script: str, workbook: Path, port: int, wrap_dir: Path, timeout: float = 60) -> subprocess.Popen:
+    env = dict(os.environ, **{UPLOAD_ENV: str(workbook)})
+    wrapper = write_wrapper(script, wrap_dir)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(wrapper), "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Streamlit サーバーが起動しませんでした")
+
+# =========================
+# 計測
+# =========================
+async def _level(url: str, n: int, steps: int, think_s: float, pid: Optional[int], seed: int) -> dict:
+    peak = 0
+    done = asyncio.Event()
+
+    async def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, _rss(pid)) if pid else 0
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample())
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[
+        _user(url, steps, think_s, random.Random(seed * 1000 + i)) for i in range(n)
+    ], return_exceptions=True)
+    wall = time.perf_counter() - t0
+    done.set()
+    await sampler
+
+    errors = [repr(r) for r in results if isinstance(r, BaseException)]
+    samples = [x for r in results if not isinstance(r, BaseException) for x in r]
+    ms = np.array([m for _, m in samples]) if samples else np.array([np.nan])
+    nav = np.array([m for a, m in samples if a in ("next", "prev", "jump")] or [np.nan])
+    p = lambda a, q: round(float(np.percentile(a, q)), 1) if not np.isnan(a).all() else None
+    return {
+        "sessions": n,
+        "reruns": len(samples),
+        "throughput_per_s": round(len(samples) / wall, 1),
+        "p50_ms": p(ms, 50), "p95_ms": p(ms, 95), "p99_ms": p(ms, 99),
+        "nav_p50_ms": p(nav, 50), "nav_p95_ms": p(nav, 95), "nav_p99_ms": p(nav, 99),
+        "rss_peak_mb": round(peak / 2**20, 1) if pid else None,
+        "rss_after_mb": round(_rss(pid) / 2**20, 1) if pid else None,
+        "errors": errors[:5],
+    }
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m parma.loadtest", description="app.py の負荷試験（同時セッション数を増やしながら計測）")
+    parser.add_argument("script", nargs="?", default="app.py", help="対象のアプリ（既定：app.py）")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20], help="同時セッション数（段階ごと）")
+    parser.add_argument("--steps", type=int, default=20, help="1セッションあたりの ID 切り替え回数")
+    parser.add_argument("--think-ms", type=float, default=0, help="操作の間隔（平均 ms。0 なら待たずに続ける）")
+    parser.add_argument("--workbook", default=None, help="アップロードの代わりに使う回答ファイル（既定：試験用に生成）")
+    parser.add_argument("--rows", type=int, default=300, help="生成する回答ファイルの人数")
+    parser.add_argument("--url", default=None, help="起動済みサーバーの WebSocket URL（指定時はサーバーを起動しない。メモリは計測しない）")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="どこかの段階で p95 がこれを超えたら終了コード 1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write-wrapper", metavar="DIR", default=None,
+                        help="--url で使うサーバーの起動用スクリプトを DIR に書き出して終了する")
+    args = parser.parse_args(argv)
+
+    if args.write_wrapper:
+        print(write_wrapper(args.script, Path(args.write_wrapper)))
+        return
+
+    proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if url is None:
+            workbook = Path(args.workbook) if args.workbook else synthetic_workbook(Path(tmp) / "loadtest.xlsx", args.rows, args.seed)
+            port = _free_port()
+            proc = start_server(args.script, workbook.resolve(), port, Path(tmp))
+            url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        failed = False
+        try:
+            for n in args.sessions:
+                rec = asyncio.run(_level(url, n, args.steps, args.think_ms / 1000, proc.pid if proc else None, args.seed))
+                failed |= bool(rec["errors"]) or (args.max_p95_ms is not None and (rec["p95_ms"] or 0) > args.max_p95_ms)
+                print(json.dumps(rec, ensure_ascii=False), flush=True)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=10)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
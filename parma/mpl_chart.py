@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# PERMA の棒グラフを matplotlib で描く（論文・配布資料用。画面・HTML・PDF のレポートは parma/svg.py）
+# pyplot は使わず、Agg の Figure を使い回して棒の高さと数値だけを書き換える
+import io
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from parma.content import colors
+
+# =========================
+# 設定
+# =========================
+POOL_ENV = "PARMA_CHART_POOL"   # 使い回す図の数（既定：CPU 数）
+KEYS = ("P", "E", "R", "M", "A")
+FIGSIZE = (2.25, 1.7)
+DPI = 150
+FORMATS = ("png", "svg", "pdf", "rgba")
+LABEL_OFFSET = 0.18
+FONT_ENV = "PARMA_CHART_FONT"   # 日本語フォントのファイル（.ttf / .otf）。なければ下の名前から入っているものを使う
+FONT_FAMILIES = ("BIZ UDPGothic", "Meiryo", "Noto Sans JP", "IPAGothic", "IPAexGothic", "DejaVu Sans")
+PNG_COMPRESS = 3   # 背景は不透明なので RGB で保存（アルファなし・圧縮は速さ優先）
+BATCH_PER_WORKER = 32   # 並列時に一度に投入する数（スレッドあたり）。出力を溜め込みすぎないように
+
+# 図を作るとき（フォントの読み込みなど）だけは1つずつ行う
+_build_lock = threading.Lock()
+
+_families: Optional[list[str]] = None
+
+def _font_family() -> list[str]:
+    # 入っているフォントだけを並べる（足りない字は次のフォントで描く）。_build_lock の中で呼ぶ
+    global _families
+    if _families is None:
+        from matplotlib import font_manager
+
+        path = os.environ.get(FONT_ENV)
+        if path and os.path.exists(path):
+            font_manager.fontManager.addfont(path)
+            first = [font_manager.FontProperties(fname=path).get_name()]
+        else:
+            first = []
+        installed = {f.name for f in font_manager.fontManager.ttflist}
+        _families = [*first, *(f for f in FONT_FAMILIES if f in installed and f not in first)] or ["sans-serif"]
+    return _families
+
+# =========================
+# 図のひな形（1つの図は同時に1つのスレッドだけが使う）
+# =========================
+class ChartTemplate:
+    # 軸・目盛りなど変わらない部分は一度だけ描いて画素を取っておき（背景）、
+    # ラスター出力では背景を戻して棒・数値・タイトルだけを描き足す
+    def __init__(self, title: str = "PERMA"):
+        with _build_lock:
+            family = _font_family()
+            self.fig = Figure(figsize=FIGSIZE, dpi=DPI)
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.ax = ax = self.fig.add_subplot()
+            self.bars = ax.bar(KEYS, [0.0] * len(KEYS), color=[colors[k] for k in KEYS])
+            ax.tick_params(labelfontfamily=family)
+            ax.set_ylim(0, 10)
+            ax.set_yticks([])
+            self.title = ax.set_title(title, fontsize=10, fontfamily=family)
+            self.labels = [ax.text(i, 0, "", ha="center", va="bottom", fontsize=8, fontfamily=family, visible=False)
+                           for i in range(len(KEYS))]
+            self.fig.tight_layout(pad=0.4)
+            # 枠線は棒より手前に描かれるので、背景に含めず棒のあとに描く。タイトルは人ごとに変わるので背景に含めない
+            self._moving = sorted([*self.bars, *ax.spines.values(), *self.labels, self.title],
+                                  key=lambda a: a.get_zorder())
+            for a in self._moving:
+                a.set_animated(True)
+            self._background = None
+
+    def update(self, values: Iterable[float], title: Optional[str] = None):
+        # 棒の高さと上の数値だけを差し替える（軸・目盛り・余白は作り直さない）
+        for bar, label, v in zip(self.bars, self.labels, values):
+            v = float(v)
+            if np.isnan(v):
+                bar.set_height(0.0)
+                label.set_visible(False)
+            else:
+                bar.set_height(v)
+                label.set_y(v + LABEL_OFFSET)
+                label.set_text(f"{v:.1f}")
+                label.set_visible(True)
+        if title is not None:
+            self.title.set_text(title)
+
+    def _draw(self):
+        if self._background is None:
+            self.canvas.draw()
+            self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        else:
+            self.canvas.restore_region(self._background)
+        for a in self._moving:
+            self.ax.draw_artist(a)
+
+    def render(self, fmt: str = "png"):
+        # png / svg / pdf はバイト列、rgba は (高さ, 幅, 4) の配列（コピー）
+        if fmt in ("png", "rgba"):
+            self._draw()
+            rgba = np.asarray(self.canvas.buffer_rgba())
+            if fmt == "rgba":
+                return rgba.copy()
+            from PIL import Image
+
+            buf = io.BytesIO()
+            Image.fromarray(rgba).convert("RGB").save(buf, format="png", dpi=(DPI, DPI), compress_level=PNG_COMPRESS)
+            return buf.getvalue()
+        # ベクター形式は毎回全体を書き出す（棒と数値も通常の描画に戻す）
+        for a in self._moving:
+            a.set_animated(False)
+        try:
+            buf = io.BytesIO()
+            self.fig.savefig(buf, format=fmt)
+            return buf.getvalue()
+        finally:
+            for a in self._moving:
+                a.set_animated(True)
+
+# =========================
+# 図の使い回し
+# =========================
+class ChartPool:
+    # size 個までの図を作って使い回す。すべて使用中なら空くまで待つ
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or int(os.environ.get(POOL_ENV) or 0) or os.cpu_count() or 1
+        self._free: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[ChartTemplate]:
+        tpl = self._take()
+        try:
+            yield tpl
+        finally:
+            self._free.put(tpl)
+
+    def _take(self) -> ChartTemplate:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        return ChartTemplate() if create else self._free.get()
+
+    def render(self, perma_scores: dict, fmt: str = "png", title: Optional[str] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"形式は {FORMATS} のいずれかにしてください。")
+        with self.acquire() as tpl:
+            tpl.update([perma_scores.get(k, np.nan) for k in KEYS], "PERMA" if title is None else title)
+            return tpl.render(fmt)
+
+    def render_many(self, items: Iterable[tuple[dict, Optional[str]]], fmt: str = "png",
+                    workers: Optional[int] = None) -> Iterator:
+        # (PERMA の得点, タイトル) を順に描き、同じ順で返す。スレッド数は図の数まで
+        workers = min(workers or self.size, self.size)
+        if workers <= 1:
+            for scores, title in items:
+                yield self.render(scores, fmt, title)
+            return
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parma-chart") as ex:
+            while batch := list(itertools.islice(items, workers * BATCH_PER_WORKER)):
+                yield from ex.map(lambda it: self.render(it[0], fmt, it[1]), batch)
+
+_pool: Optional[ChartPool] = None
+_pool_lock = threading.Lock()
+
+def chart_pool() -> ChartPool:
+    # プロセスで1つ
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ChartPool()
+        return _pool
+
+def perma_chart(perma_scores: dict, fmt: str = "png", title: Optional[str] = None):
+    return chart_pool().render(perma_scores, fmt, title)
@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+import html
+import io
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from parma import assets, i18n
+from parma.content import colors, extra_colors
+
+PERMA_KEYS = ("P", "E", "R", "M", "A")
+
+# =========================
+# フォント
+# =========================
+FONT_ENV = "PARMA_PDF_FONT"
+FONT_PATHS = (
+    "/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+)
+FONT_NAME = "IPAGothic"
+FALLBACK_FONT = "HeiseiKakuGo-W5"
+
+@lru_cache(maxsize=1)
+def register_font() -> str:
+    # fonts-ipafont-gothic があれば TTF を登録（文書ごとにサブセットを1回だけ埋め込む）。
+    # なければ reportlab 内蔵の CID フォント（埋め込みなし）を使う
+    for path in (os.environ.get(FONT_ENV), *FONT_PATHS):
+        if path and os.path.exists(path):
+            pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+            return FONT_NAME
+    pdfmetrics.registerFont(UnicodeCIDFont(FALLBACK_FONT))
+    return FALLBACK_FONT
+
+@lru_cache(maxsize=64)
+def _color(hex_str: str) -> HexColor:
+    return HexColor(hex_str)
+
+# =========================
+# 描画の記録と再生
+# =========================
+class PageRecorder:
+    # canvas と同じ呼び出しを受け、ワーカー側で PDF 演算子まで組み立てておく。
+    # 図形・色・線幅は文書に依存しないので作業用 canvas でその場で文字列化し、
+    # フォントに依存する文字描画（TTF のサブセット番号は文書ごとに決まる）だけを結合時に再生する
+    TEXT_OPS = frozenset({"setFont", "drawString", "drawCentredString", "drawRightString", "showPage", "drawIllust"})
+
+    def __init__(self):
+        self.ops: list[tuple] = []
+        self._scratch = canvas.Canvas(io.BytesIO())
+
+    def __getattr__(self, name):
+        if name in self.TEXT_OPS:
+            def record(*args, **kwargs):
+                self.ops.append((name, args, kwargs))
+            return record
+
+        method = getattr(self._scratch, name)
+        def literal(*args, **kwargs):
+            code = self._scratch._code
+            start = len(code)
+            method(*args, **kwargs)
+            s = "\n".join(code[start:])
+            del code[start:]
+            if not s:
+                return
+            if self.ops and self.ops[-1][0] == "addLiteral":
+                self.ops[-1] = ("addLiteral", (self.ops[-1][1][0] + "\n" + s,), {})
+            else:
+                self.ops.append(("addLiteral", (s,), {}))
+        return literal
+
+def replay(c: canvas.Canvas, ops: list[tuple]):
+    for name, args, kwargs in ops:
+        if name == "drawIllust":
+            draw_illust(c, *args)
+        else:
+            getattr(c, name)(*args, **kwargs)
+
+# =========================
+# イラスト（画像 XObject は文書に1回だけ埋め込まれる）
+# =========================
+@lru_cache(maxsize=1)
+def _illust_reader() -> Optional[ImageReader]:
+    data = assets.illust_png()
+    return ImageReader(io.BytesIO(data)) if data else None
+
+def draw_illust(c, x: float, y: float, w: float, h: float):
+    if isinstance(c, PageRecorder):
+        c.drawIllust(x, y, w, h)
+        return
+    reader = _illust_reader()
+    if reader is not None:
+        # reportlab は同じ画像データを文書内で1つの XObject にまとめる
+        c.drawImage(reader, x, y, w, h, mask="auto")
+
+# =========================
+# レイアウト部品
+# =========================
+PAGE_W, PAGE_H = A4
+MARGIN_X = 8 * mm
+MARGIN_TOP = 7 * mm
+CONTENT_W = PAGE_W - 2 * MARGIN_X
+GAP = 2.2 * mm
+
+# 英語・ポルトガル語の単語（後ろの空白ごと）はひとかたまり、それ以外は1文字ずつ
+_UNITS = re.compile(r"[0-9A-Za-zÀ-ÖØ-öø-ÿ'’.,;:!?()\-/]+ *|.", re.S)
+
+def _wrap(text: str, font: str, size: float, width: float) -> list[str]:
+    # 日本語は空白で区切れないので1文字ずつ、欧文は単語ごとに幅を測って折り返す
+    lines, cur, w = [], "", 0.0
+    for unit in _UNITS.findall(text):
+        uw = pdfmetrics.stringWidth(unit.rstrip(" "), font, size)
+        if cur and w + uw > width:
+            lines.append(cur.rstrip(" "))
+            cur, w = "", 0.0
+        if uw > width:
+            # 1行に収まらない長い単語（URL など）は1文字ずつ
+            for ch in unit:
+                cw = pdfmetrics.stringWidth(ch, font, size)
+                if cur and w + cw > width:
+                    lines.append(cur)
+                    cur, w = "", 0.0
+                cur += ch
+                w += cw
+            continue
+        cur += unit
+        w += pdfmetrics.stringWidth(unit, font, size)
+    lines.append(cur.rstrip(" "))
+    return lines
+
+# =========================
+# 文言（言語ごとに1回だけ作る）
+# =========================
+_TAGS = re.compile(r"<[^>]+>")
+
+def _plain(s: str) -> str:
+    # 言語ファイルの文言は HTML 用なので、タグを除いて PDF 用の文字列にする
+    return html.unescape(_TAGS.sub("", s))
+
+@lru_cache(maxsize=None)
+def pdf_text(lang: str = "ja") -> dict:
+    b = i18n.bundle(lang)
+    t = {k: _plain(v) for k, v in b.text.items() if isinstance(v, str)}
+    colon = t["colon"]
+    t["meter_titles"] = {k: b["meter_title"].format(key=k, label=b.full_labels[k]) for k in PERMA_KEYS}
+    t["action_titles"] = {k: _plain(b["action_title"].format(key=k, label=b.full_labels[k])) for k in PERMA_KEYS}
+    t["howto"] = [(b["key_label"].format(key=k, label=b.full_labels[k]) + colon, b.descriptions[k]) for k in PERMA_KEYS]
+    t["meaning"] = [(b.extra_labels[k] + colon, v) for k, v in b.extras_explanations.items()]
+    t["perma"] = [(k + colon, b.full_labels[k]) for k in PERMA_KEYS]
+    t["scale"] = [("", _plain(s)) for s in b["scale_points"]]
+    t["usage"] = [(_plain(h) + colon if h else "", _plain(s)) for h, s in b["usage_points"]]
+    t["footer"] = [t["contact_title"], *(_plain(s) for s in b["contact"]), t["thanks"]]
+    t["extra_labels"] = b.extra_labels
+    t["tips"] = b.tips
+    return t
+
+class _Pen:
+    def __init__(self, c, font: str, lang: str = "ja"):
+        self.c = c
+        self.font = font
+        self.t = pdf_text(lang)
+        self.y = PAGE_H - MARGIN_TOP
+        self._fill = None
+        self._size = None
+
+    def fill(self, color: str):
+        # 同じ色・同じ文字サイズの指定は出力しない（結合時に再生する命令を減らす）
+        if color != self._fill:
+            self.c.setFillColor(_color(color))
+            self._fill = color
+
+    def text(self, x: float, y: float, s: str, size: float, color: str = "#222222", anchor: str = "left"):
+        self.fill(color)
+        if size != self._size:
+            self.c.setFont(self.font, size)
+            self._size = size
+        if anchor == "center":
+            self.c.drawCentredString(x, y, s)
+        elif anchor == "right":
+            self.c.drawRightString(x, y, s)
+        else:
+            self.c.drawString(x, y, s)
+
+    def box(self, x: float, y: float, w: float, h: float, stroke: Optional[str] = "#E2E7F2",
+            fill: Optional[str] = None, radius: float = 2.5 * mm, line_width: float = 0.8):
+        c = self.c
+        c.setLineWidth(line_width)
+        if stroke:
+            c.setStrokeColor(_color(stroke))
+        if fill:
+            self.fill(fill)
+        c.roundRect(x, y, w, h, radius, stroke=1 if stroke else 0, fill=1 if fill else 0)
+
+    def section(self, title: str):
+        h = 7.5 * mm
+        self.y -= h
+        self.box(MARGIN_X, self.y, CONTENT_W, h, stroke=None, fill="#EEF2FB", radius=2 * mm)
+        self.fill("#4E73DF")
+        self.c.rect(MARGIN_X, self.y, 2.4 * mm, h, stroke=0, fill=1)
+        self.text(MARGIN_X + 4.5 * mm, self.y + 2.4 * mm, title, 11.5)
+        self.y -= GAP
+
+    def note(self, title: Optional[str] = None, body: str = "", bullets: Iterable[tuple[str, str]] = (),
+             size: float = 9.2, border: str = "#E2E7F2", x: float = MARGIN_X, w: float = CONTENT_W):
+        pad = 2.8 * mm
+        inner = w - 2 * pad
+        leading = size * 1.45
+        lines: list[tuple[float, str, float]] = []   # (字下げ, 文字列, 文字サイズ)
+        if title:
+            lines.append((0, title, size + 0.6))
+        if body:
+            lines += [(0, s, size) for s in _wrap(body, self.font, size, inner)]
+        for head, tail in bullets:
+            indent = pdfmetrics.stringWidth("・", self.font, size)
+            wrapped = _wrap(f"{head}{tail}", self.font, size, inner - indent)
+            lines.append((0, "・" + wrapped[0], size))
+            lines += [(indent, s, size) for s in wrapped[1:]]
+        h = len(lines) * leading + 2 * pad - (leading - size)
+        self.y -= h
+        self.box(x, self.y, w, h, stroke=border, fill="#FFFFFF", line_width=1.4 if border != "#E2E7F2" else 0.8)
+        ty = self.y + h - pad - size
+        for indent, s, sz in lines:
+            self.text(x + pad + indent, ty, s, sz)
+            ty -= leading
+        self.y -= GAP
+
+    def meter(self, x: float, top: float, w: float, title: str, score: float, color: str, big: bool = False) -> float:
+        pad = 2.4 * mm
+        num_size = 20 if big else 16
+        h = pad + 4 * mm + 2.8 * mm + 1.6 * mm + num_size * 0.85 + pad
+        y = top - h
+        self.box(x, y, w, h)
+        self.text(x + pad, top - pad - 3.2 * mm, title, 9.5)
+
+        bar_y = top - pad - 4 * mm - 2.8 * mm
+        bar_w = w - 2 * pad
+        self.box(x + pad, bar_y, bar_w, 2.8 * mm, stroke=None, fill="#E4E7ED", radius=1.4 * mm)
+        if not np.isnan(score):
+            fill_w = bar_w * max(0.0, min(score / 10, 1.0))
+            if fill_w > 0:
+                self.box(x + pad, bar_y, fill_w, 2.8 * mm, stroke=None, fill=color, radius=1.4 * mm)
+
+        base = y + pad
+        if np.isnan(score):
+            self.text(x + pad, base, self.t["unanswered"], 9.5)
+        else:
+            s = f"{score:.1f}"
+            self.text(x + pad, base, s, num_size, color="#111111")
+            self.text(x + pad + pdfmetrics.stringWidth(s, self.font, num_size) + 1 * mm, base, self.t["points"], 8.5)
+        return h
+
+    def chart(self, x: float, top: float, w: float, h: float, perma_scores: dict):
+        self.box(x, top - h, w, h)
+        self.text(x + w / 2, top - 5 * mm, "PERMA", 10, anchor="center")
+        ox, oy = x + 4 * mm, top - h + 6 * mm
+        pw, ph = w - 8 * mm, h - 16 * mm
+        c = self.c
+        c.setStrokeColor(_color("#999999"))
+        c.setLineWidth(0.6)
+        c.line(ox, oy, ox, oy + ph)
+        c.line(ox, oy, ox + pw, oy)
+        keys = ["P", "E", "R", "M", "A"]
+        slot = pw / len(keys)
+        for i, k in enumerate(keys):
+            v = perma_scores.get(k, np.nan)
+            bx = ox + slot * i + slot * 0.18
+            bw = slot * 0.64
+            if not np.isnan(v):
+                bh = ph * max(0.0, min(v / 10, 1.0))
+                self.fill(colors[k])
+                c.rect(bx, oy, bw, bh, stroke=0, fill=1)
+                self.text(bx + bw / 2, oy + bh + 1 * mm, f"{v:.1f}", 7.5, anchor="center")
+            self.text(bx + bw / 2, oy - 4 * mm, k, 8, anchor="center")
+
+# =========================
+# ページ
+# =========================
+def draw_page1(c, font: str, perma_scores: dict, extras: dict, sid: Optional[str] = None, lang: str = "ja"):
+    pen = _Pen(c, font, lang)
+    t = pen.t
+
+    # ヘッダー（ID・タイトル・氏名欄）
+    box_w, box_h = 48 * mm, 18 * mm
+    pen.y -= box_h
+    if sid is not None:
+        pen.text(MARGIN_X, pen.y + box_h - 4 * mm, f"{t['id_label']}{sid}", 9, color="#555555")
+    bx = PAGE_W - MARGIN_X - box_w
+    # 長いタイトル（日本語以外）は氏名欄に重ならないよう文字を小さくする
+    title_w = pdfmetrics.stringWidth(t["title"], font, 19)
+    title_size = min(19, 19 * 2 * (bx - PAGE_W / 2 - 3 * mm) / title_w) if title_w else 19
+    pen.text(PAGE_W / 2, pen.y + box_h - 10 * mm, t["title"], title_size, anchor="center")
+    pen.box(bx, pen.y, box_w, box_h, stroke="#C9D4EE", line_width=1.4)
+    pen.text(bx + 3 * mm, pen.y + box_h - 5.5 * mm, t["name_label"], 10.5)
+    c.setStrokeColor(_color("#8898bf"))
+    c.setLineWidth(1.2)
+    c.line(bx + 3 * mm, pen.y + 3.5 * mm, bx + box_w - 3 * mm, pen.y + 3.5 * mm)
+    pen.y -= GAP
+
+    pen.note(t["intro_title"], t["intro"])
+
+    pen.section(t["section_1_1"])
+    chart_w = 52 * mm
+    col_w = (CONTENT_W - chart_w - 2 * GAP) / 2
+    top = pen.y
+    bottoms = []
+    for col, keys in enumerate((["P", "E", "R"], ["M", "A"])):
+        y = top
+        for k in keys:
+            y -= pen.meter(MARGIN_X + col * (col_w + GAP), y, col_w, t["meter_titles"][k],
+                           perma_scores.get(k, np.nan), colors[k]) + 1.6 * mm
+        bottoms.append(y)
+    chart_h = top - min(bottoms) - 1.6 * mm
+    pen.chart(PAGE_W - MARGIN_X - chart_w, top, chart_w, chart_h, perma_scores)
+    pen.y = min(bottoms) - GAP + 1.6 * mm
+
+    pen.note(t["howto_title"], bullets=t["howto"])
+
+    pen.section(t["section_1_2"])
+    pen.y -= pen.meter(MARGIN_X, pen.y, CONTENT_W, t["extra_labels"]["心の健康の総合得点"],
+                       extras.get("心の健康の総合得点", np.nan), extra_colors["心の健康の総合得点"], big=True) + 1.6 * mm
+    half = (CONTENT_W - GAP) / 2
+    top = pen.y
+    bottoms = []
+    for col, keys in enumerate((["からだの調子", "気持ちの様子（いやな気持）"], ["全体的なしあわせ感", "ひとりぼっち感"])):
+        y = top
+        for k in keys:
+            y -= pen.meter(MARGIN_X + col * (half + GAP), y, half, t["extra_labels"][k], extras.get(k, np.nan), extra_colors[k]) + 1.6 * mm
+        bottoms.append(y)
+    pen.y = min(bottoms) - GAP + 1.6 * mm
+
+    pen.note(t["meaning_title"], bullets=t["meaning"])
+    c.showPage()
+
+def draw_page2(c, font: str, perma_scores: dict, weak_keys: list[str], strong_keys: list[str], lang: str = "ja",
+               tips: Optional[dict] = None):
+    # tips：領域キー → その人向けの行動例（parma/tips.py）。なければ言語ファイルの既定の行動例
+    pen = _Pen(c, font, lang)
+    t = pen.t
+    tips = t["tips"] if tips is None else tips
+
+    pen.section(t["section_2_1"])
+    if strong_keys:
+        for k in strong_keys:
+            pen.y -= pen.meter(MARGIN_X, pen.y, CONTENT_W, t["action_titles"][k], perma_scores[k], colors[k]) + 1.6 * mm
+        pen.y -= GAP - 1.6 * mm
+    else:
+        pen.note(body=t["no_strong"], size=8.8)
+
+    pen.section(t["section_2_2"])
+    size = assets.illust_size()
+    illust_w = 41 * mm
+    left_w = CONTENT_W - illust_w - GAP if size else CONTENT_W
+    top = pen.y
+    pen.note(body=t["weak_note"], size=8.8, w=left_w)
+    if weak_keys:
+        # 行動例はイラストの左の幅で折り返す（2行目からは「・」の分だけ字下げ）
+        bullet = pdfmetrics.stringWidth("・", font, 10)
+        for k in weak_keys:
+            pen.y -= 5 * mm
+            pen.text(MARGIN_X, pen.y, t["action_titles"][k], 12)
+            for tip in tips.get(k, ()):
+                for i, s in enumerate(_wrap(tip, font, 10, left_w - 4 * mm - bullet)):
+                    pen.y -= 5 * mm
+                    pen.text(MARGIN_X + 4 * mm + (bullet if i else 0), pen.y, s if i else f"・{s}", 10)
+        pen.y -= GAP + 1 * mm
+    else:
+        pen.note(body=t["no_weak"], size=8.8, w=left_w)
+    if size:
+        h = illust_w * size[1] / size[0]
+        draw_illust(c, PAGE_W - MARGIN_X - illust_w, top - h, illust_w, h)
+        pen.y = min(pen.y, top - h - GAP)
+
+    pen.section(t["section_3"])
+    pen.note(t["about_title"], t["about"], border="#4E73DF", size=8.8)
+    pen.note(t["perma_title"], bullets=t["perma"], size=8.8)
+    pen.note(t["scale_title"], bullets=t["scale"], size=8.8)
+    pen.note(t["usage_title"], bullets=t["usage"], size=8.8)
+    pen.note(t["cite_title"],
+             "Butler, J., & Kern, M. L. (2016). The PERMA-Profiler: A brief multidimensional measure of flourishing. "
+             "International Journal of Wellbeing, 6(3), 1–48. https://doi.org/10.5502/ijw.v6i3.526",
+             size=7.2)
+
+    c.setStrokeColor(_color("#DDDDDD"))
+    c.setLineWidth(1.4)
+    c.line(MARGIN_X, pen.y, PAGE_W - MARGIN_X, pen.y)
+    for i, s in enumerate(t["footer"]):
+        pen.text(MARGIN_X, pen.y - 4 * mm - i * 3.8 * mm, s, 7.5)
+    c.showPage()
+
+def draw_report(c, font: str, perma_scores: dict, extras: dict, weak_keys: list[str], strong_keys: list[str],
+                sid: Optional[str] = None, lang: str = "ja", tips: Optional[dict] = None):
+    draw_page1(c, font, perma_scores, extras, sid, lang)
+    draw_page2(c, font, perma_scores, weak_keys, strong_keys, lang, tips)
+
+# =========================
+# 一括出力（並列レイアウト → 順番どおりに結合）
+# =========================
+CHUNK_REPORTS = 50
+
+def _layout_chunk(records: list[tuple]) -> list[tuple[str, list[tuple]]]:
+    font = register_font()
+    out = []
+    for sid, perma, extras, weak_keys, strong_keys, lang, tips in records:
+        rec = PageRecorder()
+        draw_report(rec, font, perma, extras, weak_keys, strong_keys, sid, lang, tips)
+        out.append((sid, rec.ops))
+    return out
+
+def _chunks(it: Iterable, n: int) -> Iterator[list]:
+    it = iter(it)
+    while chunk := list(islice(it, n)):
+        yield chunk
+
+def _ordered_layouts(records: Iterable[tuple], workers: int) -> Iterator[tuple[str, list[tuple]]]:
+    # 投入中のチャンク数を workers*2 までに抑え、結果は投入順に取り出す
+    chunks = _chunks(records, CHUNK_REPORTS)
+    if workers <= 1:
+        for ch in chunks:
+            yield from _layout_chunk(ch)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        pending = deque()
+        for ch in chunks:
+            pending.append(ex.submit(_layout_chunk, ch))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def _new_canvas(out, font: str) -> canvas.Canvas:
+    # invariant：作成日時・文書 ID を固定し、同じ内容なら同じバイト列にする（parma/artifacts.py の重複排除のため）
+    c = canvas.Canvas(out, pagesize=A4, pageCompression=1, invariant=1)
+    c.setTitle("わらトレ　心の健康チェック")
+    c.setFont(font, 10)
+    c.showOutline()
+    return c
+
+def write_pdf(records: Iterable[tuple], out, workers: int = 1, per_file: Optional[int] = None) -> list:
+    # records: (ID, PERMA, その他, 弱み, 強み, 言語, 行動例)。ID ごとにしおりを付ける。
+    # per_file を指定すると out（"{n}" を含むパス）を per_file 人ごとに分けて書き出す
+    # workers は既定で1（このプロセス内で処理）。2以上はプロセスを起動するので、
+    # コマンドライン（python -m parma.export pdf）など if __name__ == "__main__" の下から呼ぶときだけ指定する
+    font = register_font()
+    written = []
+    c = None
+    for i, (sid, ops) in enumerate(_ordered_layouts(records, workers)):
+        if c is None or (per_file and i % per_file == 0):
+            if c is not None:
+                c.save()
+            target = out.format(n=len(written) + 1) if per_file else out
+            c = _new_canvas(target, font)
+            written.append(target)
+        key = f"r{i}"
+        c.bookmarkPage(key)
+        c.addOutlineEntry(f"ID {sid}" if sid is not None else str(i + 1), key, level=0)
+        replay(c, ops)
+    if c is None:
+        target = out.format(n=1) if per_file else out
+        c = _new_canvas(target, font)
+        written.append(target)
+    c.save()
+    return written
+
+def report_pdf(record: tuple) -> bytes:
+    # 1人分の PDF（結果画面からのダウンロード用）
+    buf = io.BytesIO()
+    write_pdf([record], buf, workers=1)
+    return buf.getvalue()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, Optional
+
+from parma.cache import ReportCache
+
+# =========================
+# 設定
+# =========================
+DEPTH_ENV = "PARMA_PREFETCH_DEPTH"
+DEFAULT_DEPTH = 3
+
+def prefetch_depth() -> int:
+    # 0 で先読みしない
+    try:
+        return max(0, int(os.environ.get(DEPTH_ENV, DEFAULT_DEPTH)))
+    except ValueError:
+        return DEFAULT_DEPTH
+
+def upcoming(id_list: list[str], sid: str, depth: int) -> list[str]:
+    # id_list で sid の次から depth 人分
+    try:
+        i = id_list.index(sid)
+    except ValueError:
+        return []
+    return id_list[i + 1:i + 1 + depth]
+
+# =========================
+# 先読み（バックグラウンドで描画してキャッシュに入れる）
+# =========================
+class Prefetcher:
+    # セッション（owner）ごとに予約中の仕事を持ち、新しい予約が来たら不要になったものを取り消す
+    def __init__(self, cache: ReportCache, workers: int = 1):
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parma-prefetch")
+        self._pending: dict[Hashable, dict[Hashable, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, owner: Hashable, key: Hashable, render: Callable[[], Optional[object]]):
+        with self._lock:
+            # 取り消し済み（別の ID に移動した）なら何もしない
+            if self._pending.get(owner, {}).get(key) is None:
+                return
+        try:
+            if key not in self.cache:
+                value = render()
+                with self._lock:
+                    # 描画中に取り消されたものはキャッシュに入れない
+                    if value is not None and self._pending.get(owner, {}).get(key) is not None:
+                        self.cache.put(key, value)
+        finally:
+            with self._lock:
+                pending = self._pending.get(owner)
+                if pending is not None:
+                    pending.pop(key, None)
+                    if not pending:
+                        del self._pending[owner]
+
+    def schedule(self, owner: Hashable, jobs: list[tuple[Hashable, Callable[[], Optional[object]]]]) -> int:
+        # jobs：(キャッシュのキー, 描画関数) を優先順に。予約済みで jobs にないものは取り消す
+        wanted = {key for key, _ in jobs}
+        with self._lock:
+            pending = self._pending.setdefault(owner, {})
+            for key in [k for k in pending if k not in wanted]:
+                pending.pop(key).cancel()
+            n = 0
+            for key, render in jobs:
+                if key in pending or key in self.cache:
+                    continue
+                pending[key] = self._pool.submit(self._run, owner, key, render)
+                n += 1
+        return n
+
+    def cancel(self, owner: Hashable):
+        with self._lock:
+            for fut in self._pending.pop(owner, {}).values():
+                fut.cancel()
+
+    def pending(self, owner: Hashable) -> int:
+        with self._lock:
+            return len(self._pending.get(owner, {}))
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+def prefetcher(cache: ReportCache) -> Prefetcher:
+    # プロセスで1つ（スレッド1本）。採点・HTML組み立ては短いので1本で十分間に合う
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(cache)
+        return _prefetcher
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from typing import TYPE_CHECKING, Callable, Hashable, Optional
+
+import numpy as np
+
+from parma import html_report, i18n, tips
+from parma.scoring import CompiledSchema, answer_matrix, classify, score_matrix, split_scores
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from parma.artifacts import ArtifactStore
+    from parma.cache import ReportCache
+
+# 1人分のレポート内容：(ID, PERMA, その他, 弱み, 強み, 言語, 行動例)。どの出力もこれを受け取って描く
+# 行動例は 弱みの領域キー → その人向けの行動例の文言（parma/tips.py）
+Record = tuple[str, dict, dict, list[str], list[str], str, dict]
+
+# =========================
+# 採点（1人分）
+# =========================
+def id_index(df: "pd.DataFrame") -> dict[str, int]:
+    # ID → 最初に現れる行の位置（ファイルの並び順。ID が空の行は除く）
+    ids = df.iloc[:, 0]
+    index: dict[str, int] = {}
+    for pos, sid in zip(np.flatnonzero(ids.notna().to_numpy()), ids.dropna().astype(str)):
+        index.setdefault(sid, int(pos))
+    return index
+
+def _row(df: "pd.DataFrame", sid: str, index: Optional[dict[str, int]] = None) -> "pd.DataFrame":
+    # index（id_index の結果）を渡すと列全体の比較をせずに行を取り出す
+    if index is not None:
+        pos = index.get(str(sid))
+        return df.iloc[pos:pos + 1] if pos is not None else df.iloc[:0]
+    return df[df.iloc[:, 0].astype(str) == str(sid)]
+
+def report_record(df: "pd.DataFrame", sid: str, schema: CompiledSchema,
+                  index: Optional[dict[str, int]] = None, lang: Optional[str] = None) -> Optional[Record]:
+    # ID が見つからなければ None。言語はファイルの言語の列から（空欄・列がなければ lang か既定の言語）
+    row = _row(df, sid, index)
+    if row.empty:
+        return None
+    scores = score_matrix(answer_matrix(row.iloc[:1], schema), schema)
+    perma, extras = split_scores(scores[0], schema)
+    weak_keys, strong_keys = classify(perma, schema)
+    row_lang = str(i18n.row_langs(row.iloc[:1], lang)[0])
+    return str(sid), perma, extras, weak_keys, strong_keys, row_lang, tips.personal_tips(scores, schema, [row_lang])[0]
+
+# =========================
+# 出力先（バックエンド）
+# =========================
+# 形式名 → (描画関数, キャッシュしてよいか, 見た目を決めるモジュール)。描画関数は Record を受け取る
+_BACKENDS: dict[str, tuple[Callable[[Record], object], bool, tuple[str, ...]]] = {}
+
+def register_backend(fmt: str, cacheable: bool = True, template: tuple[str, ...] = ()):
+    # 戻り値をキャッシュに入れられない出力（画面に直接描くもの）は cacheable=False
+    # template：出力の見た目を決めるモジュール名。ソースが変わると保存済みの出力を使わなくなる（parma/artifacts.py）
+    def deco(fn: Callable[[Record], object]):
+        _BACKENDS[fmt] = (fn, cacheable, (fn.__module__, *template))
+        return fn
+    return deco
+
+def backends() -> tuple[str, ...]:
+    return tuple(_BACKENDS)
+
+def _backend(fmt: str) -> tuple[Callable[[Record], object], bool, tuple[str, ...]]:
+    try:
+        return _BACKENDS[fmt]
+    except KeyError:
+        raise ValueError(f"出力形式は {backends()} のいずれかにしてください。") from None
+
+def template_modules(fmt: str) -> tuple[str, ...]:
+    return _backend(fmt)[2]
+
+@register_backend("html", template=("parma.content", "parma.html_report", "parma.svg"))
+def report_pages(record: Record) -> str:
+    sid, perma, extras, weak_keys, strong_keys, lang, personal = record
+    return (html_report.render_page1(perma, extras, sid, lang)
+            + html_report.render_page2(perma, weak_keys, strong_keys, lang, personal))
+
+@register_backend("pdf", template=("parma.content", "parma.pdf_report"))
+def _pdf(record: Record) -> bytes:
+    from parma.pdf_report import report_pdf
+
+    return report_pdf(record)
+
+@register_backend("streamlit", cacheable=False, template=("parma.content", "parma.st_report", "parma.svg"))
+def _streamlit(record: Record) -> None:
+    from parma import st_report
+
+    st_report.render_report(record)
+
+def render(record: Record, fmt: str = "html"):
+    return _backend(fmt)[0](record)
+
+# =========================
+# キャッシュつきの入口（app.py・mapp.py 共通）
+# =========================
+def cached_record(df: "pd.DataFrame", sid: str, schema: CompiledSchema, index: Optional[dict[str, int]] = None,
+                  cache: Optional["ReportCache"] = None, wb_hash: Optional[Hashable] = None) -> Optional[Record]:
+    # 採点結果も (ファイルのハッシュ, ID) でキャッシュする（画面に直接描く出力でも採点を省ける）
+    if cache is None:
+        return report_record(df, sid, schema, index)
+    return cache.get_or_render((wb_hash, str(sid), "record"), lambda: report_record(df, sid, schema, index))
+
+def render_report(df: "pd.DataFrame", sid: str, schema: CompiledSchema, fmt: str = "html",
+                  index: Optional[dict[str, int]] = None, cache: Optional["ReportCache"] = None,
+                  wb_hash: Optional[Hashable] = None, store: Optional["ArtifactStore"] = None):
+    # 1人分を fmt の形式で描く。ID が見つからなければ None
+    # メモリのキャッシュ → store（ディスク。回答・スキーマ・テンプレートが同じなら前回の出力）→ 描画 の順に探す
+    fn, cacheable, _ = _backend(fmt)
+    if cache is not None and cacheable:
+        out = cache.get((wb_hash, str(sid), fmt))
+        if out is not None:
+            return out
+    out = akey = None
+    if store is not None and cacheable:
+        from parma.artifacts import artifact_key
+
+        row = _row(df, sid, index)
+        if row.empty:
+            return None
+        akey = artifact_key(str(sid), answer_matrix(row.iloc[:1], schema)[0], schema, fmt, i18n.row_langs(row.iloc[:1])[0])
+        out = store.get(akey, fmt)
+    if out is None:
+        record = cached_record(df, sid, schema, index, cache, wb_hash)
+        if record is None:
+            return None
+        out = fn(record)
+        if akey is not None:
+            store.put(akey, fmt, out)
+    if cache is not None and cacheable:
+        cache.put((wb_hash, str(sid), fmt), out)
+    return out
+
+def report_html(df: "pd.DataFrame", sid: str, schema: CompiledSchema,
+                index: Optional[dict[str, int]] = None) -> Optional[str]:
+    record = report_record(df, sid, schema, index)
+    return report_pages(record) if record is not None else None
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from parma.scoring import CompiledSchema, answer_matrix, score_matrix
+
+# =========================
+# 設定
+# =========================
+SALT_ENV = "PARMA_RESEARCH_SALT"
+ID_COLUMN = "research_id"
+FORMATS = ("csv", "parquet")
+CHUNK_ROWS = 10000
+
+class ResearchExportError(ValueError):
+    pass
+
+def research_salt(salt: Optional[str] = None) -> bytes:
+    # 同じソルトなら同じ ID は同じ研究用 ID になる（回をまたいだ突き合わせ用）。ソルトは研究チームだけが保管する
+    salt = salt or os.environ.get(SALT_ENV)
+    if not salt:
+        raise ResearchExportError(f"ソルトを指定してください（環境変数 {SALT_ENV} でも指定できます）。")
+    return salt.encode("utf-8")
+
+def hash_ids(ids: Iterable[str], salt: bytes) -> list[str]:
+    # HMAC-SHA256 の先頭 16 桁（64 bit）。ソルトを知らなければ元の ID に戻せない
+    return [hmac.new(salt, s.encode("utf-8"), hashlib.sha256).hexdigest()[:16] for s in ids]
+
+def id_text(ids: Iterable) -> list[str]:
+    # ハッシュする前の ID の文字列。空欄のあるチャンクでは数値の ID が小数（1000.0）になるので整数に戻す
+    return [str(int(v)) if isinstance(v, float) and v.is_integer() else str(v) for v in ids]
+
+# =========================
+# 入力（チャンク単位）
+# =========================
+def iter_workbook(path, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    # CSV は読みながら、Excel は読み込んだ表を区切って返す（コピーはしない）
+    # ID 列は文字列のまま読む（チャンクごとに数値・小数と型が変わらないように）
+    if Path(path).suffix.lower() == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype={0: str})
+        return
+    yield from iter_frame(pd.read_excel(path, dtype={0: str}), chunk_rows)
+
+def iter_frame(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+# =========================
+# 匿名化した採点結果
+# =========================
+def research_frame(chunk: pd.DataFrame, schema: CompiledSchema, salt: bytes,
+                   keep: Iterable = (), items: bool = False) -> pd.DataFrame:
+    # 出力する列：研究用 ID、keep で指定した列（施設・年代など）、領域の得点、items=True なら各項目の回答。
+    # 氏名など指定していない列は出さない。ID が空の行は除く
+    has_id = chunk.iloc[:, 0].notna().to_numpy()
+    chunk = chunk[has_id]
+    answers = answer_matrix(chunk, schema)
+    cols = {ID_COLUMN: pd.array(hash_ids(id_text(chunk.iloc[:, 0]), salt), dtype="string")}
+    for c in keep:
+        # 文字列にそろえる（チャンクごとに型が変わると Parquet に書けないため）
+        cols[str(c)] = chunk[c].astype("string").array
+    scores = score_matrix(answers, schema)
+    for j, key in enumerate(schema.keys):
+        cols[key] = np.round(scores[:, j], 4)
+    if items:
+        for j, name in enumerate(schema.columns):
+            cols[name] = answers[:, j]
+    return pd.DataFrame(cols)
+
+def _integral_as_int(frame: pd.DataFrame, columns) -> pd.DataFrame:
+    # 整数だけの回答列は整数で書く（CSV では小数の文字列化がいちばん重い）
+    values = frame[list(columns)].to_numpy()
+    with np.errstate(invalid="ignore"):
+        integral = np.all(np.isnan(values) | (values == np.round(values)), axis=0)
+    conv = {c: "Int64" for c, ok in zip(columns, integral) if ok}
+    return frame.astype(conv) if conv else frame
+
+def write_research(chunks: Iterable[pd.DataFrame], out: Union[str, Path, BinaryIO], schema: CompiledSchema,
+                   salt: bytes, fmt: str = "csv", keep: Iterable = (), items: bool = False) -> int:
+    # チャンクごとに採点・匿名化して書き足す。メモリに持つのは1チャンク分だけ
+    if fmt not in FORMATS:
+        raise ResearchExportError(f"形式は {FORMATS} のいずれかにしてください。")
+    keep = list(keep)
+    n = 0
+    header = True
+    writer = None
+    f = open(out, "wb") if isinstance(out, (str, Path)) else out
+    try:
+        for chunk in chunks:
+            missing = [c for c in keep if c not in chunk.columns]
+            if missing:
+                raise ResearchExportError(f"ファイルにない列です：{missing}")
+            frame = research_frame(chunk, schema, salt, keep, items)
+            if fmt == "csv":
+                if items:
+                    frame = _integral_as_int(frame, schema.columns)
+                f.write(frame.to_csv(index=False, header=header).encode("utf-8-sig" if header else "utf-8"))
+                header = False
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(f, table.schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+            n += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+        if f is not out:
+            f.close()
+    return n
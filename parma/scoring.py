@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# 設定
+# =========================
+SCHEMA_ENV = "PARMA_SCHEMA"
+DEFAULT_SCHEMA = Path(__file__).parent / "schemas" / "perma_profiler_ja.json"
+GROUPS = ("perma", "extra")
+IMPUTE = ("none", "perma_mean")
+
+
+class SchemaError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class CompiledSchema:
+    name: str
+    version: str
+    prefix: str
+    items: np.ndarray          # 項目番号（列 prefix+番号）
+    columns: tuple
+    keys: tuple                # 領域キー（weights の列順）
+    groups: tuple
+    weights: np.ndarray        # (項目数, 領域数)
+    design: np.ndarray         # (2, 項目数, 領域数)：[符号付き重み, 重み]
+    scale_min: float
+    scale_max: float
+    weak: float
+    strong: float
+    min_items: np.ndarray      # (領域数,)：領域の得点に必要な回答済み項目数
+    impute: str                # "none" / "perma_mean"
+    impute_items: np.ndarray   # (項目数,) bool：補完の対象・平均の元になる項目（PERMA 領域の項目）
+
+    def keys_of(self, group: str) -> list[str]:
+        return [k for k, g in zip(self.keys, self.groups) if g == group]
+
+# =========================
+# 読み込み・検証
+# =========================
+def _require(cond: bool, msg: str):
+    if not cond:
+        raise SchemaError(msg)
+
+def _number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def _positive_int(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and v >= 1
+
+def validate_schema(raw: dict):
+    _require(isinstance(raw, dict), "スキーマはJSONオブジェクトである必要があります。")
+    for key in ("name", "version", "column_prefix", "scale", "thresholds", "domains"):
+        _require(key in raw, f"スキーマに '{key}' がありません。")
+    _require(isinstance(raw["column_prefix"], str) and raw["column_prefix"], "column_prefix は空でない文字列にしてください。")
+
+    scale = raw["scale"]
+    _require(isinstance(scale, dict) and _number(scale.get("min")) and _number(scale.get("max")),
+             "scale には数値の min / max が必要です。")
+    _require(scale["min"] < scale["max"], "scale の min は max より小さくしてください。")
+
+    th = raw["thresholds"]
+    _require(isinstance(th, dict) and _number(th.get("weak")) and _number(th.get("strong")),
+             "thresholds には数値の weak / strong が必要です。")
+    # weak は scale の min より大きく（行動例の「弱みの基準からどれだけ低いか」の分母になる）
+    _require(scale["min"] < th["weak"] < th["strong"] <= scale["max"],
+             "thresholds は scale の範囲内で min < weak < strong にしてください。")
+
+    missing = raw.get("missing", {})
+    _require(isinstance(missing, dict), "missing はオブジェクトにしてください。")
+    _require(set(missing) <= {"min_items", "impute"},
+             f"missing に不明なキーがあります：{sorted(set(missing) - {'min_items', 'impute'})}")
+    _require(_positive_int(missing.get("min_items", 1)), "missing の min_items は1以上の整数にしてください。")
+    _require(missing.get("impute", "none") in IMPUTE, f"missing の impute は {IMPUTE} のいずれかにしてください。")
+
+    domains = raw["domains"]
+    _require(isinstance(domains, list) and domains, "domains は1つ以上必要です。")
+    seen = set()
+    for d in domains:
+        _require(isinstance(d, dict) and isinstance(d.get("key"), str) and d["key"],
+                 "各 domain には key（文字列）が必要です。")
+        key = d["key"]
+        _require(key not in seen, f"domain '{key}' が重複しています。")
+        seen.add(key)
+        _require(d.get("group") in GROUPS, f"domain '{key}' の group は {GROUPS} のいずれかにしてください。")
+        _require(isinstance(d.get("reverse", False), bool), f"domain '{key}' の reverse は true / false にしてください。")
+        items = d.get("items")
+        _require(isinstance(items, list) and items, f"domain '{key}' の items が空です。")
+        numbers = []
+        for it in items:
+            if isinstance(it, dict):
+                _require(set(it) <= {"item", "weight", "reverse"},
+                         f"domain '{key}' の items に不明なキーがあります：{sorted(set(it) - {'item', 'weight', 'reverse'})}")
+                _require(_number(it.get("weight", 1)) and it.get("weight", 1) > 0,
+                         f"domain '{key}' の weight は正の数にしてください。")
+                _require(isinstance(it.get("reverse", False), bool),
+                         f"domain '{key}' の reverse は true / false にしてください。")
+                it = it.get("item")
+            _require(isinstance(it, int) and not isinstance(it, bool) and it >= 1,
+                     f"domain '{key}' の items は1以上の整数にしてください。")
+            numbers.append(it)
+        _require(len(set(numbers)) == len(numbers), f"domain '{key}' の items が重複しています。")
+        if "min_items" in d:
+            _require(_positive_int(d["min_items"]) and d["min_items"] <= len(numbers),
+                     f"domain '{key}' の min_items は1以上・項目数以下の整数にしてください。")
+
+def _item_specs(domain: dict):
+    # items は 番号 または {"item": 番号, "weight": 重み, "reverse": 逆転} の形式
+    for it in domain["items"]:
+        if isinstance(it, dict):
+            yield it["item"], float(it.get("weight", 1.0)), it.get("reverse", domain.get("reverse", False))
+        else:
+            yield it, 1.0, domain.get("reverse", False)
+
+def compile_schema(raw: dict) -> CompiledSchema:
+    validate_schema(raw)
+    domains = raw["domains"]
+    specs = [list(_item_specs(d)) for d in domains]
+    items = np.array(sorted({n for sp in specs for n, _, _ in sp}), dtype=int)
+    pos = {n: j for j, n in enumerate(items)}
+
+    m, k = len(items), len(domains)
+    weights = np.zeros((m, k))
+    reverse = np.zeros((m, k), dtype=bool)
+    for c, sp in enumerate(specs):
+        for n, w, rev in sp:
+            weights[pos[n], c] = w
+            reverse[pos[n], c] = rev
+
+    # 尺度の中点 c を原点にとると逆転 (lo+hi-x) - c = -(x - c) は符号反転だけになる
+    design = np.stack((np.where(reverse, -weights, weights), weights))
+
+    # 欠損の扱い：領域ごとの最低回答数（全体の既定値は項目数で頭打ち）と補完方法
+    missing = raw.get("missing", {})
+    min_items = np.array([
+        d.get("min_items", min(missing.get("min_items", 1), len(sp))) for d, sp in zip(domains, specs)
+    ], dtype=float)
+    impute_items = (weights[:, [d["group"] == "perma" for d in domains]] > 0).any(axis=1)
+    for a in (items, weights, design, min_items, impute_items):
+        a.setflags(write=False)
+
+    prefix = raw["column_prefix"]
+    return CompiledSchema(
+        name=str(raw["name"]),
+        version=str(raw["version"]),
+        prefix=prefix,
+        items=items,
+        columns=tuple(f"{prefix}{n}" for n in items),
+        keys=tuple(d["key"] for d in domains),
+        groups=tuple(d["group"] for d in domains),
+        weights=weights,
+        design=design,
+        scale_min=float(raw["scale"]["min"]),
+        scale_max=float(raw["scale"]["max"]),
+        weak=float(raw["thresholds"]["weak"]),
+        strong=float(raw["thresholds"]["strong"]),
+        min_items=min_items,
+        impute=missing.get("impute", "none"),
+        impute_items=impute_items,
+    )
+
+@lru_cache(maxsize=8)
+def _load(path: str) -> CompiledSchema:
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise SchemaError(f"スキーマを読み込めません（{path}）: {e}") from e
+    return compile_schema(raw)
+
+def load_schema(path: Optional[str] = None) -> CompiledSchema:
+    # 一度だけ読み込み・コンパイルし、以後はキャッシュを返す
+    return _load(str(path or os.environ.get(SCHEMA_ENV) or DEFAULT_SCHEMA))
+
+# =========================
+# 採点
+# =========================
+def answer_matrix(df: "pd.DataFrame", schema: CompiledSchema) -> np.ndarray:
+    import pandas as pd
+
+    # 列名は文字列化して照合（Excel 由来で数値型の列名が混じることがあるため）
+    by_name = {str(c): c for c in df.columns}
+    out = np.full((len(df), len(schema.columns)), np.nan)
+    for j, name in enumerate(schema.columns):
+        c = by_name.get(name)
+        if c is not None:
+            out[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return out
+
+def impute_answers(answers: np.ndarray, answered: np.ndarray, schema: CompiledSchema) -> np.ndarray:
+    # 本人の PERMA 項目の平均で、PERMA 領域の未回答項目を埋める（PERMA 項目に1つも回答がなければ埋めない）
+    sel = schema.impute_items
+    n = answered[:, sel].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        person_mean = np.where(answered[:, sel], answers[:, sel], 0.0).sum(axis=1) / n
+    return np.where(~answered & sel, person_mean[:, None], answers)
+
+def score_matrix(answers: np.ndarray, schema: CompiledSchema) -> np.ndarray:
+    # 中点を引いて未回答を 0 にした回答と回答有無マスクを重ね、1回の行列積で
+    # 重み付き合計（逆転込み）と回答済み項目の重み合計を得る
+    mid = (schema.scale_min + schema.scale_max) / 2
+    answered = ~np.isnan(answers)
+    # 最低回答数の判定は補完前の実際の回答数で行う
+    n_answered = answered.astype(float) @ (schema.weights > 0)
+    if schema.impute == "perma_mean":
+        answers = impute_answers(answers, answered, schema)
+        answered = ~np.isnan(answers)
+    sums, counts = np.stack((np.where(answered, answers - mid, 0.0), answered)) @ schema.design
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = sums / counts + mid
+    scores[(counts == 0) | (n_answered < schema.min_items)] = np.nan
+    return scores
+
+def split_scores(scores: np.ndarray, schema: CompiledSchema) -> tuple[dict, dict]:
+    perma, extras = {}, {}
+    for k, g, v in zip(schema.keys, schema.groups, scores):
+        (perma if g == "perma" else extras)[k] = float(v)
+    return perma, extras
+
+def compute_results(row: "pd.DataFrame", schema: CompiledSchema):
+    scores = score_matrix(answer_matrix(row.iloc[:1], schema), schema)[0]
+    return split_scores(scores, schema)
+
+def classify(perma_scores: dict, schema: CompiledSchema) -> tuple[list[str], list[str]]:
+    weak = [k for k, v in perma_scores.items() if not np.isnan(v) and v <= schema.weak]
+    strong = [k for k, v in perma_scores.items() if not np.isnan(v) and v >= schema.strong]
+    return weak, strong
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import io
+import os
+import stat
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# 設定
+# =========================
+BUDGET_MB_ENV = "PARMA_SESSION_MB"
+IDLE_ENV = "PARMA_SESSION_IDLE_S"
+EXPIRE_ENV = "PARMA_SESSION_EXPIRE_S"
+SPILL_DIR_ENV = "PARMA_SPILL_DIR"
+DEFAULT_BUDGET_MB = 512
+DEFAULT_IDLE_S = 15 * 60          # これだけ操作がなければディスクに退避
+DEFAULT_EXPIRE_S = 12 * 60 * 60   # これだけ操作がなければ退避ファイルも消す
+
+# 退避形式：pickle（型をそのまま戻せる）を gzip の最速設定で圧縮（10万行で 28MB → 4MB 程度）
+SPILL_COMPRESSION = {"method": "gzip", "compresslevel": 1}
+
+
+class SpillDirError(ValueError):
+    pass
+
+def private_dir(path: Optional[Path] = None, label: str = "退避先") -> Path:
+    # 自分だけが読み書きできるフォルダ（0700）。指定がなければ毎回新しく作る（名前を推測されない）
+    # 指定されたフォルダが他のユーザーのもの・他のユーザーも書けるものなら使わない（ファイルを仕込まれないように）
+    # 出力の保存先（parma/artifacts.py）も同じ確認をする
+    if path is None:
+        return Path(tempfile.mkdtemp(prefix="parma_sessions_"))
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = path.lstat()
+    if not stat.S_ISDIR(st.st_mode):
+        raise SpillDirError(f"{label} {path} はフォルダではありません（シンボリックリンクは使えません）。")
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        raise SpillDirError(f"{label} {path} は別のユーザーのフォルダです。")
+    if st.st_mode & 0o077:
+        raise SpillDirError(f"{label} {path} は他のユーザーも読み書きできます（chmod 700 にしてください）。")
+    return path
+
+
+@dataclass
+class _Entry:
+    df: Optional["pd.DataFrame"]
+    nbytes: int
+    last_access: float
+    path: Optional[Path] = None
+    disk_bytes: int = 0
+    digest: bytes = b""   # 退避したファイルのハッシュ（読み戻す前に照合する）
+
+# =========================
+# セッションごとの回答データ（メモリ上限・放置時の退避つき）
+# =========================
+class SessionStore:
+    def __init__(self, budget_bytes: int, idle_s: float, expire_s: float, spill_dir: Path):
+        self.budget = budget_bytes
+        self.idle_s = idle_s
+        self.expire_s = expire_s
+        self.spill_dir = spill_dir
+        self.spills = self.reloads = 0
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def put(self, owner: str, df: "pd.DataFrame"):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._remove(owner)
+            self._entries[owner] = _Entry(df, nbytes, time.time())
+            self.sweep(keep=owner)
+
+    def get(self, owner: str) -> Optional["pd.DataFrame"]:
+        # 退避済みならディスクから読み戻す。期限切れ・未登録なら None
+        import pandas as pd
+
+        with self._lock:
+            self.sweep(keep=owner)
+            e = self._entries.get(owner)
+            if e is None:
+                return None
+            e.last_access = time.time()
+            if e.df is None:
+                # 自分で書いたファイルと中身が同じときだけ読み戻す。置き換えられていたら unpickle せず期限切れと同じ扱い
+                data = e.path.read_bytes() if e.path.exists() else b""
+                if not hmac.compare_digest(hashlib.blake2b(data).digest(), e.digest):
+                    self._remove(owner)
+                    return None
+                e.df = pd.read_pickle(io.BytesIO(data), compression=SPILL_COMPRESSION["method"])
+                self._unlink(e)
+                self.reloads += 1
+                self.sweep(keep=owner)
+            return e.df
+
+    def drop(self, owner: str):
+        with self._lock:
+            self._remove(owner)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values() if e.df is not None)
+
+    def sweep(self, keep: Optional[str] = None, now: Optional[float] = None):
+        # 1) 長く放置されたものは削除、2) 放置されたものは退避、3) 上限を超えていれば古い順に退避
+        now = now or time.time()
+        with self._lock:
+            for owner, e in list(self._entries.items()):
+                if owner != keep and now - e.last_access > self.expire_s:
+                    self._remove(owner)
+                elif owner != keep and e.df is not None and now - e.last_access > self.idle_s:
+                    self._spill(e)
+            resident = sorted(
+                (e for o, e in self._entries.items() if e.df is not None and o != keep),
+                key=lambda e: e.last_access,
+            )
+            total = self.resident_bytes()
+            for e in resident:
+                if total <= self.budget:
+                    break
+                total -= e.nbytes
+                self._spill(e)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            sessions = [
+                {
+                    "session": owner[:8],
+                    "state": "memory" if e.df is not None else "disk",
+                    "resident_bytes": e.nbytes if e.df is not None else 0,
+                    "disk_bytes": e.disk_bytes,
+                    "idle_s": round(now - e.last_access, 1),
+                }
+                for owner, e in self._entries.items()
+            ]
+            return {
+                "sessions": len(sessions),
+                "resident_bytes": sum(s["resident_bytes"] for s in sessions),
+                "disk_bytes": sum(s["disk_bytes"] for s in sessions),
+                "budget": self.budget,
+                "spills": self.spills,
+                "reloads": self.reloads,
+                "per_session": sessions,
+            }
+
+    def summary(self, owner: str) -> dict:
+        # 処理時間ログに添える分（このセッションの常駐量と全体の合計）
+        with self._lock:
+            st = self.stats()
+            mine = self._entries.get(owner)
+        return {
+            "resident_bytes": mine.nbytes if mine is not None and mine.df is not None else 0,
+            "total_resident_bytes": st["resident_bytes"],
+            "sessions": st["sessions"],
+            "spilled": sum(s["state"] == "disk" for s in st["per_session"]),
+        }
+
+    def _spill(self, e: _Entry):
+        buf = io.BytesIO()
+        e.df.to_pickle(buf, compression=SPILL_COMPRESSION)
+        data = buf.getvalue()
+        # mkstemp は 0600 で作る
+        fd, name = tempfile.mkstemp(suffix=".pkl.gz", dir=self.spill_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        e.path = Path(name)
+        e.digest = hashlib.blake2b(data).digest()
+        e.disk_bytes = len(data)
+        e.df = None
+        self.spills += 1
+
+    def _unlink(self, e: _Entry):
+        if e.path is not None:
+            e.path.unlink(missing_ok=True)
+        e.path = None
+        e.disk_bytes = 0
+        e.digest = b""
+
+    def _remove(self, owner: str):
+        e = self._entries.pop(owner, None)
+        if e is not None:
+            self._unlink(e)
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+def session_store() -> SessionStore:
+    # プロセスで1つ（全セッション共通の上限）
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(
+                budget_bytes=int(float(os.environ.get(BUDGET_MB_ENV) or DEFAULT_BUDGET_MB) * 1024 * 1024),
+                idle_s=float(os.environ.get(IDLE_ENV) or DEFAULT_IDLE_S),
+                expire_s=float(os.environ.get(EXPIRE_ENV) or DEFAULT_EXPIRE_S),
+                spill_dir=private_dir(Path(os.environ[SPILL_DIR_ENV]) if os.environ.get(SPILL_DIR_ENV) else None),
+            )
+        return _store
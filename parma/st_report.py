@@ -0,0 +1,796 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+import numpy as np
+import streamlit as st
+
+from parma import svg
+from parma.content import action_emojis, colors, descriptions, extra_colors, extras_explanations, full_labels, tips
+from parma.report import Record
+
+# Streamlit の画面に直接描く出力（mapp.py）。report.render(record, "streamlit") から呼ばれる
+
+# =========================
+# 色・CSS
+# =========================
+theme = {
+    "bg": "#FAFAFA",
+    "accent": "#4E73DF",
+    "text": "#222",
+    "bar_bg": "#EEF2FB",
+}
+
+css = f"""
+<style>
+html, body {{
+  background-color:{theme['bg']};
+  color:{theme['text']};
+  font-family:"BIZ UDPGothic","Meiryo",sans-serif;
+  line-height:1.55;
+}}
+
+.block-container {{
+  padding-top: 0.8rem;
+  padding-bottom: 0.8rem;
+  max-width: 900px;
+}}
+
+div[data-testid="stVerticalBlock"] {{
+  gap: 0.55rem;
+}}
+
+.main-wrap {{
+  max-width: 900px;
+  margin: 0 auto;
+}}
+
+.main-title {{
+  text-align:center;
+  font-size:1.6rem;
+  font-weight:900;
+  margin-top:0.15rem;
+  margin-bottom:0.45rem;
+}}
+
+.topline {{
+  display:flex;
+  justify-content:flex-end;
+  align-items:flex-start;
+  margin-bottom:0.45rem;
+}}
+
+.name-box {{
+  width: 220px;
+  min-width: 220px;
+  background:white;
+  border:2px solid #C9D4EE;
+  border-radius:10px;
+  padding:0.55rem 0.75rem;
+}}
+
+.name-label {{
+  font-size:0.92rem;
+  font-weight:900;
+  color:#1b2a4a;
+  margin-bottom:0.22rem;
+}}
+
+.name-line {{
+  height:1.8rem;
+  border-bottom:2px solid #8898bf;
+}}
+
+.section-header {{
+  background:{theme['bar_bg']};
+  font-weight:900;
+  font-size:1.05rem;
+  padding:.45rem .8rem;
+  border-left:7px solid {theme['accent']};
+  border-radius:8px;
+  margin-top:0.55rem;
+  margin-bottom:.38rem;
+}}
+
+.score-card {{
+  background:white;
+  border:1px solid #E5E9F2;
+  border-radius:10px;
+  padding:0.52rem 0.7rem;
+  margin-bottom:0.34rem;
+  box-shadow:none;
+}}
+
+.score-title {{
+  font-weight:900;
+  font-size:0.95rem;
+  margin-bottom:0.16rem;
+  line-height:1.3;
+}}
+
+.score-title.big {{
+  font-size:1.04rem;
+}}
+
+.meter {{
+  background:#E4E7ED;
+  border-radius:999px;
+  height:12px;
+  width:100%;
+  overflow:hidden;
+}}
+
+.meter.big {{
+  height:17px;
+}}
+
+.meter-svg {{
+  display:block;
+}}
+
+.chart-box {{
+  border:1px solid #E2E7F2;
+  border-radius:9px;
+  padding:8px;
+  text-align:center;
+}}
+
+.chart-title {{
+  font-size:0.9rem;
+  font-weight:900;
+  margin-bottom:3px;
+}}
+
+.chart-svg {{
+  display:block;
+  width:100%;
+  height:auto;
+}}
+
+.meter-score-text {{
+  font-size:0.84rem;
+  margin-top:3px;
+  color:#333;
+  line-height:1.15;
+}}
+
+.meter-score-text .score-strong {{
+  font-size:1.55rem;
+  font-weight:1000;
+  color:#111;
+}}
+
+.meter-score-text.big .score-strong {{
+  font-size:1.9rem;
+}}
+
+.mini-note {{
+  background:#FFFFFF;
+  border:1px solid #E6EAF5;
+  border-radius:10px;
+  padding:0.72rem 0.9rem;
+  margin:0.45rem 0;
+}}
+
+.mini-note .cap {{
+  font-weight:900;
+  color:#1b2a4a;
+  font-size:0.98rem;
+  margin-bottom:0.25rem;
+}}
+
+.mini-note .txt {{
+  font-size:0.92rem;
+  color:#222;
+  line-height:1.6;
+}}
+
+.mini-note ul {{
+  margin:0.25rem 0 0.05rem 1.1rem;
+}}
+
+.mini-note li {{
+  margin:0.12rem 0;
+}}
+
+.simple-note {{
+  background:#fff;
+  border:1px solid #E6EAF5;
+  border-radius:10px;
+  padding:0.75rem 0.9rem;
+  font-size:0.94rem;
+  line-height:1.6;
+}}
+
+.perma-box {{
+  border:2px solid {theme['accent']};
+  border-radius:10px;
+  padding:0.8rem 1rem;
+  margin-top:0.25rem;
+  background:white;
+}}
+
+.perma-box p {{
+  font-size:0.95rem;
+  color:#222;
+  margin-bottom:0.45rem;
+  line-height:1.6;
+}}
+
+.perma-highlight {{
+  color:{theme['accent']};
+  font-weight:900;
+}}
+
+.cite-box {{
+  background:#FBFBFD;
+  border:1px solid #E6EAF5;
+  border-radius:10px;
+  padding:0.65rem 0.8rem;
+  margin-top:0.45rem;
+  color:#333;
+}}
+
+.cite-box .cap {{
+  font-weight:900;
+  color:#1b2a4a;
+  margin-bottom:0.2rem;
+  font-size:0.92rem;
+}}
+
+.cite-box .ref {{
+  font-size:0.82rem;
+  line-height:1.5;
+}}
+
+.footer-box {{
+  border-top:2px solid #DDD;
+  margin-top:0.7rem;
+  padding-top:0.5rem;
+  font-size:0.86rem;
+  color:#333;
+  line-height:1.6;
+}}
+
+.footer-title {{
+  font-weight:900;
+  margin-bottom:0.2rem;
+}}
+
+.footer-thanks {{
+  margin-top:0.3rem;
+  font-weight:900;
+}}
+
+.keep-together {{
+  break-inside: avoid;
+  page-break-inside: avoid;
+}}
+
+.no-print {{
+  display:block;
+}}
+
+@media print {{
+
+  @page {{
+    size: A4 portrait;
+    margin: 10mm 10mm 10mm 10mm;
+  }}
+
+  html, body {{
+    background:white !important;
+  }}
+
+  * {{
+    -webkit-print-color-adjust: exact !important;
+    print-color-adjust: exact !important;
+  }}
+
+  .no-print {{
+    display:none !important;
+  }}
+
+  .block-container {{
+    max-width:none !important;
+    padding:0 !important;
+  }}
+
+  .main-wrap {{
+    max-width:none !important;
+    margin:0 !important;
+  }}
+
+  .print-page {{
+    width:100% !important;
+    min-height:277mm !important;
+    box-sizing:border-box !important;
+    break-after:page !important;
+    page-break-after:always !important;
+    break-inside:avoid !important;
+    page-break-inside:avoid !important;
+    padding:0 !important;
+  }}
+
+  .print-page:last-child {{
+    break-after:auto !important;
+    page-break-after:auto !important;
+  }}
+
+  .main-title {{
+    font-size:1.45rem !important;
+    margin:0 0 0.45rem 0 !important;
+    text-align:center !important;
+  }}
+
+  .topline {{
+    display:flex !important;
+    justify-content:flex-end !important;
+    margin-bottom:0.35rem !important;
+  }}
+
+  .name-box {{
+    width:210px !important;
+    min-width:210px !important;
+    padding:0.5rem 0.65rem !important;
+    border:2px solid #C9D4EE !important;
+    border-radius:10px !important;
+    box-shadow:none !important;
+  }}
+
+  .name-label {{
+    font-size:0.9rem !important;
+    font-weight:900 !important;
+  }}
+
+  .name-line {{
+    height:1.7rem !important;
+  }}
+
+  .section-header {{
+    font-size:1.02rem !important;
+    padding:0.42rem 0.7rem !important;
+    margin-top:0.45rem !important;
+    margin-bottom:0.32rem !important;
+    border-left:7px solid #4E73DF !important;
+    background:#EEF2FB !important;
+  }}
+
+  .score-card {{
+    padding:0.48rem 0.6rem !important;
+    margin-bottom:0.28rem !important;
+    border-radius:9px !important;
+    box-shadow:none !important;
+    border:1px solid #E5E9F2 !important;
+  }}
+
+  .score-title {{
+    font-size:0.92rem !important;
+    font-weight:900 !important;
+    line-height:1.25 !important;
+  }}
+
+  .meter {{
+    height:12px !important;
+    background:#E4E7ED !important;
+  }}
+
+  .meter.big {{
+    height:16px !important;
+  }}
+
+  .meter-score-text {{
+    font-size:0.82rem !important;
+    line-height:1.15 !important;
+  }}
+
+  .meter-score-text .score-strong {{
+    font-size:1.45rem !important;
+    font-weight:1000 !important;
+  }}
+
+  .meter-score-text.big .score-strong {{
+    font-size:1.8rem !important;
+  }}
+
+  .mini-note,
+  .simple-note,
+  .perma-box,
+  .cite-box {{
+    font-size:0.88rem !important;
+    line-height:1.55 !important;
+    padding:0.65rem 0.8rem !important;
+    margin:0.35rem 0 !important;
+    border-radius:10px !important;
+  }}
+
+  .mini-note .cap,
+  .cite-box .cap {{
+    font-size:0.92rem !important;
+  }}
+
+  .mini-note .txt,
+  .cite-box .ref,
+  .perma-box p {{
+    font-size:0.86rem !important;
+    line-height:1.55 !important;
+  }}
+
+  img {{
+    max-height:150px !important;
+    object-fit:contain !important;
+  }}
+
+  .footer-box {{
+    font-size:0.82rem !important;
+    line-height:1.5 !important;
+    margin-top:0.55rem !important;
+  }}
+
+  div[data-testid="stVerticalBlock"] {{
+    gap:0.28rem !important;
+  }}
+}}
+</style>
+"""
+
+def emit_css():
+    st.markdown(css, unsafe_allow_html=True)
+
+# =========================
+# 部品
+# =========================
+def render_meter_block(title: str, score: float, color: Optional[str] = None, big: bool = False):
+    if np.isnan(score):
+        score_html = "未回答"
+    else:
+        score_html = f"<span class='score-strong'>{score:.1f}</span>/10点"
+
+    bar_color = color if color is not None else "#999999"
+
+    big_class = "big" if big else ""
+    meter_class = "meter big" if big else "meter"
+    score_class = "meter-score-text big" if big else "meter-score-text"
+    title_class = "score-title big" if big else "score-title"
+
+    st.markdown(
+        f"""
+        <div class="score-card keep-together {big_class}">
+          <div class="{title_class}">{title}</div>
+          <div class="{meter_class}">
+            {svg.meter_svg(svg.score_key(score), bar_color, 17 if big else 12)}
+          </div>
+          <div class="{score_class}">{score_html}</div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def plot_hist(perma_scores: dict):
+    # SVG で描く（matplotlib の図を作らない。同じ点数の組み合わせは描画済みのものを使う）
+    st.markdown(
+        f'<div class="chart-box keep-together"><div class="chart-title">PERMA</div>{svg.perma_chart_svg(perma_scores, colors)}</div>',
+        unsafe_allow_html=True
+    )
+
+def render_name_box():
+    st.markdown(
+        """
+        <div class="name-box keep-together">
+          <div class="name-label">氏名</div>
+          <div class="name-line"></div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def render_intro_box():
+    st.markdown(
+        """
+        <div class="simple-note keep-together">
+          <b>はじめに（この用紙でわかること）</b><br>
+          この用紙は、心の健康チェックの結果です。<br>
+          今の心の元気さを、0〜10点でわかりやすく確認できます。<br>
+          点数が高いところは「今の強み」、低いところは「これから整えるヒント」としてご覧ください。
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def render_perma_howto_note():
+    st.markdown(
+        f"""
+        <div class="mini-note keep-together">
+          <div class="cap">各指標の見方</div>
+          <div class="txt">
+            <ul>
+              <li><b>P（前向きな気持ち）</b>：{descriptions["P"]}</li>
+              <li><b>E（集中して取り組むこと）</b>：{descriptions["E"]}</li>
+              <li><b>R（人とのつながり）</b>：{descriptions["R"]}</li>
+              <li><b>M（生きがいや目的）</b>：{descriptions["M"]}</li>
+              <li><b>A（達成感）</b>：{descriptions["A"]}</li>
+            </ul>
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def render_extras_meaning_note():
+    st.markdown(
+        f"""
+        <div class="mini-note keep-together">
+          <div class="cap">各指標の意味</div>
+          <div class="txt">
+            <ul>
+              <li><b>気持ちの様子（いやな気持）</b>：{extras_explanations["気持ちの様子（いやな気持）"]}</li>
+              <li><b>からだの調子</b>：{extras_explanations["からだの調子"]}</li>
+              <li><b>ひとりぼっち感</b>：{extras_explanations["ひとりぼっち感"]}</li>
+            </ul>
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def render_remarks_box():
+    st.markdown(
+        f"""
+        <div class="perma-box keep-together">
+          <p><span class="perma-highlight">このチェックで見ていること</span></p>
+          <p>
+            この用紙は、心の元気さを <span class="perma-highlight">5つの面（PERMA）</span> で見る方法をもとにしています。<br>
+            5つの面をそれぞれ見ることで、「どこが保てているか」「どこを整えるとよさそうか」を考えやすくします。
+          </p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown(
+        """
+        <div class="mini-note keep-together">
+          <div class="cap">① PERMA（5つの面）とは</div>
+          <div class="txt">
+            <ul>
+              <li><b>P</b>：前向きな気持ち（うれしさ・安心・満足など）</li>
+              <li><b>E</b>：集中して取り組むこと（夢中になって時間を忘れるような没頭）</li>
+              <li><b>R</b>：人とのつながり（支えられている・大切にされている感覚）</li>
+              <li><b>M</b>：生きがいや目的（家族・地域・趣味・目標など）</li>
+              <li><b>A</b>：達成感（毎日のやることをこなせた感覚も含みます）</li>
+            </ul>
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown(
+        """
+        <div class="mini-note keep-together">
+          <div class="cap">② この尺度（PERMA-Profiler）について</div>
+          <div class="txt">
+            <ul>
+              <li>研究では、PERMAを短い質問で測れるように <b>PERMA-Profiler</b> が開発されています。</li>
+              <li><b>PERMAの15問</b>に、<b>追加の8問</b>を加えた、合計<b>23問</b>の形式です。</li>
+              <li>点数は<b>0〜10点</b>で、たとえば<b>7/10点</b>は「だいたい7割くらい」と考えると分かりやすいです。</li>
+            </ul>
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown(
+        """
+        <div class="mini-note keep-together">
+          <div class="cap">③ 結果の使い方（おすすめ）</div>
+          <div class="txt">
+            <ul>
+              <li><b>高いところ</b>：今の強み（保てている部分）</li>
+              <li><b>低いところ</b>：疲れや環境の影響が出ているかもしれない部分（整えるヒント）</li>
+              <li>くり返して確認し、<b>変化</b>（上がった／下がった）を見ると役立ちます。</li>
+              <li>つらさが強い場合は、身近な人や専門職に相談する<b>きっかけ</b>にもなります。</li>
+            </ul>
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown(
+        """
+        <div class="cite-box keep-together">
+          <div class="cap">引用（根拠）</div>
+          <div class="ref">
+            Butler, J., &amp; Kern, M. L. (2016). <i>The PERMA-Profiler: A brief multidimensional measure of flourishing</i>.
+            <i>International Journal of Wellbeing</i>, 6(3), 1–48. https://doi.org/10.5502/ijw.v6i3.526
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+# =========================
+# レポート（3ページ）
+# =========================
+def render_report(record: Record):
+    from parma import assets
+
+    _, perma_scores, extras, weak_keys, strong_keys, _, personal = record
+
+    # =========================================================
+    # 1ページ目：1-1 + 1-2
+    # =========================================================
+    st.markdown("<div class='print-page page-1'>", unsafe_allow_html=True)
+
+    st.markdown('<div class="main-title">わらトレ　心の健康チェック</div>', unsafe_allow_html=True)
+
+    st.markdown("<div class='topline'>", unsafe_allow_html=True)
+    render_name_box()
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    render_intro_box()
+
+    st.markdown('<div class="section-header">1-1. 要素ごとにみた心の状態</div>', unsafe_allow_html=True)
+
+    col_meter, col_chart = st.columns([2.25, 0.95])
+
+    with col_meter:
+        left_col, right_col = st.columns(2)
+
+        with left_col:
+            for k in ["P", "E", "R"]:
+                render_meter_block(
+                    f"{k}：{full_labels[k]}",
+                    perma_scores.get(k, np.nan),
+                    colors[k]
+                )
+
+        with right_col:
+            for k in ["M", "A"]:
+                render_meter_block(
+                    f"{k}：{full_labels[k]}",
+                    perma_scores.get(k, np.nan),
+                    colors[k]
+                )
+
+    with col_chart:
+        plot_hist(perma_scores)
+
+    render_perma_howto_note()
+
+    st.markdown('<div class="section-header">1-2. こころ・からだの調子</div>', unsafe_allow_html=True)
+
+    render_meter_block(
+        "心の健康の総合得点",
+        extras.get("心の健康の総合得点", np.nan),
+        extra_colors["心の健康の総合得点"],
+        big=True
+    )
+
+    grid_order = [
+        ("からだの調子", "からだの調子"),
+        ("全体的なしあわせ感", "全体的なしあわせ感"),
+        ("気持ちの様子（いやな気持）", "気持ちの様子（いやな気持）"),
+        ("ひとりぼっち感", "ひとりぼっち感"),
+    ]
+
+    cL, cR = st.columns(2)
+
+    for i, (key, label) in enumerate(grid_order):
+        v = extras.get(key, np.nan)
+        col = cL if i % 2 == 0 else cR
+
+        with col:
+            render_meter_block(
+                label,
+                v,
+                extra_colors.get(key, None)
+            )
+
+    render_extras_meaning_note()
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # =========================================================
+    # 2ページ目：2-1 + 2-2
+    # =========================================================
+    st.markdown("<div class='print-page page-2'>", unsafe_allow_html=True)
+
+    st.markdown('<div class="main-title">わらトレ　心の健康チェック</div>', unsafe_allow_html=True)
+
+    st.markdown(
+        '<div class="section-header">2-1. 満たされている心の健康の要素（強み）</div>',
+        unsafe_allow_html=True
+    )
+
+    if strong_keys:
+        for k in strong_keys:
+            render_meter_block(
+                f"✓ {full_labels[k]}（{k}）",
+                perma_scores.get(k, np.nan),
+                colors[k]
+            )
+    else:
+        st.markdown(
+            """
+            <div class="simple-note keep-together">
+              今回は、7点以上の項目はありませんでした。<br>
+              ただし、どの項目も今後の変化を見る上で大切な手がかりになります。
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    st.markdown(
+        '<div class="section-header">2-2. これから伸ばせる要素と具体的な行動例</div>',
+        unsafe_allow_html=True
+    )
+
+    if weak_keys:
+        c1, c2 = st.columns([2.0, 1.0])
+
+        with c1:
+            st.markdown(
+                """
+                <div class="simple-note keep-together">
+                  点数が低めだったところは、悪い結果ではありません。<br>
+                  これから少しずつ整えていける「ヒント」として見てください。
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+            for k in weak_keys:
+                emoji = action_emojis.get(k, "💡")
+                st.markdown(f"### {emoji} {full_labels[k]}（{k}）")
+
+                for t in personal.get(k, tips[k]):
+                    st.markdown(f"- {t}")
+
+        with c2:
+            illust = assets.illust_png()
+            if illust is not None:
+                st.image(illust, width="stretch")
+    else:
+        st.markdown(
+            """
+            <div class="simple-note keep-together">
+              今回は、5点以下の項目はありませんでした。<br>
+              今の良い状態を保つことを意識してみてください。
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # =========================================================
+    # 3ページ目：3. 備考
+    # =========================================================
+    st.markdown("<div class='print-page page-3'>", unsafe_allow_html=True)
+
+    st.markdown('<div class="main-title">わらトレ　心の健康チェック</div>', unsafe_allow_html=True)
+
+    st.markdown('<div class="section-header">3. 備考</div>', unsafe_allow_html=True)
+
+    render_remarks_box()
+
+    st.markdown(
+        """
+        <div class="footer-box keep-together">
+          <div class="footer-title">この評価結果に関するお問い合わせは以下まで</div>
+          <div>
+            〈お問い合わせ先〉〒 474-0037<br>
+            愛知県大府市半月町三丁目294番地<br>
+            ☎ 0562-44-5551　研究代表者：李 相侖
+          </div>
+          <div class="footer-thanks">
+            この度は、ご協力ありがとうございました。
+          </div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.markdown("</div>", unsafe_allow_html=True)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import math
+from functools import lru_cache
+from typing import Optional
+
+# =========================
+# 設定
+# =========================
+AXIS_COLOR = "#999999"
+TRACK_COLOR = "#E4E7ED"
+SCALE_MAX = 10.0
+
+# 棒グラフの座標系（viewBox）。表示する大きさは CSS で決める
+CHART_W = 160
+CHART_H = 150
+CHART_TOP = 16      # 10点の棒の上に点数を書く余白
+CHART_BOTTOM = 16   # ラベルの行
+
+def score_key(score) -> Optional[float]:
+    # キャッシュのキー：表示の精度（小数1桁）に丸め、未回答は None（NaN 同士は等しくならないため）
+    if score is None or (isinstance(score, float) and math.isnan(score)):
+        return None
+    return round(float(score), 1)
+
+# =========================
+# 棒グラフ（PERMA）
+# =========================
+@lru_cache(maxsize=4096)
+def bar_chart_svg(values: tuple, labels: tuple, colors: tuple) -> str:
+    # values は score_key で丸めたもの（None は未回答：棒も点数も描かない）
+    plot_h = CHART_H - CHART_TOP - CHART_BOTTOM
+    base = CHART_H - CHART_BOTTOM
+    slot = (CHART_W - 2) / len(values)
+    bar_w = slot * 0.7
+    parts = [
+        f'<svg class="chart-svg" viewBox="0 0 {CHART_W} {CHART_H}" xmlns="http://www.w3.org/2000/svg" role="img">',
+        f'<path d="M1 0V{base}H{CHART_W}" fill="none" stroke="{AXIS_COLOR}" stroke-width="1"/>',
+    ]
+    for i, (v, label, color) in enumerate(zip(values, labels, colors)):
+        cx = 2 + slot * (i + 0.5)
+        parts.append(f'<text x="{cx:.1f}" y="{CHART_H - 3}" text-anchor="middle" font-size="11">{label}</text>')
+        if v is None:
+            continue
+        h = plot_h * max(0.0, min(v, SCALE_MAX)) / SCALE_MAX
+        parts.append(f'<rect x="{cx - bar_w / 2:.1f}" y="{base - h:.1f}" width="{bar_w:.1f}" height="{h:.1f}" fill="{color}"/>')
+        parts.append(f'<text x="{cx:.1f}" y="{base - h - 3:.1f}" text-anchor="middle" font-size="10.5" font-weight="700">{v:.1f}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+def perma_chart_svg(perma_scores: dict, colors: dict, keys: tuple = ("P", "E", "R", "M", "A")) -> str:
+    return bar_chart_svg(
+        tuple(score_key(perma_scores.get(k)) for k in keys),
+        tuple(keys),
+        tuple(colors[k] for k in keys),
+    )
+
+# =========================
+# メーター（横棒）
+# =========================
+@lru_cache(maxsize=4096)
+def meter_svg(score: Optional[float], color: str, height: int = 10) -> str:
+    # 幅は親要素に合わせる（%指定）。角丸は高さの半分
+    pct = 0.0 if score is None else max(0.0, min(score / SCALE_MAX * 100, 100.0))
+    r = height / 2
+    fill = f'<rect width="{pct:.0f}%" height="{height}" rx="{r}" fill="{color}"/>' if pct > 0 else ""
+    return (
+        f'<svg class="meter-svg" width="100%" height="{height}" xmlns="http://www.w3.org/2000/svg">'
+        f'<rect width="100%" height="{height}" rx="{r}" fill="{TRACK_COLOR}"/>{fill}</svg>'
+    )
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger("parma.timing")
+
+# =========================
+# 設定
+# =========================
+HISTORY_LEN = 20
+LOG_PATH_ENV = "PARMA_TIMING_LOG"
+ADMIN_ENV = "PARMA_ADMIN"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+# =========================
+# 起動時間
+# =========================
+_startup = {"loaded_at": time.time(), "imports": {}, "first_run_ms": None, "reported": False}
+
+def process_age() -> Optional[float]:
+    # プロセス起動からの経過秒（Linux のみ）
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+_startup["process_age_at_load"] = process_age()
+
+def lazy_import(name: str):
+    # 重いモジュールは最初に必要になった時点で読み込み、そのとき1回だけ所要時間を記録する
+    # sys.modules を直接返すと、別のセッションが読み込み中の（初期化が終わっていない）モジュールを返してしまうので、
+    # 読み込み済みでも import_module を通す（読み込み中なら終わるまで待つ）
+    loaded = name in sys.modules
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    if not loaded:
+        _startup["imports"].setdefault(name, round((time.perf_counter() - t0) * 1000, 3))
+    return mod
+
+def startup_record() -> dict:
+    return {
+        "event": "startup",
+        "pid": os.getpid(),
+        "process_age_at_load_s": _startup["process_age_at_load"],
+        "first_run_ms": _startup["first_run_ms"],
+        "lazy_imports_ms": dict(_startup["imports"]),
+    }
+
+# =========================
+# メモリ計測
+# =========================
+def current_memory() -> int:
+    # tracemalloc が有効ならPythonの確保量、そうでなければプロセスのRSS（Linux）
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+# =========================
+# ステージ計測
+# =========================
+class StageTimer:
+    def __init__(self, app: str, run_id: Optional[str] = None):
+        self.app = app
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.records: list[dict] = []
+        self._t0 = time.perf_counter()
+        self._imports_before = set(_startup["imports"])
+        self.finished = False
+
+    @contextmanager
+    def stage(self, name: str):
+        m0 = current_memory()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append({
+                "stage": name,
+                "ms": (time.perf_counter() - t0) * 1000.0,
+                "mem_delta": current_memory() - m0,
+            })
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def summary(self) -> list[dict]:
+        # 同名ステージは合算（mapp.py は描画を何度かに分けて呼ぶため）
+        merged: dict[str, dict] = {}
+        for r in self.records:
+            m = merged.setdefault(r["stage"], {"stage": r["stage"], "ms": 0.0, "mem_delta": 0, "calls": 0})
+            m["ms"] += r["ms"]
+            m["mem_delta"] += r["mem_delta"]
+            m["calls"] += 1
+        return list(merged.values())
+
+    def to_record(self, **extra) -> dict:
+        rec = {
+            "event": "rerun_timing",
+            "app": self.app,
+            "run_id": self.run_id,
+            "ts": self.started,
+            "total_ms": round(self.total_ms(), 3),
+            "stages": [
+                {**s, "ms": round(s["ms"], 3)} for s in self.summary()
+            ],
+        }
+        imported = {k: v for k, v in _startup["imports"].items() if k not in self._imports_before}
+        if imported:
+            rec["lazy_imports_ms"] = imported
+        rec.update(extra)
+        return rec
+
+def emit_log(record: dict, path: Optional[str] = None):
+    line = json.dumps(record, ensure_ascii=False)
+    logger.info(line)
+    path = path or os.environ.get(LOG_PATH_ENV)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+# =========================
+# Streamlit 連携
+# =========================
+def admin_enabled() -> bool:
+    import streamlit as st
+
+    if os.environ.get(ADMIN_ENV) == "1":
+        return True
+    return st.query_params.get("admin") == "1"
+
+def finish(timer: StageTimer, panel: bool = True, **extra) -> dict:
+    # 1回の再実行の最後に呼ぶ：ログ出力＋履歴保存＋（管理者のみ）パネル表示
+    # フラグメントだけの再実行ではサイドバーに書けないので panel=False で呼ぶ
+    import streamlit as st
+
+    timer.finished = True
+    record = timer.to_record(**extra)
+    if not _startup["reported"]:
+        # プロセスで最初の再実行：起動時間の記録も1回だけ出す
+        _startup["reported"] = True
+        _startup["first_run_ms"] = record["total_ms"]
+        emit_log(startup_record())
+    emit_log(record)
+
+    if "timing_history" not in st.session_state:
+        st.session_state.timing_history = deque(maxlen=HISTORY_LEN)
+    st.session_state.timing_history.append(record)
+
+    if panel and admin_enabled():
+        render_admin_panel(st.session_state.timing_history)
+    return record
+
+def render_admin_panel(history):
+    import streamlit as st
+
+    if not history:
+        return
+    latest = history[-1]
+    with st.sidebar.expander("⏱ 処理時間（管理者）", expanded=True):
+        st.caption(f"run {latest['run_id']} ・ 合計 {latest['total_ms']:.1f} ms（ブラウザ描画は含みません）")
+        st.table([
+            {
+                "ステージ": s["stage"],
+                "ms": f"{s['ms']:.2f}",
+                "メモリ差分 (KB)": f"{s['mem_delta'] / 1024:+.0f}",
+                "回数": s["calls"],
+            }
+            for s in latest["stages"]
+        ])
+        st.caption("直近の再実行（合計 ms）")
+        st.line_chart([r["total_ms"] for r in history], height=120)
+        if "session" in latest:
+            st.caption("回答データのメモリ（このセッション／全体）")
+            st.json(latest["session"], expanded=False)
+        st.caption("起動（このプロセス）")
+        st.json(startup_record(), expanded=False)
+        st.download_button(
+            "JSON Lines で保存",
+            "\n".join(json.dumps(r, ensure_ascii=False) for r in history),
+            file_name="parma_timing.jsonl",
+            mime="application/json",
+        )
+
+# =========================
+# 起動時間の計測（コマンドライン）
+# =========================
+HEAVY_MODULES = ("pandas", "matplotlib", "openpyxl", "reportlab", "PIL")
+
+_STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_ms": round((t1 - t0) * 1000, 1),
+    "first_run_ms": round((t2 - t1) * 1000, 1),
+    "heavy_modules": [m for m in sys.argv[2:] if m in sys.modules],
+    "error": [str(e.value) for e in at.exception],
+}))
+"""
+
+def measure_startup(script: str) -> dict:
+    # 新しいプロセスでアップロード画面を1回実行し、所要時間と読み込まれた重いモジュールを調べる
+    out = subprocess.run(
+        [sys.executable, "-c", _STARTUP_PROBE, os.path.abspath(script), *HEAVY_MODULES],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(script)),
+    )
+    rec = json.loads(out.stdout.strip().splitlines()[-1])
+    rec["script"] = script
+    rec["total_ms"] = round(rec["streamlit_import_ms"] + rec["first_run_ms"], 1)
+    return rec
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m parma.timing", description="起動時間の計測")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("startup", help="アップロード画面までの起動時間を計測する")
+    p.add_argument("scripts", nargs="+", help="app.py / mapp.py")
+    p.add_argument("--budget-ms", type=float, default=None, help="この時間を超えたら終了コード 1")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for script in args.scripts:
+        rec = measure_startup(script)
+        over = args.budget_ms is not None and rec["total_ms"] > args.budget_ms
+        failed |= over or bool(rec["heavy_modules"]) or bool(rec["error"])
+        rec["within_budget"] = not over
+        print(json.dumps(rec, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from parma.i18n import LANGS
+from parma.scoring import CompiledSchema
+
+# =========================
+# 設定
+# =========================
+CATALOGUE_ENV = "PARMA_TIPS"
+DEFAULT_CATALOGUE = Path(__file__).parent / "catalogues" / "tips.json"
+
+# 重さ：領域の得点が弱みの基準からどれだけ低いか（0：基準ちょうど 〜 1：最低点）のどのあたり向けの行動か
+SEVERITY = {"any": None, "mild": 0.25, "moderate": 0.6, "severe": 0.9}
+ANY_MATCH = 0.6        # 重さを問わない行動の当てはまり
+EXTRA_TAGS = {"high": 1.0, "low": -1.0}   # その他の指標が高い人向け / 低い人向け
+
+
+class CatalogueError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TipCatalogue:
+    name: str
+    version: str
+    per_domain: int            # 弱みの領域ごとに出す数
+    ids: tuple
+    domains: tuple             # 行動ごとの領域キー
+    weight: np.ndarray         # (行動数,)
+    center: np.ndarray         # (行動数,)：重さの中心（any は NaN）
+    extra_keys: tuple          # タグに使われているその他の指標
+    extra_tags: np.ndarray     # (行動数, 指標数)：+1 高い人向け / -1 低い人向け / 0
+    texts: dict                # 言語 → (行動数,) の文字列の配列
+
+# =========================
+# 読み込み・検証
+# =========================
+def _require(cond: bool, msg: str):
+    if not cond:
+        raise CatalogueError(msg)
+
+def compile_catalogue(raw: dict) -> TipCatalogue:
+    _require(isinstance(raw, dict) and isinstance(raw.get("tips"), list) and raw["tips"],
+             "行動例カタログには tips（1つ以上）が必要です。")
+    per_domain = raw.get("per_domain", 2)
+    _require(isinstance(per_domain, int) and not isinstance(per_domain, bool) and per_domain >= 1,
+             "per_domain は1以上の整数にしてください。")
+    seen = set()
+    extra_keys: list[str] = []
+    for t in raw["tips"]:
+        _require(isinstance(t, dict) and isinstance(t.get("id"), str) and t["id"], "各行動例には id（文字列）が必要です。")
+        tid = t["id"]
+        _require(tid not in seen, f"行動例 '{tid}' が重複しています。")
+        seen.add(tid)
+        _require(isinstance(t.get("domain"), str), f"行動例 '{tid}' に domain がありません。")
+        _require(t.get("severity", "any") in SEVERITY, f"行動例 '{tid}' の severity は {tuple(SEVERITY)} のいずれかにしてください。")
+        w = t.get("weight", 1.0)
+        _require(isinstance(w, (int, float)) and not isinstance(w, bool) and w > 0, f"行動例 '{tid}' の weight は正の数にしてください。")
+        extras = t.get("extras", {})
+        _require(isinstance(extras, dict) and all(v in EXTRA_TAGS for v in extras.values()),
+                 f"行動例 '{tid}' の extras は 指標名 → {tuple(EXTRA_TAGS)} にしてください。")
+        extra_keys += [k for k in extras if k not in extra_keys]
+        text = t.get("text")
+        _require(isinstance(text, dict) and all(isinstance(text.get(lang), str) and text[lang] for lang in LANGS),
+                 f"行動例 '{tid}' の text には {LANGS} すべての文言が必要です。")
+
+    tips = raw["tips"]
+    tags = np.array([[EXTRA_TAGS[t.get("extras", {})[k]] if k in t.get("extras", {}) else 0.0 for k in extra_keys]
+                     for t in tips], dtype=float).reshape(len(tips), len(extra_keys))
+    center = np.array([np.nan if SEVERITY[t.get("severity", "any")] is None else SEVERITY[t.get("severity", "any")]
+                       for t in tips], dtype=float)
+    weight = np.array([float(t.get("weight", 1.0)) for t in tips])
+    texts = {lang: np.array([t["text"][lang] for t in tips], dtype=object) for lang in LANGS}
+    for a in (tags, center, weight, *texts.values()):
+        a.setflags(write=False)
+    return TipCatalogue(
+        name=str(raw.get("name", "")),
+        version=str(raw.get("version", "")),
+        per_domain=per_domain,
+        ids=tuple(t["id"] for t in tips),
+        domains=tuple(t["domain"] for t in tips),
+        weight=weight,
+        center=center,
+        extra_keys=tuple(extra_keys),
+        extra_tags=tags,
+        texts=texts,
+    )
+
+@lru_cache(maxsize=4)
+def _load(path: str) -> TipCatalogue:
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise CatalogueError(f"行動例カタログを読み込めません（{path}）: {e}") from e
+    return compile_catalogue(raw)
+
+def catalogue_path() -> Path:
+    return Path(os.environ.get(CATALOGUE_ENV) or DEFAULT_CATALOGUE)
+
+def load_catalogue(path: Optional[str] = None) -> TipCatalogue:
+    # 一度だけ読み込み・検証し、以後はキャッシュを返す
+    return _load(str(path or catalogue_path()))
+
+# =========================
+# 並べ替え（回答者 × 行動例 をまとめて計算）
+# =========================
+def _check_schema(cat: TipCatalogue, schema: CompiledSchema) -> tuple[np.ndarray, np.ndarray]:
+    # 行動例の領域・タグの指標を採点結果の列番号に直す
+    pos = {k: j for j, k in enumerate(schema.keys)}
+    perma = set(schema.keys_of("perma"))
+    bad = sorted({d for d in cat.domains if d not in perma})
+    _require(not bad, f"行動例カタログの domain {bad} が採点スキーマの PERMA 領域にありません。")
+    bad = sorted(k for k in cat.extra_keys if k not in pos)
+    _require(not bad, f"行動例カタログの extras {bad} が採点スキーマにありません。")
+    return np.array([pos[d] for d in cat.domains], dtype=int), np.array([pos[k] for k in cat.extra_keys], dtype=int)
+
+def tip_scores(scores: np.ndarray, schema: CompiledSchema, cat: Optional[TipCatalogue] = None) -> np.ndarray:
+    # scores：score_matrix の結果 (人数, 領域数) → 当てはまりの点 (人数, 行動数)
+    # 点 = 重み + 重さの当てはまり（1 - |不足の度合い - 中心|）+ その他の指標とタグの内積
+    cat = cat or load_catalogue()
+    dom_col, extra_col = _check_schema(cat, schema)
+    span = schema.scale_max - schema.scale_min
+    deficit = np.clip((schema.weak - scores[:, dom_col]) / (schema.weak - schema.scale_min), 0.0, 1.0)
+    severity = np.where(np.isnan(cat.center), ANY_MATCH, 1.0 - np.abs(deficit - cat.center))
+    # その他の指標は -1（最低点）〜 +1（最高点）に直す。未回答は 0（タグの影響なし）
+    level = np.nan_to_num(2.0 * (scores[:, extra_col] - schema.scale_min) / span - 1.0)
+    return cat.weight + np.nan_to_num(severity) + level @ cat.extra_tags.T
+
+def select_tips(scores: np.ndarray, schema: CompiledSchema, cat: Optional[TipCatalogue] = None,
+                k: Optional[int] = None) -> dict[str, np.ndarray]:
+    # 領域キー → (人数, k) の行動例の番号（点の高い順。同点はカタログの順）。領域の行動例が k 個未満なら -1 で埋める
+    cat = cat or load_catalogue()
+    k = k or cat.per_domain
+    points = tip_scores(scores, schema, cat)
+    domains = np.array(cat.domains, dtype=object)
+    out = {}
+    for key in schema.keys_of("perma"):
+        cols = np.flatnonzero(domains == key)
+        picked = np.full((len(scores), k), -1, dtype=int)
+        if len(cols):
+            n = min(k, len(cols))
+            order = np.argsort(-points[:, cols], axis=1, kind="stable")[:, :n]
+            picked[:, :n] = cols[order]
+        out[key] = picked
+    return out
+
+def personal_tips(scores: np.ndarray, schema: CompiledSchema, langs: Iterable[str],
+                  cat: Optional[TipCatalogue] = None) -> list[dict[str, tuple[str, ...]]]:
+    # 1人ずつ 弱みの領域 → 行動例の文言（その人の言語）。文言の取り出しも配列でまとめて行う
+    cat = cat or load_catalogue()
+    picked = select_tips(scores, schema, cat)
+    keys = schema.keys_of("perma")
+    with np.errstate(invalid="ignore"):
+        weak = (scores[:, [schema.keys.index(k) for k in keys]] <= schema.weak).tolist()   # NaN は False
+    # (言語数, 行動数 + 1) の文言の表。末尾は足りない分（番号 -1）の空欄
+    table = np.array([[*cat.texts[lang], ""] for lang in LANGS], dtype=object)
+    lang_pos = np.array([LANGS.index(lang) for lang in langs], dtype=int)[:, None]
+    chosen = [[tuple(t for t in row if t) for row in table[lang_pos, picked[k]].tolist()] for k in keys]
+    return [{k: chosen[c][i] for c, k in enumerate(keys) if flags[c]} for i, flags in enumerate(weak)]
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+import bisect
+import json
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import numpy as np
+
+from parma.scoring import CompiledSchema
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# =========================
+# 設定
+# =========================
+RULES_ENV = "PARMA_TRIAGE_RULES"
+DEFAULT_RULES = Path(__file__).parent / "schemas" / "triage_ja.json"
+
+# 採点結果の列に加えて条件に使える集計値
+AGGREGATES = ("perma_mean", "perma_min")
+AGGREGATE_LABELS = {"perma_mean": "PERMA の平均", "perma_min": "PERMA の最低"}
+OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+
+class TriageError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TriageRules:
+    name: str
+    version: str
+    order_by: str              # 同じ優先度の中で低い順に並べる値（採点結果の列か集計値）
+    ids: tuple
+    labels: tuple
+    priority: np.ndarray       # (ルール数,)
+    cond_keys: tuple           # 条件ごとの列名
+    cond_ops: tuple
+    cond_values: np.ndarray    # (条件数,)
+    all_of: np.ndarray         # (条件数, ルール数)：すべて満たす必要がある条件
+    any_of: np.ndarray         # (条件数, ルール数)：どれか1つ満たせばよい条件
+    has_any: np.ndarray        # (ルール数,)：any の条件があるルール
+
+
+@dataclass(frozen=True)
+class TriageEntry:
+    sid: str
+    priority: int
+    rules: tuple               # 当てはまったルールの id
+    order_value: float         # order_by の値（未回答は NaN）
+
+    def sort_key(self) -> tuple:
+        return (-self.priority, np.inf if np.isnan(self.order_value) else self.order_value, self.sid)
+
+# =========================
+# 読み込み・検証
+# =========================
+def _require(cond: bool, msg: str):
+    if not cond:
+        raise TriageError(msg)
+
+def _conditions(rule: dict, part: str) -> list[dict]:
+    conds = rule.get(part, [])
+    _require(isinstance(conds, list), f"ルール '{rule.get('id')}' の {part} は条件の一覧にしてください。")
+    for c in conds:
+        _require(isinstance(c, dict) and isinstance(c.get("key"), str) and c.get("op") in OPS
+                 and isinstance(c.get("value"), (int, float)) and not isinstance(c.get("value"), bool),
+                 f"ルール '{rule.get('id')}' の条件は {{\"key\": 列名, \"op\": {tuple(OPS)}, \"value\": 数値}} にしてください。")
+    return conds
+
+def compile_rules(raw: dict) -> TriageRules:
+    _require(isinstance(raw, dict) and isinstance(raw.get("rules"), list) and raw["rules"],
+             "要確認の基準には rules（1つ以上）が必要です。")
+    conds: list[dict] = []
+    parts: list[tuple[int, str]] = []   # 条件ごとの (ルールの番号, all / any)
+    seen = set()
+    for r, rule in enumerate(raw["rules"]):
+        _require(isinstance(rule, dict) and isinstance(rule.get("id"), str) and rule["id"], "各ルールには id（文字列）が必要です。")
+        _require(rule["id"] not in seen, f"ルール '{rule['id']}' が重複しています。")
+        seen.add(rule["id"])
+        p = rule.get("priority", 1)
+        _require(isinstance(p, int) and not isinstance(p, bool) and p >= 1, f"ルール '{rule['id']}' の priority は1以上の整数にしてください。")
+        all_of, any_of = _conditions(rule, "all"), _conditions(rule, "any")
+        _require(all_of or any_of, f"ルール '{rule['id']}' に条件（all / any）がありません。")
+        for part, cs in (("all", all_of), ("any", any_of)):
+            conds += cs
+            parts += [(r, part)] * len(cs)
+
+    rules = raw["rules"]
+    all_mask = np.zeros((len(conds), len(rules)), dtype=bool)
+    any_mask = np.zeros((len(conds), len(rules)), dtype=bool)
+    for c, (r, part) in enumerate(parts):
+        (all_mask if part == "all" else any_mask)[c, r] = True
+    out = TriageRules(
+        name=str(raw.get("name", "")),
+        version=str(raw.get("version", "")),
+        order_by=str(raw.get("order_by", "perma_mean")),
+        ids=tuple(r["id"] for r in rules),
+        labels=tuple(str(r.get("label", r["id"])) for r in rules),
+        priority=np.array([r.get("priority", 1) for r in rules], dtype=int),
+        cond_keys=tuple(c["key"] for c in conds),
+        cond_ops=tuple(c["op"] for c in conds),
+        cond_values=np.array([float(c["value"]) for c in conds]),
+        all_of=all_mask,
+        any_of=any_mask,
+        has_any=any_mask.any(axis=0),
+    )
+    for a in (out.priority, out.cond_values, out.all_of, out.any_of, out.has_any):
+        a.setflags(write=False)
+    return out
+
+@lru_cache(maxsize=4)
+def _load(path: str) -> TriageRules:
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise TriageError(f"要確認の基準を読み込めません（{path}）: {e}") from e
+    return compile_rules(raw)
+
+def rules_path() -> Path:
+    return Path(os.environ.get(RULES_ENV) or DEFAULT_RULES)
+
+def load_rules(path: Optional[str] = None) -> TriageRules:
+    # 一度だけ読み込み・検証し、以後はキャッシュを返す
+    return _load(str(path or rules_path()))
+
+# =========================
+# 判定（全員分をまとめて計算）
+# =========================
+def feature_names(schema: CompiledSchema) -> tuple[str, ...]:
+    return (*schema.keys, *AGGREGATES)
+
+def features(scores: np.ndarray, schema: CompiledSchema) -> np.ndarray:
+    # score_matrix の結果 (人数, 領域数) の右に PERMA の平均・最小を足す（PERMA が全部未回答なら NaN）
+    perma = scores[:, [schema.keys.index(k) for k in schema.keys_of("perma")]]
+    answered = ~np.isnan(perma)
+    n = answered.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(answered, perma, 0.0).sum(axis=1) / n
+    low = np.where(n > 0, np.where(answered, perma, np.inf).min(axis=1), np.nan)
+    return np.column_stack((scores, mean, low))
+
+def _columns(names: Iterable[str], schema: CompiledSchema) -> np.ndarray:
+    pos = {k: j for j, k in enumerate(feature_names(schema))}
+    bad = sorted({k for k in names if k not in pos})
+    _require(not bad, f"要確認の基準の {bad} が採点スキーマにありません（集計値は {AGGREGATES}）。")
+    return np.array([pos[k] for k in names], dtype=int)
+
+def evaluate(scores: np.ndarray, schema: CompiledSchema, rules: Optional[TriageRules] = None) -> np.ndarray:
+    # (人数, ルール数) の当てはまり。条件は (人数, 条件数) の比較1回ずつ、ルールへのまとめは行列積1回ずつ
+    # 未回答（NaN）の条件は満たさないものとする
+    rules = rules or load_rules()
+    values = features(scores, schema)[:, _columns(rules.cond_keys, schema)]
+    met = np.zeros(values.shape, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for op, fn in OPS.items():
+            sel = np.array([o == op for o in rules.cond_ops], dtype=bool)
+            if sel.any():
+                met[:, sel] = fn(values[:, sel], rules.cond_values[sel])
+    all_ok = (~met).astype(np.int32) @ rules.all_of.astype(np.int32) == 0
+    any_ok = (met.astype(np.int32) @ rules.any_of.astype(np.int32) > 0) | ~rules.has_any
+    return all_ok & any_ok
+
+def priorities(flags: np.ndarray, rules: Optional[TriageRules] = None) -> np.ndarray:
+    # 当てはまったルールの最も高い優先度（当てはまらなければ 0）
+    rules = rules or load_rules()
+    return np.where(flags, rules.priority, 0).max(axis=1, initial=0)
+
+# =========================
+# 要確認の一覧（優先度順・行を取り込むたびに更新）
+# =========================
+class TriageQueue:
+    # 優先度の高い順 → order_by の低い順 → ID 順に並べた一覧。
+    # update は取り込んだ行だけを判定し、当てはまる人を挿入・当てはまらなくなった人を取り除く
+    def __init__(self, schema: CompiledSchema, rules: Optional[TriageRules] = None):
+        self.schema = schema
+        self.rules = rules or load_rules()
+        self._order_col = int(_columns([self.rules.order_by], schema)[0])
+        self._entries: dict[str, TriageEntry] = {}
+        self._keys: list[tuple] = []      # sort_key の昇順
+        self._lock = threading.Lock()
+
+    def update(self, ids: Iterable[str], scores: np.ndarray) -> int:
+        # ids と scores（score_matrix の結果）は同じ行順。戻り値は一覧に入った・残った人数（この回の分）
+        ids = [str(s) for s in ids]
+        flags = evaluate(scores, self.schema, self.rules)
+        prio = priorities(flags, self.rules)
+        order = features(scores, self.schema)[:, self._order_col]
+        flagged = 0
+        with self._lock:
+            for i in np.flatnonzero((prio > 0) | np.fromiter((s in self._entries for s in ids), bool, len(ids))):
+                self._remove(ids[i])
+                if prio[i] > 0:
+                    rule_ids = tuple(r for r, f in zip(self.rules.ids, flags[i]) if f)
+                    self._insert(TriageEntry(ids[i], int(prio[i]), rule_ids, float(order[i])))
+                    flagged += 1
+        return flagged
+
+    def _insert(self, entry: TriageEntry):
+        self._entries[entry.sid] = entry
+        bisect.insort(self._keys, entry.sort_key())
+
+    def _remove(self, sid: str):
+        entry = self._entries.pop(sid, None)
+        if entry is not None:
+            key = entry.sort_key()
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def top(self, n: Optional[int] = None) -> list[TriageEntry]:
+        with self._lock:
+            keys = self._keys if n is None else self._keys[:n]
+            return [self._entries[k[2]] for k in keys]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, sid) -> bool:
+        return str(sid) in self._entries
+
+    def frame(self) -> "pd.DataFrame":
+        # スタッフ向けの表（ID・優先度・当てはまった基準・order_by の値）
+        import pandas as pd
+
+        labels = dict(zip(self.rules.ids, self.rules.labels))
+        entries = self.top()
+        return pd.DataFrame({
+            "ID": [e.sid for e in entries],
+            "優先度": [e.priority for e in entries],
+            "当てはまった基準": ["、".join(labels[r] for r in e.rules) for e in entries],
+            AGGREGATE_LABELS.get(self.rules.order_by, self.rules.order_by): [round(e.order_value, 2) for e in entries],
+        })
+
+    # 保存・復元（フォルダ監視で再起動しても一覧を引き継ぐ）
+    def to_json(self) -> dict:
+        return {"rules": f"{self.rules.name}@{self.rules.version}",
+                "entries": [[e.sid, e.priority, list(e.rules), e.order_value] for e in self.top()]}
+
+    def load_json(self, raw: dict):
+        # 基準の版が違えば読み込まない（取り込み直した人から判定し直す）
+        if raw.get("rules") != f"{self.rules.name}@{self.rules.version}":
+            return
+        with self._lock:
+            for sid, prio, rule_ids, value in raw.get("entries", []):
+                self._remove(str(sid))
+                self._insert(TriageEntry(str(sid), int(prio), tuple(rule_ids), float(value)))
+
+def cohort_queue(df: "pd.DataFrame", scores: np.ndarray, schema: CompiledSchema,
+                 index: Optional[dict[str, int]] = None) -> TriageQueue:
+    # 読み込んだファイル全員分（scores は groups.cohort_scores の結果）。同じ ID が複数行あれば最初の行
+    if index is None:
+        from parma.report import id_index
+
+        index = id_index(df)
+    queue = TriageQueue(schema)
+    queue.update(list(index), scores[list(index.values())])
+    return queue
+
+# =========================
+# Streamlit 表示
+# =========================
+def render_triage_view(queue: TriageQueue, on_open=None):
+    # on_open(ID) を渡すと、一覧から選んだ人の個人レポートを開くボタンを出す
+    import streamlit as st
+
+    st.subheader("要確認リスト")
+    st.caption(f"基準：{queue.rules.name}（{queue.rules.version}）・{len(queue)} 人")
+    if not len(queue):
+        st.info("基準に当てはまる人はいませんでした。")
+        return
+    table = queue.frame()
+    st.dataframe(table, width="stretch", hide_index=True)
+    if on_open is not None:
+        c1, c2 = st.columns([3, 1], vertical_alignment="bottom")
+        sid = c1.selectbox("個人レポートを開く", table["ID"], key="triage_pick")
+        c2.button("開く", on_click=on_open, args=(sid,), width="stretch")
+    st.download_button(
+        "要確認リストを CSV で保存",
+        table.to_csv(index=False).encode("utf-8-sig"),
+        file_name="parma_triage.csv",
+        mime="text/csv",
+    )
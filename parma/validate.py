@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from parma.scoring import CompiledSchema, answer_matrix
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 行ごとの問題（表示順）
+ROW_ISSUES = ("ID空欄", "ID重複", "数値以外", "範囲外", "全項目未回答")
+
+
+@dataclass(frozen=True)
+class ValidationReport:
+    n_rows: int
+    missing_columns: tuple     # スキーマにあるがファイルにない列
+    columns: "pd.DataFrame"    # 列ごとの件数（数値以外・範囲外・未回答）
+    rows: "pd.DataFrame"       # 問題のある行だけ（行番号・ID・問題ごとの有無・該当列）
+    flagged: np.ndarray        # 元の行順の bool（問題のある行）
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing_columns and not self.flagged.any()
+
+    def counts(self) -> dict:
+        return {k: int(self.rows[k].sum()) for k in ROW_ISSUES}
+
+# =========================
+# 検証（全行まとめて1回）
+# =========================
+def validate_answers(df: "pd.DataFrame", schema: CompiledSchema) -> ValidationReport:
+    import pandas as pd
+
+    n = len(df)
+    by_name = {str(c): c for c in df.columns}
+    present = np.array([name in by_name for name in schema.columns])
+    missing_columns = tuple(name for name, ok in zip(schema.columns, present) if not ok)
+
+    # 元の値が入っているのに数値にならない＝文字列など。数値は尺度の範囲外を調べる
+    answers = answer_matrix(df, schema)
+    filled = np.zeros((n, len(schema.columns)), dtype=bool)
+    if present.any():
+        filled[:, present] = df[[by_name[c] for c in np.array(schema.columns)[present]]].notna().to_numpy()
+    numeric = ~np.isnan(answers)
+    not_numeric = filled & ~numeric
+    with np.errstate(invalid="ignore"):
+        out_of_range = numeric & ((answers < schema.scale_min) | (answers > schema.scale_max))
+    blank = ~filled & present
+
+    ids = df.iloc[:, 0]
+    id_blank = ids.isna().to_numpy()
+    id_dup = ids.astype(str).duplicated(keep=False).to_numpy() & ~id_blank
+
+    row_flags = {
+        "ID空欄": id_blank,
+        "ID重複": id_dup,
+        "数値以外": not_numeric.any(axis=1),
+        "範囲外": out_of_range.any(axis=1),
+        "全項目未回答": present.any() & ~numeric.any(axis=1),
+    }
+    flagged = np.logical_or.reduce(list(row_flags.values()))
+
+    columns = pd.DataFrame(
+        {"数値以外": not_numeric.sum(axis=0), "範囲外": out_of_range.sum(axis=0), "未回答": blank.sum(axis=0)},
+        index=pd.Index(schema.columns, name="列"),
+    )
+
+    # 該当列の一覧は問題のある行だけ組み立てる
+    pos = np.flatnonzero(flagged)
+    bad = (not_numeric | out_of_range)[pos]
+    where = np.full(len(pos), "", dtype=object)
+    for j, name in enumerate(schema.columns):
+        hit = bad[:, j]
+        if hit.any():
+            where[hit] += name + " "
+    rows = pd.DataFrame({
+        "行": pos + 2,  # Excel の行番号（1行目は見出し）
+        "ID": ids.iloc[pos].astype(str).where(~id_blank[pos], "").to_numpy(),
+        **{k: v[pos] for k, v in row_flags.items()},
+        "該当列": [w.strip() for w in where],
+    })
+    return ValidationReport(n, missing_columns, columns, rows, flagged)
+
+# =========================
+# Streamlit 表示（アップロード画面）
+# =========================
+def render_validation(report: ValidationReport, key: str = "validation") -> bool:
+    # 問題の概要と一覧を表示し、「問題のある行を除外する」が選ばれたら True を返す
+    import streamlit as st
+
+    if report.ok:
+        st.success(f"{report.n_rows} 行を確認しました。問題は見つかりませんでした。")
+        return False
+
+    if report.missing_columns:
+        st.error(f"ファイルにない列があります（未回答として扱われます）：{', '.join(report.missing_columns)}")
+    counts = report.counts()
+    summary = "、".join(f"{k} {v} 行" for k, v in counts.items() if v)
+    if summary:
+        st.warning(f"{report.n_rows} 行中 {len(report.rows)} 行に問題があります（{summary}）。"
+                   "数値以外の回答は未回答として扱われます。")
+
+    with st.expander("確認結果の詳細"):
+        st.caption("列ごとの件数")
+        st.dataframe(report.columns[(report.columns.T != 0).any()], width="stretch")
+        if len(report.rows):
+            st.caption("問題のある行")
+            st.dataframe(report.rows, hide_index=True, width="stretch")
+            st.download_button(
+                "問題のある行を CSV で保存",
+                report.rows.to_csv(index=False).encode("utf-8-sig"),
+                file_name="parma_validation.csv",
+                mime="text/csv",
+                key=f"{key}_csv",
+            )
+    if not len(report.rows):
+        return False
+    return st.checkbox("問題のある行を除外して表示・印刷する", key=f"{key}_exclude")
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+# =========================
+# 設定
+# =========================
+INTERVAL_S = 2.0       # フォルダを見に行く間隔
+SETTLE_S = 5.0         # サイズと更新時刻がこれだけ変わらなければ書き込み完了とみなす
+QUEUE_SIZE = 64        # 描画待ちの上限（超えると採点側が待つ）
+SUFFIXES = (".xlsx", ".csv")
+FORMATS = ("html", "pdf")
+STATE_FILE = ".parma_watch.json"
+TRIAGE_FILE = ".parma_triage.json"
+TRIAGE_CSV = "triage.csv"          # スタッフ向けの要確認リスト（優先度順）
+
+def log(msg: str):
+    print(f"[{time.strftime('%H:%M:%S')}] {msg}", file=sys.stderr, flush=True)
+
+def _signature(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def _candidates(inbox: Path) -> Iterator[Path]:
+    # Excel の作業中ファイル（~$…）や隠しファイルは対象外
+    for p in sorted(inbox.iterdir()):
+        if p.is_file() and p.suffix.lower() in SUFFIXES and not p.name.startswith(("~$", ".")):
+            yield p
+
+def safe_name(sid: str) -> str:
+    # ファイル名に使えない文字を _ に。置き換えたときは元の ID のハッシュを付ける（a/b と a_b が同じ名前にならないように）
+    sid = str(sid)
+    name = re.sub(r"[^\w.\-]", "_", sid)
+    if name == sid and sid not in (".", ".."):
+        return name
+    return f"{name}-{hashlib.blake2b(sid.encode('utf-8'), digest_size=4).hexdigest()}"
+
+# =========================
+# 書き込み途中のファイルを待つ
+# =========================
+class Debouncer:
+    def __init__(self, settle_s: float = SETTLE_S):
+        self.settle_s = settle_s
+        self._seen: dict[Path, tuple[tuple[int, int], float]] = {}   # パス → (サイズと更新時刻, その値になった時刻)
+
+    def settled(self, path: Path, now: Optional[float] = None) -> Optional[tuple[int, int]]:
+        # サイズと更新時刻が settle_s 秒変わっていなければその値を返す。まだ書き込み中なら None
+        now = now or time.time()
+        sig = _signature(path)
+        if sig is None or sig[0] == 0:
+            self._seen.pop(path, None)
+            return None
+        prev = self._seen.get(path)
+        if prev is None or prev[0] != sig:
+            self._seen[path] = (sig, now)
+            return None
+        return sig if now - prev[1] >= self.settle_s else None
+
+    def forget(self, path: Path):
+        self._seen.pop(path, None)
+
+# =========================
+# 処理済みの記録（出力フォルダに保存）
+# =========================
+class WatchState:
+    # files：処理したファイルのサイズと更新時刻、answers：ID → 回答のハッシュ（前回と同じ回答の人は描き直さない）
+    def __init__(self, path: Path, schema_id: str):
+        self.path = path
+        self.schema_id = schema_id
+        self.files: dict[str, list] = {}
+        self.answers: dict[str, str] = {}
+        if path.exists():
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            # 採点スキーマ・テンプレートが変わっていたら全員を描き直す
+            if raw.get("schema") == schema_id:
+                self.files = raw.get("files", {})
+                self.answers = raw.get("answers", {})
+
+    def done(self, name: str, sig: tuple[int, int]) -> bool:
+        return self.files.get(name) == list(sig)
+
+    def save(self):
+        # 途中で止まっても壊れないよう、一時ファイルに書いてから置き換える
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"schema": self.schema_id, "files": self.files, "answers": self.answers},
+                                  ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def answer_digests(answers: np.ndarray, langs) -> list[str]:
+    # 1行ずつ回答と言語のハッシュ（未回答の NaN も含めてバイト列で比べる）
+    answers = np.ascontiguousarray(answers, dtype=float)
+    return [hashlib.blake2b(row.tobytes() + str(lang).encode("utf-8"), digest_size=8).hexdigest()
+            for row, lang in zip(answers, langs)]
+
+# =========================
+# 描画（上限つきの待ち行列と作業スレッド）
+# =========================
+class Renderer:
+    def __init__(self, out_dir: Path, schema, formats=FORMATS, workers: int = 1, queue_size: int = QUEUE_SIZE,
+                 store=None):
+        # store（parma/artifacts.py）を渡すと、同じ回答・スキーマ・テンプレートで描いたことがある人は描画を省く
+        self.out_dir = out_dir
+        self.schema = schema
+        self.store = store
+        self.formats = tuple(formats)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.written = self.failed = 0
+        self.succeeded: set[str] = set()   # 出力を書き終えた ID（ingest が取り出す）
+        self.waited_s = 0.0   # 待ち行列が一杯で採点側が待った時間
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"parma-watch-{i}", daemon=True).start()
+
+    def submit(self, record: tuple, answers: np.ndarray):
+        # 一杯なら空くまで待つ（ファイルの読み込み・採点が描画より先に進みすぎない）
+        try:
+            self.queue.put_nowait((record, answers))
+        except queue.Full:
+            t0 = time.perf_counter()
+            self.queue.put((record, answers))
+            with self._lock:
+                self.waited_s += time.perf_counter() - t0
+
+    def join(self) -> set[str]:
+        # 待ち行列が空になるまで待ち、それまでに書き終えた ID を返す（失敗した ID は含まない）
+        self.queue.join()
+        with self._lock:
+            done, self.succeeded = self.succeeded, set()
+        return done
+
+    def _work(self):
+        while True:
+            record, answers = self.queue.get()
+            try:
+                self._write(record, answers)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                log(f"ID {record[0]} の出力に失敗しました：{e!r}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, record: tuple, answers: np.ndarray):
+        from parma import export, report
+        from parma.artifacts import artifact_key
+
+        sid = record[0]
+        for fmt in self.formats:
+            if self.store is not None:
+                out = self.store.get_or_render(artifact_key(sid, answers, self.schema, fmt, record[5]), fmt,
+                                               lambda: report.render(record, fmt))
+            else:
+                out = report.render(record, fmt)
+            if fmt == "html":
+                data = export.report_document(out, sid).encode("utf-8")
+            else:
+                data = out
+            target = self.out_dir / fmt / f"{safe_name(sid)}.{fmt}"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, target)
+        with self._lock:
+            self.written += 1
+            self.succeeded.add(sid)
+
+# =========================
+# 1ファイルの取り込み
+# =========================
+def ingest(path: Path, sig: tuple[int, int], schema, state: WatchState, renderer: Renderer, triage=None) -> int:
+    # 新しい人・回答が変わった人だけを採点して描画に回す。全員分の描画が終わってから記録を保存する
+    # 出力に失敗した人は記録しない（ファイルも処理済みにせず、次に見に行ったときにその人だけ描き直す）
+    # triage（parma/triage.py の TriageQueue）を渡すと、採点した人だけ要確認の判定をやり直す
+    from parma.export import read_workbook
+    from parma.i18n import row_langs
+    from parma.scoring import answer_matrix, classify, score_matrix, split_scores
+    from parma.tips import personal_tips
+    from parma.validate import validate_answers
+
+    df = read_workbook(path)
+    counts = {k: v for k, v in validate_answers(df, schema).counts().items() if v}
+    if counts:
+        log(f"{path.name}：要確認の行があります {counts}")
+    has_id = df.iloc[:, 0].notna().to_numpy()
+    df = df[has_id]
+    ids = df.iloc[:, 0].astype(str).to_numpy()
+    # 同じ ID が複数行あれば最初の行（結果画面と同じ）
+    _, first = np.unique(ids, return_index=True)
+    first.sort()
+    answers = answer_matrix(df.iloc[first], schema)
+    langs = row_langs(df.iloc[first])
+    ids = ids[first]
+    digests = answer_digests(answers, langs)
+    new = np.array([state.answers.get(s) != d for s, d in zip(ids, digests)], dtype=bool)
+
+    done: set[str] = set()
+    if new.any():
+        scores = score_matrix(answers[new], schema)
+        personal = personal_tips(scores, schema, langs[new])
+        for sid, row, ans, lang, row_tips in zip(ids[new], scores, answers[new], langs[new], personal):
+            perma, extras = split_scores(row, schema)
+            renderer.submit((str(sid), perma, extras, *classify(perma, schema), str(lang), row_tips), ans)
+        if triage is not None:
+            triage.update(ids[new], scores)
+        done = renderer.join()
+    failed = 0
+    for sid, d in zip(ids[new], np.asarray(digests)[new]):
+        if str(sid) in done:
+            state.answers[str(sid)] = str(d)
+        else:
+            failed += 1
+    if failed:
+        log(f"{path.name}：{failed} 人分の出力に失敗しました（次回やり直します）")
+    else:
+        state.files[path.name] = list(sig)
+    state.save()
+    return int(new.sum()) - failed
+
+def save_triage(out_dir: Path, triage):
+    # 再起動用の記録と、スタッフ向けの CSV（優先度順）を書き出す
+    for name, data in ((TRIAGE_FILE, json.dumps(triage.to_json(), ensure_ascii=False).encode("utf-8")),
+                       (TRIAGE_CSV, triage.frame().to_csv(index=False).encode("utf-8-sig"))):
+        tmp = out_dir / (name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, out_dir / name)
+
+# =========================
+# 監視ループ
+# =========================
+def watch(inbox: Path, out_dir: Path, formats=FORMATS, interval_s: float = INTERVAL_S, settle_s: float = SETTLE_S,
+          workers: int = 1, queue_size: int = QUEUE_SIZE, once: bool = False):
+    # once=True なら、いまあるファイルを処理し終えたら戻る
+    from parma.artifacts import artifact_store, schema_version, template_version
+    from parma.i18n import precompile
+    from parma.scoring import load_schema
+    from parma.triage import TriageQueue, rules_path
+
+    schema = load_schema()
+    precompile()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # 採点スキーマ・出力の見た目（テンプレート）・要確認の基準のどれかが変わったら全員を出し直す
+    rules_id = hashlib.blake2b(rules_path().read_bytes(), digest_size=8).hexdigest()
+    state_id = "|".join([schema_version(schema), *(template_version(f) for f in formats), rules_id])
+    state = WatchState(out_dir / STATE_FILE, state_id)
+    renderer = Renderer(out_dir, schema, formats, workers, queue_size, artifact_store())
+    triage = TriageQueue(schema)
+    if (out_dir / TRIAGE_FILE).exists() and state.answers:
+        # 前回の一覧を引き継ぐ（全員を出し直すときは空から作り直す）
+        triage.load_json(json.loads((out_dir / TRIAGE_FILE).read_text(encoding="utf-8")))
+    debouncer = Debouncer(settle_s)
+    failed: dict[str, tuple[int, int]] = {}   # 読み込めなかったファイル（変更されるまで再試行しない）
+    log(f"{inbox} を監視します（出力：{out_dir}）")
+    while True:
+        waiting = False
+        for path in _candidates(inbox):
+            sig = _signature(path)
+            if sig is None or state.done(path.name, sig) or failed.get(path.name) == sig:
+                continue
+            sig = debouncer.settled(path)
+            if sig is None:
+                waiting = True
+                continue
+            debouncer.forget(path)
+            t0 = time.perf_counter()
+            try:
+                n = ingest(path, sig, schema, state, renderer, triage)
+                if n:
+                    save_triage(out_dir, triage)
+            except Exception as e:
+                failed[path.name] = sig
+                log(f"{path.name} を読み込めませんでした：{e!r}")
+                continue
+            log(f"{path.name}：{n} 人分を出力しました（{time.perf_counter() - t0:.1f} 秒、"
+                f"描画待ちで {renderer.waited_s:.1f} 秒待機、失敗 {renderer.failed} 件、要確認 {len(triage)} 人）")
+        if once and not waiting:
+            return renderer
+        time.sleep(min(interval_s, settle_s) if waiting else interval_s)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m parma.watch", description="フォルダに置かれた回答ファイルから自動でレポートを作る")
+    parser.add_argument("inbox", help="監視するフォルダ（.xlsx / .csv）")
+    parser.add_argument("output", help="出力先フォルダ（html/ と pdf/ に ID ごとのファイルを作ります）")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="出力する形式")
+    parser.add_argument("--interval", type=float, default=INTERVAL_S, help="フォルダを見に行く間隔（秒）")
+    parser.add_argument("--settle", type=float, default=SETTLE_S, help="書き込み完了とみなすまでの時間（秒）")
+    parser.add_argument("--workers", type=int, default=1, help="描画を行うスレッド数")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="描画待ちの上限（人数）")
+    parser.add_argument("--once", action="store_true", help="いまあるファイルを処理したら終了する")
+    args = parser.parse_args(argv)
+
+    inbox = Path(args.inbox)
+    if not inbox.is_dir():
+        parser.error(f"フォルダがありません：{inbox}")
+    try:
+        watch(inbox, Path(args.output), args.formats, args.interval, args.settle, args.workers, args.queue, args.once)
+    except KeyboardInterrupt:
+        log("監視を終了しました")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from parma.scoring import load_schema
+
+
+@pytest.fixture
+def schema():
+    return load_schema()
+
+
+@pytest.fixture
+def workbook(schema):
+    # ID 列＋施設＋回答 23 列（0〜10 の整数）。乱数は固定
+    def make(n: int = 20, seed: int = 0, ids=None) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame({"ID": ids if ids is not None else [f"A{i:04d}" for i in range(n)],
+                           "施設": rng.choice(["北", "南"], n)})
+        for c in schema.columns:
+            df[c] = rng.integers(0, 11, n).astype(float)
+        return df
+    return make
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    # 保存済みの出力はテストごとの一時フォルダに
+    from parma import artifacts
+
+    monkeypatch.setenv(artifacts.DIR_ENV, str(tmp_path / "artifacts"))
+    monkeypatch.setattr(artifacts, "_store", None)
+    return tmp_path / "artifacts"
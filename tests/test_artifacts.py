@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+
+import numpy as np
+import pytest
+
+from parma import export
+from parma.artifacts import batch_key
+
+
+def test_batch_key_ignores_blank_id_rows(workbook, schema):
+    df = workbook(5, ids=[1000, 1001, np.nan, 1003, 1004])
+    # 出力されない行（ID が空）はキーにも効かない
+    assert batch_key(df, schema, "html") == batch_key(df.drop(index=2), schema, "html")
+
+
+def test_export_with_blank_id_uses_store(workbook, artifact_dir, tmp_path, capsys):
+    df = workbook(5, ids=[1000, 1001, np.nan, 1003, 1004])
+    src = tmp_path / "answers.csv"
+    df.to_csv(src, index=False)
+    first, second = tmp_path / "a.html", tmp_path / "b.html"
+    export.main(["bundle", str(src), str(first)])
+    export.main(["bundle", str(src), str(second)])
+    assert "保存済みの出力をコピーしました" in capsys.readouterr().err
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_text(encoding="utf-8").count('class="page') > 0
+
+
+def test_default_store_is_private(monkeypatch, tmp_path):
+    from parma import artifacts
+
+    monkeypatch.delenv(artifacts.DIR_ENV, raising=False)
+    monkeypatch.setattr(artifacts, "_store", None)
+    monkeypatch.setattr(artifacts.tempfile, "gettempdir", lambda: str(tmp_path))
+    store = artifacts.artifact_store()
+    assert store.root == artifacts.default_root()
+    assert stat.S_IMODE(store.root.stat().st_mode) == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX のみ")
+def test_shared_store_dir_is_rejected(monkeypatch, tmp_path):
+    from parma import artifacts, sessions
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    monkeypatch.setenv(artifacts.DIR_ENV, str(shared))
+    monkeypatch.setattr(artifacts, "_store", None)
+    with pytest.raises(sessions.SpillDirError, match="出力の保存先"):
+        artifacts.artifact_store()
+
+    link = tmp_path / "link"
+    link.symlink_to(tmp_path / "elsewhere", target_is_directory=True)
+    (tmp_path / "elsewhere").mkdir(mode=0o700)
+    monkeypatch.setenv(artifacts.DIR_ENV, str(link))
+    with pytest.raises(sessions.SpillDirError):
+        artifacts.artifact_store()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from parma import assets, html_report
+
+
+def _clear():
+    for f in (assets.illust_png, assets.illust_size, assets.illust_src, html_report.illust_css):
+        f.cache_clear()
+
+
+@pytest.fixture
+def fresh_caches():
+    _clear()
+    yield
+    _clear()
+
+
+def test_illustration_is_bundled(fresh_caches):
+    assert assets.ILLUST_FILE.exists()
+    css = html_report.illust_css()
+    assert "data:image/png;base64," in css
+    assert "http" not in css
+
+
+def test_missing_illustration_is_omitted(fresh_caches, tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "ILLUST_FILE", tmp_path / "none.png")
+    assert assets.illust_src() is None
+    css = html_report.illust_css()
+    assert "display:none" in css and "url(" not in css
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from parma.cache import ReportCache, sizeof
+
+
+def _record(i: int) -> tuple:
+    tips = {"P": ("行動例" * 50 + str(i), "別の行動例" * 50)}
+    return (f"A{i}", {"P": 7.0, "E": 6.5}, {"x": 1.0}, ["P"], ["E"], "ja", tips)
+
+
+def test_sizeof_counts_nested_record():
+    rec = _record(0)
+    assert sizeof(rec) > sys.getsizeof(rec) + sys.getsizeof(rec[6]["P"][0])
+    assert sizeof(b"x" * 1000) == sys.getsizeof(b"x" * 1000)
+
+
+def test_budget_limits_nested_records():
+    per_record = sizeof(_record(0))
+    cache = ReportCache(budget_bytes=per_record * 3)
+    for i in range(10):
+        cache.put(("wb", str(i), "record"), _record(i))
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.budget
+    assert stats["entries"] <= 3 and stats["evictions"] >= 7
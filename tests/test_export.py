@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import io
+
+from parma import export
+from parma.cache import ReportCache
+
+
+def _bundle(df, schema, cache=None) -> str:
+    out = io.StringIO()
+    export.write_print_bundle(df, out, schema, cache=cache, wb_hash="wb")
+    return out.getvalue()
+
+
+def test_bundle_with_duplicate_ids_ignores_id_cache(workbook, schema):
+    df = workbook(3, ids=["A", "B", "A"])
+    df.iloc[2, 2:] = 0.0   # 2行目の A は1行目と別の回答
+    plain = _bundle(df, schema)
+    cache = ReportCache(1 << 20)
+    cache.put(("wb", "A", "html"), "<p>CACHED-A</p>")
+    cache.put(("wb", "B", "html"), "<p>CACHED-B</p>")
+    got = _bundle(df, schema, cache)
+    # 重複のない B はキャッシュを使い、重複する A は両方の行とも自分の回答で描く
+    assert "CACHED-B" in got and "CACHED-A" not in got
+    assert got == plain.replace(_bundle(df.iloc[[1]], schema).split('<div class="report">\n', 1)[1].rsplit("</div>\n</body>", 1)[0],
+                                "<p>CACHED-B</p>\n", 1)
+    assert _bundle(df, schema, cache) == got
+
+
+def test_bundle_duplicate_rows_render_their_own_answers(workbook, schema):
+    df = workbook(2, ids=["A", "A"])
+    df.iloc[1, 2:] = 0.0
+    cache = ReportCache(1 << 20)
+    single = _bundle(df.iloc[[1]], schema)
+    cache.put(("wb", "A", "html"), _bundle(df.iloc[[0]], schema))
+    got = _bundle(df, schema, cache)
+    body = single.split('<div class="report">\n', 1)[1].rsplit("</div>\n</body>", 1)[0]
+    assert body in got   # 2行目は1行目のキャッシュではなく自分の回答の HTML
+
+
+
+def test_sort_by_id_numeric_then_text_blank_first():
+    import numpy as np
+    import pandas as pd
+
+    df = pd.DataFrame({"ID": ["M", None, "10", "a", 2, np.nan, "9"], "x": range(7)})
+    # 数値の ID は数値順、残りは文字列順で空欄（"None"・"nan" ではなく ""）が先頭。空欄どうしは元の順
+    assert export.sort_by_id(df)["x"].tolist() == [4, 6, 2, 1, 5, 0, 3]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from parma.i18n import LANG_ENV, LocaleError, normalize_lang, row_langs
+
+
+@pytest.fixture(autouse=True)
+def _no_lang_env(monkeypatch):
+    monkeypatch.delenv(LANG_ENV, raising=False)
+
+
+@pytest.mark.parametrize("value, lang", [
+    ("PT-br", "pt"), (" pt_BR ", "pt"), ("Português", "pt"),
+    ("english", "en"), ("EN", "en"), ("英語", "en"),
+    ("日本語", "ja"), ("", "ja"), ("   ", "ja"), (None, "ja"), (np.nan, "ja"), ("klingon", "ja"),
+])
+def test_normalize_lang(value, lang):
+    assert normalize_lang(value) == lang
+
+
+def test_normalize_lang_default(monkeypatch):
+    assert normalize_lang("", "en") == "en"
+    monkeypatch.setenv(LANG_ENV, "pt")
+    assert normalize_lang(None) == "pt" and normalize_lang("english") == "en"
+    monkeypatch.setenv(LANG_ENV, "fr")
+    with pytest.raises(LocaleError):
+        normalize_lang("")
+
+
+def test_row_langs_per_row_fallback(monkeypatch):
+    df = pd.DataFrame({"ID": list("abcdef"),
+                       "Language": ["English", None, "PT-br", "", "?", "english"]})
+    assert row_langs(df).tolist() == ["en", "ja", "pt", "ja", "ja", "en"]
+    assert row_langs(df, "pt").tolist() == ["en", "pt", "pt", "pt", "pt", "en"]
+    monkeypatch.setenv(LANG_ENV, "en")
+    assert row_langs(df).tolist() == ["en", "en", "pt", "en", "en", "en"]
+
+    # 言語の列がなければ全員 default。1列目（ID）は言語の列として扱わない
+    assert row_langs(df[["ID"]], "pt").tolist() == ["pt"] * 6
+    assert row_langs(pd.DataFrame({"lang": ["en"], "x": [1]}), "pt").tolist() == ["pt"]
+    assert row_langs(df.iloc[:0]).tolist() == []
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import io
+import re
+
+from parma import pdf_report
+
+
+def _records(n: int) -> list[tuple]:
+    return [(f"A{i:03d}", {k: float(i % 10) for k in "PERMA"}, {}, [], [], "ja", {}) for i in range(n)]
+
+
+def _outline(data: bytes) -> list[tuple[str, int]]:
+    # しおり → 飛び先のページ番号（0 始まり）
+    text = data.decode("latin-1")
+    kids = re.search(r"/Kids \[([^\]]*)\]", text).group(1).split(" R")
+    pages = [k.split()[0] for k in kids if k.strip()]
+    entries = re.findall(r"/Dest \[ (\d+) 0 R [^\]]*\][^>]*?/Title \((ID [^)]*)\)", text)
+    return [(title, pages.index(obj)) for obj, title in entries]
+
+
+def test_write_pdf_keeps_order_and_bookmarks():
+    buf = io.BytesIO()
+    assert pdf_report.write_pdf(_records(5), buf) == [buf]
+    # 1人2ページ。しおりは入力の順で、それぞれの1ページ目を指す
+    assert _outline(buf.getvalue()) == [(f"ID A{i:03d}", 2 * i) for i in range(5)]
+
+
+def test_parallel_layout_matches_in_process():
+    one, two = io.BytesIO(), io.BytesIO()
+    pdf_report.write_pdf(_records(120), one)
+    pdf_report.write_pdf(_records(120), two, workers=2)
+    assert one.getvalue() == two.getvalue()
+
+
+def test_per_file_split(tmp_path):
+    out = str(tmp_path / "out_{n:03d}.pdf")
+    paths = pdf_report.write_pdf(_records(5), out, per_file=2)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["out_001.pdf", "out_002.pdf", "out_003.pdf"]
+    with open(paths[2], "rb") as f:
+        assert _outline(f.read()) == [("ID A004", 0)]
+
+
+def test_page2_wraps_long_tips():
+    from reportlab.pdfbase import pdfmetrics
+
+    font = pdf_report.register_font()
+    tip = "毎日寝る前に、その日にうまくいったことを三つ書き出して、なぜうまくいったのかを考えてみましょう。" * 2
+    rec = pdf_report.PageRecorder()
+    pdf_report.draw_page2(rec, font, {k: 2.0 for k in "PERMA"}, ["P"], [], "ja", {"P": [tip, "短い例"]})
+
+    size, lines = None, []
+    for name, args, _ in rec.ops:
+        if name == "setFont":
+            size = args[1]
+        elif name == "drawString" and size == 10:
+            lines.append((args[0], args[2]))
+    # 10pt の行は行動例だけ。イラストの左に収まり、つなげると元の文になる
+    right = pdf_report.PAGE_W - pdf_report.MARGIN_X - 41 * pdf_report.mm - pdf_report.GAP
+    assert len(lines) > 3
+    assert all(x + pdfmetrics.stringWidth(s, font, 10) <= right + 0.01 for x, s in lines)
+    assert "".join(s for _, s in lines) == f"・{tip}・短い例"
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from parma import prefetch
+from parma.cache import ReportCache
+
+
+def _wait_idle(p: prefetch.Prefetcher, owner, timeout: float = 5.0):
+    end = time.monotonic() + timeout
+    while p.pending(owner) and time.monotonic() < end:
+        time.sleep(0.01)
+    assert p.pending(owner) == 0
+
+
+def test_reschedule_cancels_dropped_keys(monkeypatch):
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+    cache = ReportCache(1 << 20)
+    p = prefetch.prefetcher(cache)
+    assert prefetch.prefetcher(cache) is p
+
+    rendered = []
+    started, gate = threading.Event(), threading.Event()
+
+    def job(key):
+        def render():
+            rendered.append(key)
+            return f"<{key}>"
+        return key, render
+
+    def blocker():
+        # 先読みのスレッドは1本なので、これが終わるまで後の予約は始まらない
+        started.set()
+        gate.wait(5)
+        return "<k0>"
+
+    assert p.schedule("s1", [("k0", blocker)]) == 1
+    assert started.wait(5)
+    assert p.schedule("s1", [("k0", blocker), job("a"), job("b")]) == 2
+    # 別の ID に移動：a・b は取り消し、c・d を予約（k0 は描画中のまま）
+    assert p.schedule("s1", [("k0", blocker), job("c"), job("d")]) == 2
+    assert p.pending("s1") == 3
+    gate.set()
+    _wait_idle(p, "s1")
+
+    assert rendered == ["c", "d"]
+    assert [k for k in ("k0", "a", "b", "c", "d") if k in cache] == ["k0", "c", "d"]
+    assert cache.get("c") == "<c>"
+    # キャッシュ済みのものは予約しない
+    assert p.schedule("s1", [job("c")]) == 0
+
+
+def test_cancelled_while_rendering_is_not_cached():
+    cache = ReportCache(1 << 20)
+    p = prefetch.Prefetcher(cache)
+    started, gate = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        gate.wait(5)
+        return "<slow>"
+
+    p.schedule("s1", [("slow", slow)])
+    assert started.wait(5)
+    p.schedule("s1", [])          # 描画中に取り消し
+    gate.set()
+    p._pool.shutdown(wait=True)
+    assert "slow" not in cache
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from parma import research
+
+SALT = b"test-salt"
+
+
+@pytest.mark.parametrize("chunk_rows", [1000, 3, 1])
+def test_research_id_independent_of_chunks_csv(workbook, schema, tmp_path, chunk_rows):
+    ids = pd.array([1000, 1001, None, 1003, 1004, 1005, None], dtype="Int64")
+    src = tmp_path / "answers.csv"
+    workbook(len(ids), ids=ids).to_csv(src, index=False)   # ファイル上は 1000, 1001, （空）, ...
+    out = pd.concat(research.research_frame(c, schema, SALT) for c in research.iter_workbook(src, chunk_rows))
+    assert out[research.ID_COLUMN].tolist() == research.hash_ids(["1000", "1001", "1003", "1004", "1005"], SALT)
+
+
+def test_research_id_independent_of_chunks_frame(workbook, schema):
+    # 表を直接渡したとき（数値の ID 列に空欄がありチャンクごとに小数になる）も同じ研究用 ID
+    df = workbook(7, ids=[1000, 1001, np.nan, 1003, 1004, 1005, np.nan])
+    hashed = [pd.concat(research.research_frame(c, schema, SALT) for c in research.iter_frame(df, n))[research.ID_COLUMN].tolist()
+              for n in (1000, 3, 2)]
+    assert hashed[0] == hashed[1] == hashed[2]
+    assert hashed[0][0] == research.hash_ids(["1000"], SALT)[0]
+
+
+def test_id_text_keeps_text_ids():
+    assert research.id_text(["A001", 7, 7.0, 7.5, "0012"]) == ["A001", "7", "7", "7.5", "0012"]
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from parma.scoring import DEFAULT_SCHEMA, CompiledSchema, SchemaError, compile_schema, score_matrix, validate_schema
+
+
+def _raw() -> dict:
+    with open(DEFAULT_SCHEMA, encoding="utf-8") as f:
+        return json.load(f)
+
+# =========================
+# 以前の固定インデックスによる採点との一致（min_items=1 のとき）
+# =========================
+OLD_PERMA = {"P": [4, 9, 21], "E": [2, 10, 20], "R": [5, 14, 18], "M": [0, 8, 16], "A": [1, 7, 15]}
+OLD_EXTRA = {
+    "気持ちの様子（いやな気持）": [6, 13, 19],
+    "からだの調子": [3, 12, 17],
+    "ひとりぼっち感": [11],
+    "全体的なしあわせ感": [22],
+}
+
+
+def compute_domain_avg(vals, idx):
+    scores = [vals[i] for i in idx if i < len(vals) and not np.isnan(vals[i])]
+    return float(np.mean(scores)) if scores else np.nan
+
+
+def _old_scores(vals) -> dict:
+    out = {k: compute_domain_avg(vals, v) for k, v in {**OLD_PERMA, **OLD_EXTRA}.items()}
+    perma_15 = sorted({i for v in OLD_PERMA.values() for i in v})
+    out["心の健康の総合得点"] = compute_domain_avg(vals, perma_15 + [22])
+    return out
+
+
+def test_matches_old_compute_domain_avg():
+    raw = _raw()
+    raw["missing"] = {"min_items": 1, "impute": "none"}
+    schema = compile_schema(raw)
+    rng = np.random.default_rng(0)
+    answers = rng.integers(0, 11, (500, 23)).astype(float)
+    answers[rng.random(answers.shape) < 0.3] = np.nan
+    answers[0] = np.nan   # 全部未回答
+    got = score_matrix(answers, schema)
+    for row, vals in zip(got, answers):
+        want = _old_scores(vals)
+        np.testing.assert_allclose(row, [want[k] for k in schema.keys], equal_nan=True)
+
+# =========================
+# スキーマの検証
+# =========================
+def _mutate(path: str, value):
+    raw = _raw()
+    target = raw
+    *parents, last = path.split(".")
+    for p in parents:
+        target = target[int(p)] if p.isdigit() else target[p]
+    if value is KeyError:
+        del target[last]
+    else:
+        target[int(last) if last.isdigit() else last] = value
+    return raw
+
+
+@pytest.mark.parametrize("path, value, message", [
+    ("name", KeyError, "'name' がありません"),
+    ("column_prefix", "", "column_prefix"),
+    ("scale", {"min": 0}, "scale には数値"),
+    ("scale", {"min": 10, "max": 0}, "min は max より小さく"),
+    ("thresholds", {"weak": 7, "strong": 5}, "weak < strong"),
+    ("thresholds", {"weak": 5, "strong": 11}, "weak < strong"),
+    ("missing", {"min_item": 2}, "不明なキー"),
+    ("missing", {"min_items": 0}, "min_items は1以上"),
+    ("missing", {"impute": "zero"}, "impute"),
+    ("domains", [], "domains は1つ以上"),
+    ("domains.1.key", "P", "重複"),
+    ("domains.0.group", "other", "group"),
+    ("domains.0.reverse", "yes", "reverse"),
+    ("domains.0.items", [], "items が空"),
+    ("domains.0.items", [5, 5], "items が重複"),
+    ("domains.0.items", [0], "1以上の整数"),
+    ("domains.0.items", [{"item": 5, "weight": 0}], "weight は正の数"),
+    ("domains.0.items", [{"item": 5, "scale": 2}], "不明なキー"),
+    ("domains.0.min_items", 4, "min_items は1以上・項目数以下"),
+])
+def test_validate_schema_errors(path, value, message):
+    with pytest.raises(SchemaError, match=message):
+        validate_schema(_mutate(path, value))
+
+
+def test_validate_schema_accepts_default():
+    validate_schema(_raw())
+    assert compile_schema(copy.deepcopy(_raw())).keys[0] == "P"
+
+# =========================
+# 逆転項目・重み
+# =========================
+def _small_schema(domains, scale=(0, 10), missing=None) -> CompiledSchema:
+    raw = {"name": "test", "version": "t", "column_prefix": "q", "scale": {"min": scale[0], "max": scale[1]},
+           "thresholds": {"weak": scale[0] + 1, "strong": scale[1] - 1}, "domains": domains}
+    if missing is not None:
+        raw["missing"] = missing
+    return compile_schema(raw)
+
+
+def test_reverse_and_weights_hand_computed():
+    schema = _small_schema([
+        {"key": "X", "group": "perma", "items": [1, {"item": 2, "reverse": True}, {"item": 3, "weight": 2}]},
+        {"key": "Y", "group": "extra", "reverse": True, "items": [1, 2]},
+    ])
+    # X = (2 + (10-8) + 2*5) / (1+1+2) = 3.5、Y = ((10-2) + (10-8)) / 2 = 5
+    np.testing.assert_allclose(score_matrix(np.array([[2.0, 8.0, 5.0]]), schema), [[3.5, 5.0]])
+    # 未回答の項目は重みごと除く：X = (2 + 2) / 2
+    np.testing.assert_allclose(score_matrix(np.array([[2.0, 8.0, np.nan]]), schema), [[2.0, 5.0]])
+
+
+def test_item_reverse_overrides_domain():
+    schema = _small_schema([
+        {"key": "Z", "group": "perma", "reverse": True, "items": [{"item": 1, "reverse": False}, 2]},
+    ], scale=(1, 5))
+    # 1〜5 の尺度：項目1はそのまま 4、項目2は逆転で 6-4 = 2 → 平均 3
+    np.testing.assert_allclose(score_matrix(np.array([[4.0, 4.0]]), schema), [[3.0]])
+
+
+def test_weighted_mean_with_fractional_weights():
+    schema = _small_schema([{"key": "W", "group": "perma",
+                             "items": [{"item": 1, "weight": 0.5}, {"item": 2, "weight": 1.5}]}])
+    # (0.5*8 + 1.5*4) / 2 = 5
+    np.testing.assert_allclose(score_matrix(np.array([[8.0, 4.0]]), schema), [[5.0]])
+
+# =========================
+# 欠損の扱い（min_items・perma_mean 補完）
+# =========================
+def test_domain_below_min_items_is_nan():
+    schema = _small_schema([{"key": "X", "group": "perma", "items": [1, 2, 3]}], missing={"min_items": 2})
+    got = score_matrix(np.array([[5.0, np.nan, np.nan], [5.0, 7.0, np.nan]]), schema)
+    assert np.isnan(got[0, 0])
+    assert got[1, 0] == 6.0
+
+
+def test_per_domain_min_items_overrides_default():
+    schema = _small_schema([
+        {"key": "X", "group": "perma", "items": [1, 2, 3], "min_items": 3},
+        {"key": "Y", "group": "perma", "items": [4, 5, 6]},
+    ], missing={"min_items": 1})
+    got = score_matrix(np.array([[5.0, 7.0, np.nan, 5.0, np.nan, np.nan]]), schema)
+    assert np.isnan(got[0, 0])
+    assert got[0, 1] == 5.0
+
+
+def test_default_min_items_is_capped_for_single_item_domains():
+    schema = _small_schema([
+        {"key": "X", "group": "perma", "items": [1, 2, 3]},
+        {"key": "L", "group": "extra", "items": [4]},
+    ], missing={"min_items": 2})
+    assert schema.min_items.tolist() == [2.0, 1.0]
+    got = score_matrix(np.array([[5.0, np.nan, np.nan, 3.0]]), schema)
+    assert np.isnan(got[0, 0])
+    assert got[0, 1] == 3.0
+
+
+def test_perma_mean_imputation_uses_counts_before_imputing():
+    schema = _small_schema([
+        {"key": "X", "group": "perma", "items": [1, 2, 3]},
+        {"key": "Y", "group": "perma", "items": [4, 5, 6]},
+        {"key": "E", "group": "extra", "items": [7, 8]},
+    ], missing={"min_items": 2, "impute": "perma_mean"})
+    answers = np.array([[4.0, np.nan, np.nan, 8.0, 6.0, np.nan, np.nan, 3.0]])
+    x, y, e = score_matrix(answers, schema)[0]
+    # PERMA 項目の本人平均 (4+8+6)/3 = 6 で埋めるが、X は実際の回答が1つなので NaN のまま
+    assert np.isnan(x)
+    assert y == pytest.approx((8 + 6 + 6) / 3)
+    # その他の指標の項目は埋めない（回答1つ < 2）
+    assert np.isnan(e)
+
+
+def test_perma_mean_imputation_without_any_perma_answer():
+    schema = _small_schema([{"key": "X", "group": "perma", "items": [1, 2]}],
+                           missing={"min_items": 1, "impute": "perma_mean"})
+    assert np.isnan(score_matrix(np.array([[np.nan, np.nan]]), schema)[0, 0])
+
+
+def test_bundled_schema_version_reflects_min_items():
+    # min_items: 2 を入れたときに版を上げた（版 "1" は1項目でも採点していた）
+    raw = _raw()
+    assert raw["missing"]["min_items"] == 2 and raw["version"] == "2"
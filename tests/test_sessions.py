@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+from parma import sessions
+
+
+def _store(spill_dir, **kw) -> sessions.SessionStore:
+    return sessions.SessionStore(budget_bytes=kw.get("budget", 1 << 30), idle_s=60, expire_s=3600, spill_dir=spill_dir)
+
+
+def test_default_spill_dir_is_private():
+    d = sessions.private_dir()
+    assert stat.S_IMODE(d.stat().st_mode) == 0o700
+    assert d != sessions.private_dir()   # 毎回別の名前
+    os.rmdir(d)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX のみ")
+def test_shared_spill_dir_is_rejected(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(sessions.SpillDirError):
+        sessions.private_dir(shared)
+    assert stat.S_IMODE(sessions.private_dir(tmp_path / "new").stat().st_mode) == 0o700
+
+
+def test_spill_and_reload(tmp_path):
+    store = _store(sessions.private_dir(tmp_path / "spill"), budget=0)
+    df = pd.DataFrame({"ID": ["A", "B"], "6_1": [1.0, 2.0]})
+    store.put("s1", df)
+    store.put("s2", df.copy())   # 上限 0 なので s1 は退避される
+    assert store.stats()["spills"] == 1
+    pd.testing.assert_frame_equal(store.get("s1"), df)
+
+
+def test_replaced_spill_file_is_not_unpickled(tmp_path, monkeypatch):
+    store = _store(sessions.private_dir(tmp_path / "spill"), budget=0)
+    store.put("s1", pd.DataFrame({"ID": ["A"]}))
+    store.put("s2", pd.DataFrame({"ID": ["B"]}))
+    path = store._entries["s1"].path
+    pd.DataFrame({"ID": ["X"]}).to_pickle(path, compression=sessions.SPILL_COMPRESSION)
+
+    def never(*a, **kw):
+        raise AssertionError("置き換えられたファイルを unpickle した")
+    monkeypatch.setattr(pd, "read_pickle", never)
+    assert store.get("s1") is None
+    assert not path.exists()
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+import time
+
+from parma import timing
+
+
+def test_lazy_import_waits_for_module_being_imported(tmp_path, monkeypatch):
+    # 読み込みに時間のかかるモジュールを2つのスレッドが同時に要求しても、両方とも初期化済みのものを受け取る
+    (tmp_path / "parma_slow_mod.py").write_text("import time\ntime.sleep(0.3)\nREADY = True\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "parma_slow_mod", raising=False)
+    got: list[bool] = []   # 受け取った時点で初期化が終わっていたか
+    threads = [threading.Thread(target=lambda: got.append(getattr(timing.lazy_import("parma_slow_mod"), "READY", False)))
+               for _ in range(2)]
+    threads[0].start()
+    time.sleep(0.1)   # 1つ目が読み込み中のうちに2つ目が要求する
+    threads[1].start()
+    for t in threads:
+        t.join()
+    assert got == [True, True]
+    assert "parma_slow_mod" in timing.startup_record()["lazy_imports_ms"]
+    sys.modules.pop("parma_slow_mod", None)
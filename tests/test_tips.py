@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+import pytest
+
+from parma.scoring import DEFAULT_SCHEMA, SchemaError, validate_schema
+from parma.tips import select_tips, tip_scores
+
+
+def test_weak_threshold_must_exceed_scale_min():
+    with open(DEFAULT_SCHEMA, encoding="utf-8") as f:
+        raw = json.load(f)
+    raw["thresholds"]["weak"] = raw["scale"]["min"]
+    with pytest.raises(SchemaError, match="min < weak"):
+        validate_schema(raw)
+
+
+def test_tip_scores_are_finite(schema):
+    scores = np.full((3, len(schema.keys)), np.nan)
+    scores[0] = schema.scale_min
+    scores[1] = schema.weak
+    points = tip_scores(scores, schema)
+    assert np.isfinite(points).all()
+    picked = select_tips(scores, schema)
+    assert all(p.shape == (3, 2) for p in picked.values())
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+import pandas as pd
+
+from parma.triage import RULES_ENV, TriageQueue, cohort_queue, compile_rules, evaluate, priorities
+
+RAW = {
+    "name": "テスト",
+    "version": "1",
+    "order_by": "perma_mean",
+    "rules": [
+        {"id": "both_low", "priority": 3,
+         "all": [{"key": "P", "op": "<", "value": 3}, {"key": "E", "op": "<", "value": 3}]},
+        {"id": "one_low", "priority": 1,
+         "any": [{"key": "R", "op": "<=", "value": 2}, {"key": "M", "op": "<=", "value": 2}]},
+        {"id": "mixed", "priority": 2,
+         "all": [{"key": "perma_min", "op": "<", "value": 4}],
+         "any": [{"key": "ひとりぼっち感", "op": ">=", "value": 7}, {"key": "からだの調子", "op": "<=", "value": 1}]},
+    ],
+}
+
+
+def _scores(schema, *rows: dict) -> np.ndarray:
+    # 指定しない領域は 5 点
+    out = np.full((len(rows), len(schema.keys)), 5.0)
+    for i, row in enumerate(rows):
+        for k, v in row.items():
+            out[i, schema.keys.index(k)] = v
+    return out
+
+
+def test_evaluate_all_any_and_nan(schema):
+    rules = compile_rules(RAW)
+    scores = _scores(
+        schema,
+        {},                                          # どれにも当てはまらない
+        {"P": 1, "E": 2},                            # both_low（all の両方）
+        {"P": 1},                                    # all の片方だけ → 当てはまらない
+        {"M": 2},                                    # one_low（any の片方）
+        {"P": 3, "ひとりぼっち感": 8},                # mixed（all と any の片方）
+        {"P": 3},                                    # mixed の any を満たさない
+        {"P": np.nan, "E": 1, "R": np.nan},          # 未回答の条件は満たさない
+        {"P": np.nan, "E": np.nan, "R": np.nan, "M": np.nan, "A": np.nan, "からだの調子": 0},  # perma_min も NaN
+    )
+    flags = evaluate(scores, schema, rules)
+    assert flags.tolist() == [
+        [False, False, False],
+        [True, False, False],     # perma_min=1 でも mixed の any をどちらも満たさない
+        [False, False, False],
+        [False, True, False],
+        [False, False, True],
+        [False, False, False],
+        [False, False, False],
+        [False, False, False],
+    ]
+    assert priorities(flags, rules).tolist() == [0, 3, 0, 1, 2, 0, 0, 0]
+
+
+def test_queue_update_reorders(schema):
+    queue = TriageQueue(schema, compile_rules(RAW))
+    first = _scores(schema, {"P": 1, "E": 1}, {"R": 1}, {"M": 0, "A": 0}, {})
+    assert queue.update(["a", "b", "c", "d"], first) == 3
+    assert [e.sid for e in queue.top()] == ["a", "c", "b"]
+    assert "d" not in queue
+
+    # b は優先度が上がって先頭へ・a は当てはまらなくなって外れる・d が入る
+    second = _scores(schema, {}, {"P": 0, "E": 0, "R": 0}, {"R": 2})
+    assert queue.update(["a", "b", "d"], second) == 2
+    assert [e.sid for e in queue.top()] == ["b", "c", "d"]
+    assert [e.priority for e in queue.top()] == [3, 1, 1]
+    assert queue._keys == sorted(e.sort_key() for e in queue._entries.values())
+    assert "a" not in queue and len(queue) == 3
+    assert [e.sid for e in queue.top(1)] == ["b"]
+
+
+def test_cohort_queue_order(schema, tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RAW, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setenv(RULES_ENV, str(path))
+    df = pd.DataFrame({"ID": ["x", "y", "z", "y", None, "w"]})
+    scores = _scores(
+        schema,
+        {"R": 1},                      # one_low（平均 4.2）
+        {"P": 2, "E": 2},              # both_low（平均 3.8）
+        {"P": 1, "E": 0, "R": 1},      # both_low（平均 2.4）
+        {},                            # 同じ ID の2行目は使わない
+        {"P": 0, "E": 0},              # ID が空
+        {"M": 1, "A": 1},              # one_low（平均 3.4）
+    )
+    queue = cohort_queue(df, scores, schema)
+    assert [e.sid for e in queue.top()] == ["z", "y", "w", "x"]
+    table = queue.frame()
+    assert table["ID"].tolist() == ["z", "y", "w", "x"]
+    assert table["優先度"].tolist() == [3, 3, 1, 1]
+    assert table["当てはまった基準"].tolist() == ["both_low、one_low", "both_low", "one_low", "one_low"]
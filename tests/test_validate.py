@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import sys
+
+import numpy as np
+
+from parma.validate import ROW_ISSUES, validate_answers
+
+
+def test_clean_workbook_is_ok(schema, workbook):
+    report = validate_answers(workbook(10), schema)
+    assert report.ok
+    assert not report.flagged.any() and len(report.rows) == 0
+    assert report.counts() == {k: 0 for k in ROW_ISSUES}
+
+
+def test_row_issues_and_flagged_mask(schema, workbook):
+    df = workbook(7).astype({c: object for c in schema.columns})
+    first, second = schema.columns[0], schema.columns[1]
+    df.loc[1, first] = schema.scale_max + 1           # 範囲外
+    df.loc[1, second] = schema.scale_min - 1
+    df.loc[2, first] = "とても"                         # 数値以外
+    df.loc[3, "ID"] = df.loc[4, "ID"]                  # ID重複（両方の行）
+    df.loc[5, "ID"] = None                             # ID空欄
+    df.loc[6, list(schema.columns)] = np.nan           # 全項目未回答
+
+    report = validate_answers(df, schema)
+    assert not report.ok
+    assert report.flagged.tolist() == [False, True, True, True, True, True, True]
+    assert report.rows["行"].tolist() == [3, 4, 5, 6, 7, 8]
+    assert report.counts() == {"ID空欄": 1, "ID重複": 2, "数値以外": 1, "範囲外": 1, "全項目未回答": 1}
+
+    rows = report.rows.set_index("行")
+    assert rows.loc[3, "該当列"] == f"{first} {second}"
+    assert rows.loc[4, "該当列"] == first and rows.loc[4, "数値以外"]
+    assert rows.loc[5, "ID重複"] and rows.loc[6, "ID重複"]
+    assert rows.loc[7, "ID"] == "" and rows.loc[7, "ID空欄"]
+
+    assert report.columns.loc[first, "範囲外"] == 1 and report.columns.loc[first, "数値以外"] == 1
+    assert report.columns.loc[second, "未回答"] == 1
+
+
+def test_missing_columns(schema, workbook):
+    df = workbook(3).drop(columns=list(schema.columns[:2]))
+    report = validate_answers(df, schema)
+    assert report.missing_columns == tuple(schema.columns[:2])
+    assert not report.ok and not report.flagged.any()
+    # ない列は未回答として数えない
+    assert (report.columns.loc[list(schema.columns[:2]), "未回答"] == 0).all()
+
+    none = validate_answers(df[["ID", "施設"]], schema)
+    assert none.missing_columns == tuple(schema.columns)
+    assert not none.flagged.any()
+
+
+def test_render_validation(schema, workbook, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest は __main__ を差し替えたままにするので元に戻す
+    monkeypatch.setitem(sys.modules, "__main__", sys.modules["__main__"])
+    df = workbook(4)
+    df.loc[2, schema.columns[0]] = schema.scale_max + 5
+
+    def page(report):
+        import streamlit as st
+
+        from parma.validate import render_validation
+
+        st.session_state["excluded"] = render_validation(report)
+
+    at = AppTest.from_function(page, args=(validate_answers(df, schema),)).run(timeout=30)
+    assert not at.exception
+    assert "4 行中 1 行に問題があります" in at.warning[0].value
+    assert at.session_state["excluded"] is False
+    at.checkbox(key="validation_exclude").check().run(timeout=30)
+    assert at.session_state["excluded"] is True
+
+    ok = AppTest.from_function(page, args=(validate_answers(workbook(4), schema),)).run(timeout=30)
+    assert ok.success and ok.session_state["excluded"] is False
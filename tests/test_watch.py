@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from parma import report, watch
+
+
+def test_safe_name_keeps_distinct_ids_apart():
+    names = {watch.safe_name(s) for s in ("a/b", "a_b", "a:b", "a b", "..")}
+    assert len(names) == 5
+    assert watch.safe_name("A0001") == "A0001"
+    assert all("/" not in n and n not in (".", "..") for n in names)
+
+
+def test_failed_render_is_retried(workbook, schema, tmp_path, monkeypatch):
+    src = tmp_path / "answers.csv"
+    workbook(4).to_csv(src, index=False)
+    out = tmp_path / "out"
+    state = watch.WatchState(tmp_path / "state.json", "test")
+    renderer = watch.Renderer(out, schema, formats=("html",))
+    sig = watch._signature(src)
+
+    render = report.render
+
+    def flaky(record, fmt):
+        if record[0] == "A0002":
+            raise RuntimeError("描画に失敗")
+        return render(record, fmt)
+    monkeypatch.setattr(report, "render", flaky)
+    assert watch.ingest(src, sig, schema, state, renderer) == 3
+    assert "A0002" not in state.answers and len(state.answers) == 3
+    assert not state.done(src.name, sig)
+
+    # 次に見に行ったときは失敗した人だけ描き直す
+    monkeypatch.setattr(report, "render", render)
+    assert watch.ingest(src, sig, schema, state, renderer) == 1
+    assert state.done(src.name, sig)
+    assert sorted(p.stem for p in (out / "html").iterdir()) == ["A0000", "A0001", "A0002", "A0003"]